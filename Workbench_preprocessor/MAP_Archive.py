@@ -0,0 +1,222 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Archive of the raw resistivity and water-quality files under their ordered names.
+
+The Oasis preprocessor used to copy every raw file into Raw_Data_Renamed. RawArchive offers cheaper ways to keep
+the renamed set, chosen with its mode:
+
+    copy        copy each file, as before
+    link        a reflink (copy-on-write clone) where the filesystem supports it, otherwise a hardlink, falling back
+                to a copy when neither works (for example across drives)
+    manifest    write nothing but the manifest that maps each raw file to its ordered name
+    tar         stream every file into one compressed tar archive, <river>_RAW.tar.zst when the zstandard package
+                is installed and <river>_RAW.tar.gz otherwise
+
+Every mode writes RAW_ARCHIVE_MANIFEST.csv listing the original file, its ordered name, how it was archived, its
+size and modification time. In tar mode each file is compressed as its own zstd frame or gzip member, so the
+archive is still an ordinary .tar.zst/.tar.gz, and the manifest also records where each file starts and how long
+it is so extract_member() can read one file without decompressing the rest.
+"""
+#%%
+import datetime
+import errno
+import logging
+import os
+import tarfile
+import zlib
+from io import BytesIO
+from shutil import copyfile
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+#%%
+ARCHIVE_MODES = ('copy', 'link', 'manifest', 'tar')
+ARCHIVE_MODE = 'link'
+MANIFEST_FILE = 'RAW_ARCHIVE_MANIFEST.csv'
+MANIFEST_COLUMNS = ['Filename', 'NewFilename', 'Method', 'Size', 'Modified', 'Offset', 'Length']
+
+# Linux ioctl that clones a file's extents (btrfs, XFS)
+FICLONE = 0x40049409
+
+ARCHIVE_EXTENSIONS = {'zstd': '.tar.zst', 'gz': '.tar.gz'}
+ZSTD_LEVEL = 3
+GZIP_LEVEL = 6
+READ_BUFFER = 1024 * 1024
+
+#%%
+def reflink(src, dst):
+    """
+    Clone src to dst sharing its data blocks; raises OSError or IOError where the filesystem cannot
+    """
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported on this platform")
+    with open(src, 'rb') as fin:
+        with open(dst, 'wb') as fout:
+            try:
+                fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+                return
+            except (IOError, OSError) as e:
+                error = e
+    os.remove(dst)
+    raise error
+
+#%%
+def link_file(src, dst):
+    """
+    Place src at dst without copying its data where possible; returns the method used
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        reflink(src, dst)
+        return 'reflink'
+    except (IOError, OSError):
+        pass
+    if hasattr(os, 'link'):
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError:
+            pass
+    copyfile(src, dst)
+    return 'copy'
+
+#%%
+def compressions():
+    """
+    Compression formats available here: gzip always, zstd when the zstandard package is installed
+    """
+    return ['gz', 'zstd'] if zstandard is not None else ['gz']
+
+#%%
+def compressor(compression):
+    """
+    A new zstd or gzip compression object; each one writes a complete frame or member when flushed
+    """
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    # wbits of 31 writes a gzip member rather than a bare zlib stream
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+def decompress(data, compression):
+    """
+    Decompress one zstd frame or gzip member
+    """
+    if compression == 'zstd':
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return zlib.decompress(data, 31)
+
+#%%
+class RawArchive(object):
+    """
+    Collects the raw files of one run under their ordered names
+
+    add() is called with each reordered subset (the resistivity and the water-quality files) and close() once at the
+    end, which finishes the tar archive and writes the manifest.
+    """
+    def __init__(self, path, userRiverName, mode=ARCHIVE_MODE, compression=None):
+        if mode not in ARCHIVE_MODES:
+            raise ValueError("Unknown archive mode " + str(mode) + ", expected one of " + ", ".join(ARCHIVE_MODES))
+        if compression is None:
+            compression = 'zstd' if zstandard is not None else 'gz'
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        self.path = path
+        self.mode = mode
+        self.compression = compression
+        self.rows = []
+        self.archivePath = None
+        self.fout = None
+        if mode == 'tar':
+            self.archivePath = os.path.join(path, userRiverName + '_RAW' + ARCHIVE_EXTENSIONS[compression])
+            self.fout = open(self.archivePath, 'wb')
+
+    def add(self, reorderedSubset):
+        """
+        Archive the files of a reordered subset under the base names of their NewFilename; returns bytes written
+        """
+        logging.info("Archiving renamed files (" + self.mode + ")\n")
+        written = 0
+        for i, fOld in enumerate(reorderedSubset["Filename"]):
+            newName = os.path.basename(reorderedSubset.loc[i, "NewFilename"])
+            stat = os.stat(fOld)
+            row = {'Filename': fOld, 'NewFilename': newName, 'Method': self.mode, 'Size': stat.st_size,
+                   'Modified': datetime.datetime.fromtimestamp(stat.st_mtime).isoformat()}
+            if self.mode == 'copy':
+                copyfile(fOld, os.path.join(self.path, newName))
+                written += stat.st_size
+            elif self.mode == 'link':
+                row['Method'] = link_file(fOld, os.path.join(self.path, newName))
+                if row['Method'] == 'copy':
+                    written += stat.st_size
+            elif self.mode == 'tar':
+                row['Offset'], row['Length'] = self._add_member(fOld, newName, stat)
+                written += row['Length']
+            self.rows.append(row)
+        return written
+
+    def _add_member(self, filename, member, stat):
+        # One compressed frame per file holding its tar header, data and padding
+        offset = self.fout.tell()
+        frame = compressor(self.compression)
+        info = tarfile.TarInfo(member)
+        info.size = stat.st_size
+        info.mtime = int(stat.st_mtime)
+        self.fout.write(frame.compress(info.tobuf(tarfile.GNU_FORMAT)))
+        remaining = info.size
+        with open(filename, 'rb') as fin:
+            while remaining > 0:
+                chunk = fin.read(min(READ_BUFFER, remaining))
+                if not chunk:
+                    raise IOError("File " + filename + " shrank while being archived")
+                self.fout.write(frame.compress(chunk))
+                remaining -= len(chunk)
+        self.fout.write(frame.compress(b'\0' * (-info.size % tarfile.BLOCKSIZE)))
+        self.fout.write(frame.flush())
+        return offset, self.fout.tell() - offset
+
+    def close(self):
+        """
+        Finish the archive and write the manifest; returns the archive path in tar mode, otherwise the manifest path
+        """
+        if self.fout is not None:
+            frame = compressor(self.compression)
+            self.fout.write(frame.compress(b'\0' * (2 * tarfile.BLOCKSIZE)))
+            self.fout.write(frame.flush())
+            self.fout.close()
+            self.fout = None
+        manifestPath = os.path.join(self.path, MANIFEST_FILE)
+        pd.DataFrame(self.rows, columns=MANIFEST_COLUMNS).to_csv(manifestPath, index=False)
+        methods = pd.Series([r['Method'] for r in self.rows]).value_counts()
+        logging.info("Raw files archived: " + ", ".join(k + " " + str(v) for k, v in methods.items()) + "\n")
+        return self.archivePath or manifestPath
+
+#%%
+def extract_member(archivePath, member):
+    """
+    Contents of one file in a tar archive written by RawArchive, read through the manifest next to it
+    """
+    manifest = pd.read_csv(os.path.join(os.path.dirname(archivePath), MANIFEST_FILE))
+    rows = manifest[manifest["NewFilename"] == member]
+    if len(rows) == 0:
+        raise KeyError(member)
+    compression = 'zstd' if archivePath.endswith('.zst') else 'gz'
+    with open(archivePath, 'rb') as fin:
+        fin.seek(int(rows["Offset"].iloc[0]))
+        block = decompress(fin.read(int(rows["Length"].iloc[0])), compression)
+    with tarfile.open(fileobj=BytesIO(block), mode='r:') as tar:
+        return tar.extractfile(member).read()
@@ -0,0 +1,351 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Batch Oasis preprocessing of many reaches.
+
+Reaches are discovered under a root folder, one reach per subfolder, or read from a manifest csv. They are processed
+with run_oasis() in a process pool. Each reach keeps its job state in OASIS_JOB_STATE.json inside its output folder,
+so running the same batch again skips the finished reaches and picks up any that were interrupted or failed. A
+consolidated BATCH_STATUS_REPORT.csv is rewritten in the batch output folder as each reach finishes.
+
+A reach folder holds a resistivity folder (.txt and .bin files), a water-quality folder (.csv files) and the INI
+file, either in the reach folder itself or in one of its subfolders. A manifest has the columns river, res_folder,
+wq_folder and ini_file, and optionally output and centerline; relative paths are taken from the manifest's folder.
+A centerline in the manifest takes the place of the --centerline given for the whole batch.
+
+    python MAP_Batch.py D:\\Season2018 --processes 4
+    python MAP_Batch.py reaches.csv --output D:\\Season2018\\OASIS_BATCH
+
+The data-release files need the serial numbers entered per reach and are not written by the batch.
+"""
+#%%
+import argparse
+import datetime
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import traceback
+
+import pandas as pd
+
+from MAP_Archive import ARCHIVE_MODE, ARCHIVE_MODES
+from MAP_Decimate import BIN_MODE, BIN_MODES
+from MAP_Memory import MB, memory_limit
+from MAP_Overlap import OVERLAP_MODE, OVERLAP_MODES, OVERLAP_TOLERANCE
+from MAP_Pipeline import PreprocessingError, run_oasis
+from MAP_Section import SECTION_FORMATS
+from MAP_Sequence import SEQUENCE_MODE, SEQUENCE_MODES
+
+#%%
+BATCH_FOLDER = 'OASIS_BATCH'
+STATE_FILE = 'OASIS_JOB_STATE.json'
+REPORT_FILE = 'BATCH_STATUS_REPORT.csv'
+REPORT_COLUMNS = ['reach', 'status', 'attempts', 'started', 'finished', 'wall_s', 'res_rows', 'merged_rows', 'error',
+                  'output']
+MANIFEST_COLUMNS = ['river', 'res_folder', 'wq_folder', 'ini_file']
+
+#%%
+def _now():
+    return '{:%Y-%m-%d %H:%M:%S}'.format(datetime.datetime.now())
+
+#%%
+def _write_json(path, data):
+    """
+    Replace path with data written as JSON, never leaving a partly written file behind
+    """
+    temp = path + '.tmp'
+    with open(temp, 'w') as fout:
+        json.dump(data, fout, indent=2, sort_keys=True)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(temp, path)
+
+#%%
+def find_reach(folder):
+    """
+    Resistivity folder, water-quality folder and INI file of a reach folder, or None when one is missing
+    """
+    res_folder = wq_folder = None
+    for child in [folder] + [os.path.join(folder, c) for c in sorted(os.listdir(folder))]:
+        if not os.path.isdir(child):
+            continue
+        # The resistivity and water-quality files may share a folder
+        if res_folder is None and glob.glob(os.path.join(child, '*.bin')) and glob.glob(os.path.join(child, '*.txt')):
+            res_folder = child
+        if wq_folder is None and glob.glob(os.path.join(child, '*.csv')):
+            wq_folder = child
+    ini_files = sorted(glob.glob(os.path.join(folder, '*.ini'))) + sorted(glob.glob(os.path.join(folder, '*', '*.ini')))
+    if res_folder is None or wq_folder is None or not ini_files:
+        return None
+    if len(ini_files) > 1:
+        logging.warning("More than one INI file in " + folder + ", using " + ini_files[0] + "\n")
+    return res_folder, wq_folder, ini_files[0]
+
+#%%
+def discover_reaches(root, output):
+    """
+    One job per subfolder of root that holds a complete reach
+    """
+    jobs = []
+    for name in sorted(os.listdir(root)):
+        folder = os.path.join(root, name)
+        if not os.path.isdir(folder) or os.path.abspath(folder) == os.path.abspath(output):
+            continue
+        found = find_reach(folder)
+        if found is None:
+            logging.info("Skipping " + folder + ": no resistivity, water-quality or INI files found\n")
+            continue
+        jobs.append({'reach': name,
+                     'river': name,
+                     'res_folder': found[0],
+                     'wq_folder': found[1],
+                     'ini_file': found[2],
+                     'output': os.path.join(output, name)})
+    return jobs
+
+#%%
+def read_manifest(manifest, output):
+    """
+    One job per row of a manifest csv
+    """
+    table = pd.read_csv(manifest, dtype=str)
+    missing = [c for c in MANIFEST_COLUMNS if c not in table.columns]
+    if missing:
+        raise PreprocessingError("FILE ERROR", "Manifest is missing column(s): " + ", ".join(missing))
+    if table['river'].duplicated().any():
+        raise PreprocessingError("FILE ERROR", "Manifest lists a river more than once: " +
+                                 ", ".join(table.loc[table['river'].duplicated(), 'river']))
+    base = os.path.dirname(os.path.abspath(manifest))
+    jobs = []
+    for row in table.to_dict('records'):
+        job = {'reach': row['river'], 'river': row['river']}
+        for column in ['res_folder', 'wq_folder', 'ini_file']:
+            job[column] = os.path.join(base, row[column])
+        outFolder = row.get('output')
+        job['output'] = os.path.join(base, outFolder) if pd.notnull(outFolder) else os.path.join(output, row['river'])
+        if pd.notnull(row.get('centerline')):
+            job['centerline'] = os.path.join(base, row['centerline'])
+        jobs.append(job)
+    return jobs
+
+#%%
+def read_state(job):
+    """
+    Saved state of a reach, or a new pending state
+    """
+    try:
+        with open(os.path.join(job['output'], STATE_FILE)) as fin:
+            return json.load(fin)
+    except (IOError, ValueError):
+        return {'reach': job['reach'], 'status': 'pending', 'attempts': 0, 'output': job['output']}
+
+#%%
+def is_finished(state):
+    """
+    True when the reach finished and its outputs are still on disk
+    """
+    if state.get('status') != 'done':
+        return False
+    return all(os.path.exists(p) for p in state.get('outputs', {}).values() if p)
+
+#%%
+def process_reach(job):
+    """
+    Run run_oasis() on one reach in a worker process, recording its state before and after
+    """
+    if not os.path.isdir(job['output']):
+        os.makedirs(job['output'])
+    statePath = os.path.join(job['output'], STATE_FILE)
+    state = read_state(job)
+    state.update({'reach': job['reach'], 'status': 'running', 'attempts': state.get('attempts', 0) + 1,
+                  'started': _now(), 'finished': None, 'error': None, 'pid': os.getpid(), 'job': job,
+                  'output': job['output']})
+    _write_json(statePath, state)
+
+    # Each reach logs to its own output folder
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    handler = logging.FileHandler(os.path.join(job['output'], 'PREPROCESSING_LOGFILE.txt'), mode='w')
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s', '%m/%d/%Y %I:%M:%S %p'))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+    try:
+        results = run_oasis(job['river'], job['res_folder'], job['wq_folder'], job['ini_file'], job['output'],
+                            archive_mode=job.get('archive', ARCHIVE_MODE),
+                            sequence=job.get('sequence', SEQUENCE_MODE), overlap=job.get('overlap', OVERLAP_MODE),
+                            overlap_tolerance=job.get('overlap_tolerance', OVERLAP_TOLERANCE),
+                            centerline=job.get('centerline'),
+                            bin_size=job.get('bin_size'), bin_by=job.get('bin_by', BIN_MODE),
+                            sections=job.get('sections'), reject_flagged=job.get('reject_flagged', False),
+                            despike=job.get('despike', False), tiles=job.get('tiles', False),
+                            catalog=job.get('catalog') or True, store=job.get('store'),
+                            memory_budget=job.get('memory_budget'))
+        state.update({'status': 'done',
+                      'outputs': results['outputs'],
+                      'res_rows': len(results['importfile']),
+                      'merged_rows': len(results['resOhm']),
+                      'wall_s': results['metrics'].total()['wall_s']})
+    except PreprocessingError as e:
+        logging.error(e.title + ": " + str(e) + "\n")
+        state.update({'status': 'failed', 'error': e.title + ": " + str(e)})
+    except Exception:
+        errormessage = traceback.format_exc()
+        logging.critical("Uncaught error encountered: \n%s", errormessage)
+        state.update({'status': 'failed', 'error': errormessage.strip().splitlines()[-1]})
+    state['finished'] = _now()
+    _write_json(statePath, state)
+    handler.close()
+    root.removeHandler(handler)
+    return state
+
+#%%
+def write_report(states, output):
+    """
+    Write the status of every reach in the batch to BATCH_STATUS_REPORT.csv
+    """
+    report = pd.DataFrame([states[k] for k in sorted(states)], columns=REPORT_COLUMNS)
+    path = os.path.join(output, REPORT_FILE)
+    report.to_csv(path, index=False)
+    return report
+
+#%%
+def run_batch(jobs, output, processes=1, retry_failed=True):
+    """
+    Process every unfinished reach with up to processes reaches at a time
+
+    Finished reaches are skipped; interrupted reaches are run again, as are failed ones unless retry_failed is
+    False. Returns the status report.
+    """
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    states = {}
+    pending = []
+    for job in jobs:
+        state = read_state(job)
+        states[job['reach']] = state
+        if is_finished(state):
+            logging.info("Reach " + job['reach'] + " already processed, skipping\n")
+        elif state.get('status') == 'failed' and not retry_failed:
+            logging.info("Reach " + job['reach'] + " failed previously, skipping\n")
+        else:
+            if state.get('status') == 'running':
+                logging.info("Reach " + job['reach'] + " was interrupted, running again\n")
+            pending.append(job)
+    write_report(states, output)
+
+    print('{} reach(es) to process, {} already finished'.format(len(pending), len(jobs) - len(pending)))
+    logging.info("Processing " + str(len(pending)) + " reach(es) with " + str(processes) + " process(es)\n")
+    if pending:
+        # A fresh process per reach keeps each reach's logging and memory separate
+        pool = multiprocessing.Pool(processes, maxtasksperchild=1)
+        try:
+            for state in pool.imap_unordered(process_reach, pending):
+                states[state['reach']] = state
+                write_report(states, output)
+                print('{}: {}'.format(state['reach'], state['status']))
+                logging.info("Reach " + state['reach'] + " " + state['status'] + "\n")
+            pool.close()
+        except KeyboardInterrupt:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    return write_report(states, output)
+
+#%%
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Oasis preprocessor over many reaches")
+    parser.add_argument('source', help="folder of reach folders, or a manifest csv")
+    parser.add_argument('--output', default=None,
+                        help="batch output folder (default: OASIS_BATCH in the source folder)")
+    parser.add_argument('--processes', type=int, default=1, help="reaches processed at the same time")
+    parser.add_argument('--skip-failed', action='store_true', help="do not retry reaches that failed before")
+    parser.add_argument('--archive', choices=ARCHIVE_MODES, default=ARCHIVE_MODE,
+                        help="how the raw files are kept in Raw_Data_Renamed (default: %(default)s)")
+    parser.add_argument('--sequence', choices=SEQUENCE_MODES, default=SEQUENCE_MODE,
+                        help="order the surveys by acquisition time or by location (default: %(default)s)")
+    parser.add_argument('--overlap', choices=OVERLAP_MODES, default=OVERLAP_MODE,
+                        help="remove coverage near any earlier line, inside the box where consecutive lines meet as "
+                             "the original did, or none (default: %(default)s)")
+    parser.add_argument('--overlap-tolerance', type=float, default=OVERLAP_TOLERANCE,
+                        help="metres from an earlier line's track within which coverage counts as re-surveyed "
+                             "(default: %(default)s)")
+    parser.add_argument('--centerline', default=None,
+                        help="river centerline shapefile; adds the river station and lateral offset to the outputs")
+    parser.add_argument('--bin-size', type=float, default=None,
+                        help="also write the merged data binned every this many metres (or seconds, see --bin-by)")
+    parser.add_argument('--bin-by', choices=BIN_MODES, default=BIN_MODE,
+                        help="bin along Cum_dist or along GPS time (default: %(default)s)")
+    parser.add_argument('--sections', choices=SECTION_FORMATS, default=None,
+                        help="also write a pseudo-section of each profile in this format")
+    parser.add_argument('--tiles', action='store_true',
+                        help="also write the merged data as a pyramid of GeoJSON web map tiles")
+    parser.add_argument('--catalog', default=None,
+                        help="survey catalog to record the reaches in (default: OASIS_CATALOG.sqlite in the folder "
+                             "above their outputs)")
+    parser.add_argument('--store', nargs='?', const=True, default=None,
+                        help="also load the processed tables into a typed SQLite database (default: OASIS_STORE.sqlite "
+                             "in the folder above the outputs)")
+    parser.add_argument('--reject-flagged', action='store_true',
+                        help="also drop resistivity channels that disagree with the raw current and voltages or have a weak signal")
+    parser.add_argument('--despike', action='store_true',
+                        help="remove spikes and bridge jumps from Rho, depth and altitude before filtering")
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help="MB each reach may use before it is processed in its low-memory mode (default: three "
+                             "quarters of the physical memory, shared among the processes)")
+    args = parser.parse_args(argv)
+
+    base = args.source if os.path.isdir(args.source) else os.path.dirname(os.path.abspath(args.source))
+    output = args.output or os.path.join(base, BATCH_FOLDER)
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    logging.basicConfig(filename=os.path.join(output, 'BATCH_LOGFILE.txt'),
+                        format='%(asctime)s %(levelname)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p',
+                        filemode='a', level=logging.INFO)
+    try:
+        if os.path.isdir(args.source):
+            jobs = discover_reaches(args.source, output)
+        else:
+            jobs = read_manifest(args.source, output)
+    except PreprocessingError as e:
+        print(e.title + ': ' + str(e))
+        return 1
+    if not jobs:
+        print('No reaches found in ' + args.source)
+        return 1
+    # Reaches processed at the same time share the memory
+    budget = args.memory_budget
+    if budget is None and args.processes > 1:
+        total = memory_limit()
+        budget = total / MB / args.processes if total else None
+    for job in jobs:
+        job['archive'] = args.archive
+        job['sequence'] = args.sequence
+        job['overlap'] = args.overlap
+        job['overlap_tolerance'] = args.overlap_tolerance
+        job['bin_size'] = args.bin_size
+        job['bin_by'] = args.bin_by
+        job['sections'] = args.sections
+        job['tiles'] = args.tiles
+        job['catalog'] = args.catalog
+        job['store'] = args.store
+        job['reject_flagged'] = args.reject_flagged
+        job['despike'] = args.despike
+        job['memory_budget'] = budget
+        if not job.get('centerline'):
+            job['centerline'] = args.centerline
+
+    report = run_batch(jobs, output, args.processes, not args.skip_failed)
+    print(report[['reach', 'status', 'attempts', 'wall_s', 'error']].to_string(index=False))
+    return 0 if (report['status'] == 'done').all() else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Scaling benchmark for the Oasis and Workbench preprocessors.
+
+Writes synthetic reaches (MAP_Synthetic.py) at increasing row and file counts, runs every oasis() stage headless
+and the Workbench formatting and checks on the merged output, and writes the per-stage timings to
+BENCHMARK_RESULTS.csv and BENCHMARK_RESULTS.json in the output folder. The row-by-row Workbench checks are skipped on
+reaches of more than CHECK_ROW_LIMIT Workbench rows, and their row has the status 'skipped' and no timings.
+
+The startup benchmark imports each entry point in a fresh interpreter, as launching it would, and writes the import
+times and which of the heavy optional modules were loaded along the way to STARTUP_RESULTS.csv.
+
+    python MAP_Benchmark.py                                 # full grid
+    python MAP_Benchmark.py --rows 10000 100000 --files 10  # selected sizes
+    python MAP_Benchmark.py --startup                       # import times only
+"""
+#%%
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+from MAP_Metrics import StageMetrics
+from MAP_Pipeline import run_oasis, format_workbench, check_workbench
+from MAP_Synthetic import write_reach
+
+#%%
+# Row scaling runs at ROW_SCALING_FILES files; file scaling runs at FILE_SCALING_ROWS rows
+ROW_SIZES = (10000, 100000, 1000000)
+FILE_COUNTS = (10, 100, 1000)
+ROW_SCALING_FILES = 10
+FILE_SCALING_ROWS = 200000
+CHECK_ROW_LIMIT = 200000    # Workbench rows above which the row-by-row checks are skipped
+
+# Entry points timed by the startup benchmark, and the modules they should only load when a stage needs them
+STARTUP_MODULES = ('MAP_Preprocessing_GUI', 'MAP_Pipeline', 'MAP_Batch', 'MAP_Watch', 'pandas', 'geopandas',
+                   'scipy.stats', 'scipy.spatial')
+HEAVY_MODULES = ('pandas', 'geopandas', 'shapely', 'fiona', 'pyproj', 'scipy')
+STARTUP_REPEATS = 5
+
+# Run in a fresh interpreter for each import; prints the import time and the heavy modules it loaded
+STARTUP_SCRIPT = ("import sys, time\n"
+                  "start = time.time()\n"
+                  "import {module}\n"
+                  "print(time.time() - start)\n"
+                  "print(' '.join(m for m in {heavy!r} if m in sys.modules))\n")
+
+#%%
+def benchmark_grid(rows=ROW_SIZES, files=FILE_COUNTS):
+    """
+    (rows, files) configurations: row scaling at a fixed file count, then file scaling at a fixed row count
+    """
+    configs = [(r, ROW_SCALING_FILES) for r in rows]
+    configs += [(FILE_SCALING_ROWS, f) for f in files if (FILE_SCALING_ROWS, f) not in configs]
+    return configs
+
+#%%
+def benchmark_reach(rows, files, workdir, seed=0):
+    """
+    Generate one synthetic reach in workdir and time every preprocessing stage on it
+    """
+    metrics = StageMetrics('SYNTH_{}x{}'.format(rows, files))
+    metrics.start('generate')
+    reach = write_reach(os.path.join(workdir, 'input'), rows=rows, files=files, seed=seed)
+    metrics.stop('generate', rows_out=reach['rows'])
+
+    output = os.path.join(workdir, 'output')
+    os.makedirs(output)
+    results = run_oasis('SYNTH', reach['res_folder'], reach['wq_folder'], reach['ini_file'], output, metrics=metrics)
+
+    metrics.start('workbench_format', rows_in=len(results['resOhm']))
+    out = format_workbench(pd.read_csv(results['outputs']['merged_csv']))
+    metrics.stop('workbench_format', rows_out=len(out))
+
+    # check_workbench() visits every row and cell one at a time, which takes hours on the largest reaches
+    if len(out) > CHECK_ROW_LIMIT:
+        logging.info("Workbench checks skipped on " + str(len(out)) + " rows\n")
+        metrics.skip('workbench_checks', rows_in=len(out))
+        return metrics
+    metrics.start('workbench_checks', rows_in=len(out))
+    findings = check_workbench(out)
+    metrics.stop('workbench_checks', rows_out=len(findings))
+    return metrics
+
+#%%
+def run_benchmarks(configs, output, keep=False, seed=0):
+    """
+    Run each (rows, files) configuration and write the combined stage table to output
+    """
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    records = []
+    for rows, files in configs:
+        print('Benchmarking {} rows in {} files'.format(rows, files))
+        workdir = tempfile.mkdtemp(prefix='map_bench_', dir=output)
+        try:
+            metrics = benchmark_reach(rows, files, workdir, seed)
+        finally:
+            if not keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+        for stage in metrics.stages:
+            record = dict(stage)
+            record.setdefault('status', 'ok')
+            record.update({'rows': rows, 'files': files})
+            records.append(record)
+
+    table = pd.DataFrame(records, columns=['rows', 'files', 'stage', 'status', 'wall_s', 'cpu_s', 'rows_in', 'rows_out',
+                                           'rows_per_s', 'bytes_read', 'bytes_written'])
+    table.to_csv(os.path.join(output, 'BENCHMARK_RESULTS.csv'), index=False)
+    with open(os.path.join(output, 'BENCHMARK_RESULTS.json'), 'w') as fout:
+        json.dump(records, fout, indent=2, sort_keys=True)
+    return table
+
+#%%
+def startup_time(module, folder=None):
+    """
+    Seconds taken to import module in a fresh interpreter started in folder, and the heavy modules it loaded
+    """
+    folder = folder or os.path.dirname(os.path.abspath(__file__))
+    script = STARTUP_SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+    lines = subprocess.check_output([sys.executable, '-c', script], cwd=folder).decode('utf-8').splitlines()
+    return float(lines[-2]), lines[-1].split()
+
+def startup_times(output, modules=STARTUP_MODULES, repeats=STARTUP_REPEATS):
+    """
+    Time importing each module repeats times and write the median, fastest and slowest to output
+    """
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    records = []
+    for module in modules:
+        times = []
+        for _ in range(repeats):
+            seconds, loaded = startup_time(module)
+            times.append(seconds)
+        times = pd.Series(times)
+        records.append({'module': module, 'import_s': round(times.median(), 4), 'min_s': round(times.min(), 4),
+                        'max_s': round(times.max(), 4), 'loaded': ' '.join(loaded)})
+    table = pd.DataFrame(records, columns=['module', 'import_s', 'min_s', 'max_s', 'loaded'])
+    table.to_csv(os.path.join(output, 'STARTUP_RESULTS.csv'), index=False)
+    return table
+
+#%%
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each preprocessing stage on synthetic reaches")
+    parser.add_argument('--rows', type=int, nargs='*', default=list(ROW_SIZES),
+                        help="resistivity record counts for the row scaling runs")
+    parser.add_argument('--files', type=int, nargs='*', default=list(FILE_COUNTS),
+                        help="survey line counts for the file scaling runs")
+    parser.add_argument('--output', default=os.path.join(os.getcwd(), 'benchmark'),
+                        help="folder for the results and the temporary reaches")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep', action='store_true', help="keep the synthetic reaches and their outputs")
+    parser.add_argument('--startup', action='store_true', help="only time importing each entry point")
+    parser.add_argument('--repeats', type=int, default=STARTUP_REPEATS, help="imports timed per module at startup")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        print(startup_times(args.output, repeats=args.repeats).to_string(index=False))
+        return
+
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    logging.basicConfig(filename=os.path.join(args.output, 'BENCHMARK_LOGFILE.txt'),
+                        format='%(asctime)s %(levelname)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p',
+                        filemode='w', level=logging.INFO)
+    table = run_benchmarks(benchmark_grid(args.rows, args.files), args.output, args.keep, args.seed)
+    # Skipped stages are left out, so they show as missing rather than as taking no time
+    summary = table[table['status'] == 'ok'].pivot_table(index='stage', columns=['rows', 'files'], values='wall_s',
+                                                         aggfunc='sum')
+    print(summary.to_string())
+
+if __name__ == '__main__':
+    sys.exit(main())
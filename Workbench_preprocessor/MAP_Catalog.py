@@ -0,0 +1,282 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Survey catalog: one SQLite database recording every processed reach, file and profile.
+
+Each run_oasis() run adds its reach to the catalog when its outputs have been written, replacing what an earlier run
+into the same output folder recorded. The catalog is kept next to the output folders (OASIS_CATALOG.sqlite in the
+folder above, so the reaches of a batch or a season share one) unless a path is given. It holds:
+
+    runs            reach, output folder, when it was processed, point counts, bounding box and time span
+    profiles        every resistivity and water-quality file: profile number, raw and renamed file, points,
+                    bounding box (WGS84) and time span
+    profile_index   R-tree of the profile bounding boxes
+    channel_stats   count, minimum, maximum, mean and standard deviation of each channel of each profile
+    outputs         the path and size of each output of a run
+
+so which lines cover a location, or which reaches were surveyed in a month, is a query on the catalog rather than a
+read of every output:
+
+    python MAP_Catalog.py D:\\Season2018\\OASIS_CATALOG.sqlite --at -91.83 38.57
+    python MAP_Catalog.py D:\\Season2018\\OASIS_CATALOG.sqlite --reaches --from 2018-04-01 --to 2018-05-01
+
+Times are written 'YYYY-MM-DD HH:MM:SS' (the survey times as read, see MAP_Sequence), so they order as text. Every
+connection waits up to CATALOG_TIMEOUT seconds for another run's write to finish, so the workers of a batch can
+update one catalog.
+"""
+#%%
+import argparse
+import datetime
+import logging
+import os
+import sqlite3
+import sys
+
+import pandas as pd
+
+from MAP_Metrics import file_size
+
+#%%
+CATALOG_FILE = 'OASIS_CATALOG.sqlite'
+CATALOG_TIMEOUT = 60.0      # seconds to wait for another writer
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+RES_STAT_COLUMNS = ['Rho {}_rollavg'.format(n) for n in range(1, 11)] + ['Depth_rollavg', 'Altitude_rollmed']
+WQ_STAT_COLUMNS = ['Ohm_m', 'Temp_C', 'SPC_mscm', 'pH', 'DO %', 'FNU', 'DEP m']
+PROFILE_COLUMNS = ['kind', 'profile', 'source', 'filename', 'points', 'min_lon', 'max_lon', 'min_lat', 'max_lat',
+                   'start_time', 'end_time']
+STAT_COLUMNS = ['channel', 'count', 'min', 'max', 'mean', 'std']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY, reach TEXT, directory TEXT UNIQUE, processed TEXT, res_points INTEGER,
+    wq_points INTEGER, merged_points INTEGER, min_lon REAL, max_lon REAL, min_lat REAL, max_lat REAL,
+    start_time TEXT, end_time TEXT);
+CREATE INDEX IF NOT EXISTS runs_time ON runs (start_time, end_time);
+CREATE TABLE IF NOT EXISTS profiles (
+    profile_id INTEGER PRIMARY KEY, run_id INTEGER, reach TEXT, kind TEXT, profile INTEGER, source TEXT,
+    filename TEXT, points INTEGER, min_lon REAL, max_lon REAL, min_lat REAL, max_lat REAL, start_time TEXT,
+    end_time TEXT);
+CREATE INDEX IF NOT EXISTS profiles_run ON profiles (run_id);
+CREATE INDEX IF NOT EXISTS profiles_time ON profiles (start_time, end_time);
+CREATE VIRTUAL TABLE IF NOT EXISTS profile_index USING rtree (profile_id, min_lon, max_lon, min_lat, max_lat);
+CREATE TABLE IF NOT EXISTS channel_stats (
+    profile_id INTEGER, channel TEXT, count INTEGER, min REAL, max REAL, mean REAL, std REAL,
+    PRIMARY KEY (profile_id, channel));
+CREATE TABLE IF NOT EXISTS outputs (run_id INTEGER, name TEXT, path TEXT, bytes INTEGER);
+CREATE INDEX IF NOT EXISTS outputs_run ON outputs (run_id);
+"""
+
+#%%
+def catalog_path(directory):
+    """
+    Default catalog of the reach written to directory: OASIS_CATALOG.sqlite in the folder above it
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(directory)), CATALOG_FILE)
+
+def connect(path):
+    """
+    Open the catalog at path, creating its tables if they are not there yet
+    """
+    conn = sqlite3.connect(path, timeout=CATALOG_TIMEOUT)
+    conn.executescript(SCHEMA)
+    return conn
+
+def _time(value):
+    # Catalog text of a timestamp, None when missing
+    if value is None or pd.isnull(value):
+        return None
+    return pd.Timestamp(value).strftime(TIME_FORMAT)
+
+def _value(value):
+    # Plain Python number for sqlite, None for NaN
+    if value is None or pd.isnull(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+#%%
+def profile_table(frame, kind, renamed, spans, columns):
+    """
+    One row per profile (File) of a processed frame, and the statistics of each of its channels
+
+    renamed is the renamed file directory (Filename, NewFilename) and spans the discovery table with the StartTime
+    and EndTime of each raw Filename. Returns the profiles (PROFILE_COLUMNS) and their statistics (profile and
+    STAT_COLUMNS).
+    """
+    if not len(frame):
+        return pd.DataFrame(columns=PROFILE_COLUMNS), pd.DataFrame(columns=['profile'] + STAT_COLUMNS)
+    profile = pd.to_numeric(frame['File'], errors='coerce').values
+    numbers = pd.DataFrame({'profile': profile,
+                            'lon': pd.to_numeric(frame['Lon'], errors='coerce').values,
+                            'lat': pd.to_numeric(frame['Lat'], errors='coerce').values})
+    grouped = numbers.groupby('profile')
+    profiles = pd.DataFrame({'points': grouped.size(),
+                             'min_lon': grouped['lon'].min(), 'max_lon': grouped['lon'].max(),
+                             'min_lat': grouped['lat'].min(), 'max_lat': grouped['lat'].max()})
+    profiles['filename'] = frame.groupby(profile)['Filename'].first()
+    files = renamed[['Filename', 'NewFilename']].merge(spans[['Filename', 'StartTime', 'EndTime']], on='Filename',
+                                                       how='left')
+    files = files.drop_duplicates('NewFilename').set_index('NewFilename')
+    profiles['source'] = profiles['filename'].map(files['Filename'])
+    profiles['start_time'] = profiles['filename'].map(files['StartTime']).map(_time)
+    profiles['end_time'] = profiles['filename'].map(files['EndTime']).map(_time)
+    profiles['kind'] = kind
+    profiles.index.name = 'profile'
+    profiles = profiles.reset_index()[PROFILE_COLUMNS]
+
+    columns = [c for c in columns if c in frame]
+    stats = []
+    if columns:
+        values = pd.DataFrame(dict((c, pd.to_numeric(frame[c], errors='coerce').values) for c in columns))
+        values['profile'] = profile
+        grouped = values.groupby('profile')
+        for name, statistic in [('count', grouped.count()), ('min', grouped.min()), ('max', grouped.max()),
+                                ('mean', grouped.mean()), ('std', grouped.std())]:
+            stats.append(statistic.stack(dropna=False).rename(name))
+        stats = pd.concat(stats, axis=1)
+        stats.index.names = ['profile', 'channel']
+        stats = stats.reset_index()
+    else:
+        stats = pd.DataFrame(columns=['profile'] + STAT_COLUMNS)
+    return profiles, stats
+
+#%%
+def record_run(path, userRiverName, directory, tables, outputs=None, points=None):
+    """
+    Record a processed reach in the catalog at path, in place of whatever was recorded for its output folder
+
+    tables is a list of (profiles, stats) from profile_table() and outputs a dict of output name to path or paths;
+    points gives the res, wq and merged point counts. Returns the run id.
+    """
+    directory = os.path.abspath(directory)
+    profiles = pd.concat([p for p, s in tables], ignore_index=True) if tables else pd.DataFrame(columns=PROFILE_COLUMNS)
+    points = points or {}
+    boxes = profiles[['min_lon', 'max_lon', 'min_lat', 'max_lat']].apply(pd.to_numeric, errors='coerce')
+    starts = profiles['start_time'].dropna()
+    ends = profiles['end_time'].dropna()
+
+    conn = connect(path)
+    try:
+        with conn:
+            old = [r[0] for r in conn.execute("SELECT run_id FROM runs WHERE directory = ?", (directory,))]
+            for runId in old:
+                conn.execute("DELETE FROM profile_index WHERE profile_id IN "
+                             "(SELECT profile_id FROM profiles WHERE run_id = ?)", (runId,))
+                conn.execute("DELETE FROM channel_stats WHERE profile_id IN "
+                             "(SELECT profile_id FROM profiles WHERE run_id = ?)", (runId,))
+                conn.execute("DELETE FROM profiles WHERE run_id = ?", (runId,))
+                conn.execute("DELETE FROM outputs WHERE run_id = ?", (runId,))
+                conn.execute("DELETE FROM runs WHERE run_id = ?", (runId,))
+
+            runId = conn.execute(
+                "INSERT INTO runs (reach, directory, processed, res_points, wq_points, merged_points, min_lon, "
+                "max_lon, min_lat, max_lat, start_time, end_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (userRiverName, directory, datetime.datetime.now().strftime(TIME_FORMAT), points.get('res'),
+                 points.get('wq'), points.get('merged'), _value(boxes['min_lon'].min()),
+                 _value(boxes['max_lon'].max()), _value(boxes['min_lat'].min()), _value(boxes['max_lat'].max()),
+                 starts.min() if len(starts) else None, ends.max() if len(ends) else None)).lastrowid
+
+            for table, stats in tables:
+                for row, stat in zip(table.itertuples(index=False), _stats_by_profile(table, stats)):
+                    profileId = conn.execute(
+                        "INSERT INTO profiles (run_id, reach, kind, profile, source, filename, points, min_lon, "
+                        "max_lon, min_lat, max_lat, start_time, end_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (runId, userRiverName) + tuple(_value(v) for v in row)).lastrowid
+                    box = [_value(getattr(row, c)) for c in ('min_lon', 'max_lon', 'min_lat', 'max_lat')]
+                    if None not in box:
+                        conn.execute("INSERT INTO profile_index VALUES (?, ?, ?, ?, ?)", [profileId] + box)
+                    conn.executemany("INSERT INTO channel_stats VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     [(profileId,) + tuple(_value(v) for v in s) for s in stat])
+
+            for name, paths in sorted((outputs or {}).items()):
+                for p in (paths if isinstance(paths, (list, tuple)) else [paths]):
+                    if p:
+                        conn.execute("INSERT INTO outputs VALUES (?, ?, ?, ?)",
+                                     (runId, name, os.path.abspath(p), file_size(p)))
+    finally:
+        conn.close()
+    logging.info("Catalog " + path + " updated with " + str(len(profiles)) + " profile(s) of " + userRiverName + "\n")
+    return runId
+
+def _stats_by_profile(table, stats):
+    # Rows of STAT_COLUMNS of each profile of table, in its order
+    rows = dict((p, []) for p in table['profile'])
+    for s in stats.itertuples(index=False):
+        rows.setdefault(s[0], []).append(tuple(s[1:]))
+    return [rows[p] for p in table['profile']]
+
+#%%
+def profiles_at(path, lon, lat, start=None, end=None, kind=None, margin=0.0):
+    """
+    Profiles whose bounding box, widened by margin degrees, holds the point lon, lat and whose time span overlaps
+    start to end when they are given (timestamps or 'YYYY-MM-DD' text)
+    """
+    query = ("SELECT p.* FROM profile_index i JOIN profiles p ON p.profile_id = i.profile_id "
+             "WHERE i.min_lon <= ? AND i.max_lon >= ? AND i.min_lat <= ? AND i.max_lat >= ?")
+    args = [lon + margin, lon - margin, lat + margin, lat - margin]
+    if kind is not None:
+        query += " AND p.kind = ?"
+        args.append(kind)
+    query, args = _time_filter(query, args, start, end, 'p.')
+    conn = connect(path)
+    try:
+        return pd.read_sql_query(query + " ORDER BY p.start_time, p.reach, p.kind, p.profile", conn, params=args)
+    finally:
+        conn.close()
+
+def reaches_between(path, start=None, end=None):
+    """
+    Runs whose time span overlaps start to end
+    """
+    query, args = _time_filter("SELECT * FROM runs WHERE 1", [], start, end, '')
+    conn = connect(path)
+    try:
+        return pd.read_sql_query(query + " ORDER BY start_time, reach", conn, params=args)
+    finally:
+        conn.close()
+
+def _time_filter(query, args, start, end, prefix):
+    # Overlap of the span with start to end; a day given alone runs to its end
+    if start is not None:
+        query += " AND " + prefix + "end_time >= ?"
+        args.append(_time(start))
+    if end is not None:
+        end = pd.Timestamp(end)
+        if end == end.normalize():
+            end += pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+        query += " AND " + prefix + "start_time <= ?"
+        args.append(_time(end))
+    return query, args
+
+#%%
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look up processed reaches and profiles in the survey catalog")
+    parser.add_argument('catalog', help="catalog database (OASIS_CATALOG.sqlite)")
+    parser.add_argument('--at', nargs=2, type=float, metavar=('LON', 'LAT'),
+                        help="list the profiles whose bounding box holds this point")
+    parser.add_argument('--margin', type=float, default=0.0, help="degrees added around the --at point")
+    parser.add_argument('--kind', choices=('res', 'wq'), default=None, help="only resistivity or water-quality files")
+    parser.add_argument('--reaches', action='store_true', help="list the reaches instead of the profiles")
+    parser.add_argument('--from', dest='start', default=None, help="surveyed on or after this date")
+    parser.add_argument('--to', dest='end', default=None, help="surveyed on or before this date")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.catalog):
+        print('No catalog at ' + args.catalog)
+        return 1
+    if args.reaches or args.at is None:
+        found = reaches_between(args.catalog, args.start, args.end)
+        columns = ['reach', 'start_time', 'end_time', 'res_points', 'wq_points', 'directory']
+    else:
+        found = profiles_at(args.catalog, args.at[0], args.at[1], args.start, args.end, args.kind, args.margin)
+        columns = ['reach', 'kind', 'profile', 'start_time', 'end_time', 'points', 'filename']
+    if not len(found):
+        print('Nothing found')
+        return 1
+    print(found[columns].to_string(index=False))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Along-track binning of processed survey data into a smaller import file.
+
+Each line (File, or Profile in a Workbench table) is cut into bins of a fixed length of Cum_dist, or a fixed number of
+seconds of GPS time, and every bin becomes one row. The channels are averaged, step distances such as Cor_Dist are
+added up so the binned track is as long as the original, and text columns keep the value of the first record in the
+bin. Bin_start and Bin_count give the start of each bin (m, or seconds after midnight UTC) and the records in it; with
+the default statistics the median and the number of values of every channel are added as <column>_median and
+<column>_count.
+
+All channels are reduced together: the records are put in bin order once, the sums and counts come from one
+np.add.reduceat over the whole block of channels, and the medians are picked from each channel sorted on a key of
+its bin and value rank, so the binning costs two sorts a channel whatever the number of bins.
+"""
+#%%
+import numpy as np
+import pandas as pd
+
+from MAP_Missing import numeric_or_none
+from MAP_Sequence import DAY_SECONDS, ROLLOVER_SECONDS, utc_seconds
+
+#%%
+BIN_MODES = ('distance', 'time')
+BIN_MODE = 'distance'
+BIN_STATISTICS = ('median', 'count')    # added to the binned values; () for the values only
+BIN_STEP_COLUMNS = ['Cor_Dist']         # step distances, added up over a bin rather than averaged
+BIN_BLOCK = 32                          # channels reduced at a time, which bounds the memory used
+
+#%%
+def bin_positions(df, by=BIN_MODE, profile='File'):
+    """
+    Position of each record along its line: Cum_dist (m), or GPS time (s after midnight UTC) counted on past midnight
+    """
+    if by == 'distance':
+        return numeric_or_none(df['Cum_dist'])
+    if by != 'time':
+        raise ValueError("Unknown bin mode " + str(by) + ", expected one of " + ", ".join(BIN_MODES))
+    seconds = pd.Series(utc_seconds(numeric_or_none(df['UTC'])))
+    line = df[profile].astype(str).values
+    # A clock that goes back by more than half a day within a line has passed midnight
+    back = seconds.groupby(line).ffill().groupby(line).diff() < -ROLLOVER_SECONDS
+    days = back.astype(int).groupby(line).cumsum()
+    return (seconds + days * DAY_SECONDS).values
+
+#%%
+def _reduce(values, starts, bins, statistics):
+    # Sums, counts and medians over the bins of a block of channels (rows in bin order)
+    if not len(starts):
+        empty = np.empty((0, values.shape[1]))
+        return empty, empty.astype(np.int64), empty
+    present = ~np.isnan(values)
+    count = np.add.reduceat(present, starts, axis=0, dtype=np.int64)
+    total = np.add.reduceat(np.where(present, values, 0), starts, axis=0)
+    total[count == 0] = np.nan
+    median = None
+    if 'median' in statistics:
+        # Each channel sorted on its bin and then its value (NaN last), an exact integer key of bin and value rank
+        rows = np.arange(len(values))
+        ranked = np.empty_like(values)
+        for i in range(values.shape[1]):
+            rank = np.empty(len(values), dtype=np.int64)
+            rank[np.argsort(values[:, i])] = rows
+            ranked[:, i] = values[np.argsort(bins * len(values) + rank), i]
+        columns = np.arange(values.shape[1])
+        low = starts[:, None] + np.maximum(count - 1, 0) // 2
+        high = starts[:, None] + count // 2
+        median = (ranked[low, columns] + ranked[high, columns]) / 2
+    return total, count, median
+
+def bin_survey(df, interval, position, profile='File', statistics=BIN_STATISTICS, steps=BIN_STEP_COLUMNS):
+    """
+    One row per bin of interval along each line of df, at the given position of each record
+
+    Records without a position are left out. The lines keep the order they first appear in and the bins run along
+    each line. statistics picks the extra columns of each channel, from 'median' and 'count'.
+    """
+    if not interval > 0:
+        raise ValueError("The bin interval must be a positive number")
+    position = np.asarray(position, dtype=float)
+    line = pd.factorize(df[profile].astype(str))[0]
+    cell = np.floor(position / interval)
+
+    rows = np.flatnonzero(~np.isnan(cell))
+    rows = rows[np.lexsort((cell[rows], line[rows]))]
+    newBin = (np.diff(line[rows]) != 0) | (np.diff(cell[rows]) != 0)
+    starts = np.flatnonzero(np.concatenate(([True], newBin))) if len(rows) else np.array([], dtype=np.int64)
+    sizes = np.diff(np.append(starts, len(rows)))
+    bins = np.repeat(np.arange(len(starts)), sizes)
+
+    numeric = []
+    binned = {}
+    for column in df.columns:
+        values = None if column == profile else numeric_or_none(df[column])
+        if values is None:
+            binned[column] = df[column].values[rows[starts]]
+        else:
+            numeric.append((column, values))
+    medians = {}
+    counts = {}
+    for first in range(0, len(numeric), BIN_BLOCK):
+        block = numeric[first:first + BIN_BLOCK]
+        # Column-major, so each channel is one contiguous run
+        values = np.asfortranarray(np.column_stack([v[rows] for c, v in block]))
+        total, count, median = _reduce(values, starts, bins, statistics)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+        for i, (column, v) in enumerate(block):
+            binned[column] = total[:, i] if column in steps else mean[:, i]
+            counts[column + '_count'] = count[:, i]
+            if median is not None:
+                medians[column + '_median'] = median[:, i]
+
+    binned['Bin_start'] = cell[rows[starts]] * interval
+    binned['Bin_count'] = sizes
+    columns = list(df.columns) + ['Bin_start', 'Bin_count']
+    if 'median' in statistics:
+        binned.update(medians)
+        columns += [c + '_median' for c, v in numeric]
+    if 'count' in statistics:
+        binned.update(counts)
+        columns += [c + '_count' for c, v in numeric]
+    return pd.DataFrame(binned, columns=columns)
+
+#%%
+def decimate(df, interval, by=BIN_MODE, profile='File', statistics=BIN_STATISTICS):
+    """
+    Bin the lines of processed survey data every interval metres of Cum_dist, or every interval seconds of GPS time
+
+    df must have one row per record (see MAP_Pipeline.merged_records()), or the repeated rows are counted again.
+    """
+    return bin_survey(df, interval, bin_positions(df, by, profile), profile, statistics)
@@ -0,0 +1,254 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Robust despiking of the resistivity channels, depth and altitude.
+
+Two kinds of outlier are removed from each channel, within each profile:
+
+    SPIKE   a record further than DESPIKE_THRESHOLD scaled MADs from the median of the DESPIKE_WINDOW records around
+            it (a Hampel filter), replaced by that median. The scale is the rolling median of the absolute
+            deviations from the rolling median.
+    JUMP    a step away from the track onto a plateau and back again JUMP_MIN_LENGTH to JUMP_LENGTH records later,
+            as the altitude and depth do when the boat passes under a bridge. The first differences of a channel are
+            scaled by their median absolute deviation (MAD); a step of more than JUMP_THRESHOLD scaled MADs followed
+            by one of the opposite sign that brings the channel back to within half the step marks the records
+            between them, provided their median sits at least half the step away from the level before it. These
+            are replaced by a straight line between the records either side.
+
+The spikes are removed first, so two unrelated spikes cannot pass for the edges of a jump. An excursion of fewer
+than half a window of records mostly goes with them, as the rolling median does not follow it.
+
+Changes of less than DESPIKE_MIN_CHANGE of the local level are never outliers, and no scale is taken below the
+resolution of its channel (the smallest change the channel records, one quantum of a channel logged to fixed
+decimals such as Depth), so flat, quantized stretches whose MAD is zero do not flag every step of a quantum.
+
+All channels of all profiles are filtered together. The profiles are laid out one after another with half a window
+of empty records between them, so one centred rolling median (a skiplist, O(n log w)) of the whole block never mixes
+two profiles. The rolling medians use bottleneck's double-heap move_median when bottleneck is installed, and the
+pandas skiplist otherwise. Each record gets a bitmask of the channels that had a spike (Spike_Mask) and of those
+inside a jump (Jump_Mask), bit k for the k-th of the channels filtered.
+"""
+#%%
+import warnings
+
+import numpy as np
+import pandas as pd
+try:
+    from bottleneck import move_median
+except ImportError:
+    move_median = None
+
+from MAP_Missing import float_columns
+from MAP_Rho import RHO_COLUMNS
+
+#%%
+DESPIKE_COLUMNS = RHO_COLUMNS + ['Depth', 'Altitude']
+MASK_COLUMNS = ['Spike_Mask', 'Jump_Mask']
+
+DESPIKE_OK = 0
+DESPIKE_SPIKE = 1
+DESPIKE_JUMP = 2
+
+DESPIKE_WINDOW = 21         # records in the centred Hampel window
+DESPIKE_THRESHOLD = 4.0     # scaled MADs from the rolling median; at 3 a 21-record MAD flags 1.5 % of plain noise
+DESPIKE_MIN_CHANGE = 0.01   # fraction of the local level below which a change is never an outlier
+JUMP_THRESHOLD = 6.0        # scaled MADs of the first differences
+JUMP_LENGTH = 100           # most records between a jump and its return
+JUMP_MIN_LENGTH = 3         # fewest records between a jump and its return
+JUMP_RETURN = 0.5           # fraction of the step the channel must come back to within, and the plateau reach
+MAD_SCALE = 1.4826          # MAD to standard deviation of normally distributed noise
+RESOLUTION_DECIMALS = 9     # decimals the steps are rounded to when finding a channel's resolution
+
+#%%
+def profile_runs(profile):
+    """
+    Run number of each record, counting up each time the profile changes from the record before
+    """
+    profile = np.asarray(profile)
+    if not len(profile):
+        return np.array([], dtype=np.int64)
+    return np.concatenate(([0], np.cumsum(profile[1:] != profile[:-1])))
+
+def rolling_median(values, run, window=DESPIKE_WINDOW):
+    """
+    Centred rolling median of each column of values (records by channels) over window records of the same run,
+    ignoring missing values
+    """
+    values = np.asarray(values, dtype=float)
+    if not len(values):
+        return values.copy()
+    # Half a window of empty records between runs keeps every window inside one run
+    half = window // 2
+    position = np.arange(len(values)) + half * np.asarray(run)
+    padded = np.full((position[-1] + 1 + half, values.shape[1]), np.nan)
+    padded[position] = values
+    if move_median is not None:
+        # A trailing window, so the centred median of a record is half a window further on
+        return move_median(padded, window, min_count=1, axis=0)[position + half]
+    return pd.DataFrame(padded).rolling(window, center=True, min_periods=1).median().values[position]
+
+#%%
+def channel_resolution(values, run, decimals=RESOLUTION_DECIMALS):
+    """
+    Smallest change between consecutive records of each column of values (records by channels) within a run, 0 for
+    a column that never changes
+
+    For a channel logged to a fixed number of decimals, such as Depth, this is one quantum of it.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        return np.zeros(values.shape[1])
+    step = np.round(np.abs(np.diff(values, axis=0)), decimals)
+    with np.errstate(invalid='ignore'):
+        step[~(step > 0) | (run[1:] != run[:-1])[:, None]] = np.inf
+    smallest = step.min(axis=0)
+    smallest[np.isinf(smallest)] = 0.0
+    return smallest
+
+def _counting(lengths):
+    # 0, 1, .. n - 1 for each n of lengths, one after another
+    lengths = np.asarray(lengths, dtype=np.int64)
+    return np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+#%%
+def hampel(values, run, window=DESPIKE_WINDOW, threshold=DESPIKE_THRESHOLD, min_change=DESPIKE_MIN_CHANGE,
+           resolution=0.0):
+    """
+    Values with the spikes replaced by the rolling median, and where the spikes were
+
+    The scale of each channel is never taken below its resolution.
+    """
+    median = rolling_median(values, run, window)
+    deviation = np.abs(values - median)
+    scale = np.maximum(MAD_SCALE * rolling_median(deviation, run, window), resolution)
+    with np.errstate(invalid='ignore'):
+        spikes = deviation > np.maximum(threshold * scale, min_change * np.abs(median))
+    return np.where(spikes, median, values), spikes
+
+def find_jumps(values, run, threshold=JUMP_THRESHOLD, max_length=JUMP_LENGTH, min_change=DESPIKE_MIN_CHANGE,
+               resolution=0.0):
+    """
+    Values with each jump and return replaced by a straight line, and the records inside the jumps
+
+    The edges of all channels (steps of more than threshold scaled MADs, the scale never below the channel's
+    resolution) are numbered one channel after another, and the return of each is the first edge of opposite sign
+    JUMP_MIN_LENGTH to max_length records on in the same run that brings the channel back; the candidates of every
+    edge come from one np.searchsorted among the edges of the other sign. Only the edges that have a return are then
+    walked in order, so that an edge inside a jump already found does not start another, and a return is taken only
+    when the median of the records between sits on a plateau at least JUMP_RETURN of the step away from the level
+    before the edge.
+    """
+    values = np.array(values, dtype=float)
+    run = np.asarray(run)
+    jumps = np.zeros(values.shape, dtype=bool)
+    count = len(values)
+    if count < 3:
+        return values, jumps
+    step = np.diff(values, axis=0)
+    step[run[1:] != run[:-1]] = np.nan
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        # A channel without a single step has an all-NaN median and no edges
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mad = np.nanmedian(np.abs(step - np.nanmedian(step, axis=0)), axis=0)
+        scale = np.maximum(MAD_SCALE * mad, resolution)
+        # Step k is the change from record k to record k + 1
+        channel, k = np.nonzero((np.abs(step) > np.maximum(threshold * scale, min_change * np.abs(values[:-1]))).T)
+    key = channel * count + k
+    group = channel * (run[-1] + 1) + run[k]
+    sign = np.sign(step[k, channel])
+
+    # Every (edge, return candidate) pair, in order of edge and then candidate
+    edge = []
+    back = []
+    for s in (1, -1):
+        this = np.flatnonzero(sign == s)
+        other = np.flatnonzero(sign == -s)
+        first = np.searchsorted(key[other], key[this] + JUMP_MIN_LENGTH)
+        candidates = np.searchsorted(key[other], key[this] + max_length, 'right') - first
+        edge.append(np.repeat(this, candidates))
+        back.append(other[np.repeat(first, candidates) + _counting(candidates)])
+    edge = np.concatenate(edge)
+    back = np.concatenate(back)
+    order = np.lexsort((key[back], edge))
+    edge = edge[order]
+    back = back[order]
+    a = k[edge]
+    b = k[back]
+    c = channel[edge]
+    with np.errstate(invalid='ignore'):
+        returns = (group[back] == group[edge]) & (np.abs(values[b + 1, c] - values[a, c]) < JUMP_RETURN * np.abs(step[a, c]))
+    edge = edge[returns]
+    back = back[returns]
+
+    # The first return of each edge over a plateau, without the jumps that start inside an earlier one
+    taken = np.zeros(len(edge), dtype=bool)
+    end = -1
+    for n in range(len(edge)):
+        start = key[edge[n]]
+        if start <= end:
+            continue
+        a = k[edge[n]]
+        c = channel[edge[n]]
+        with warnings.catch_warnings():
+            # Records between that are all missing have no level, and no plateau
+            warnings.simplefilter('ignore', RuntimeWarning)
+            level = np.nanmedian(values[a + 1:k[back[n]] + 1, c])
+        if (level - values[a, c]) * np.sign(step[a, c]) >= JUMP_RETURN * np.abs(step[a, c]):
+            taken[n] = True
+            end = key[back[n]]
+    a = k[edge[taken]]
+    b = k[back[taken]]
+    c = channel[edge[taken]]
+
+    # Records a + 1 to b of each jump, on the straight line from record a to record b + 1
+    length = b - a
+    row = np.repeat(a, length) + 1 + _counting(length)
+    column = np.repeat(c, length)
+    slope = (values[b + 1, c] - values[a, c]) / (length + 1)
+    values[row, column] = np.repeat(slope, length) * (row - np.repeat(a, length)) + np.repeat(values[a, c], length)
+    jumps[row, column] = True
+    return values, jumps
+
+#%%
+def despike(values, profile, window=DESPIKE_WINDOW, threshold=DESPIKE_THRESHOLD, jump_threshold=JUMP_THRESHOLD,
+            jump_length=JUMP_LENGTH):
+    """
+    Remove the spikes and then the jumps from each column of values (records by channels) within each profile
+
+    Returns the cleaned values and the DESPIKE_SPIKE / DESPIKE_JUMP flags of every sample.
+    """
+    run = profile_runs(profile)
+    resolution = channel_resolution(values, run)
+    values, spikes = hampel(values, run, window, threshold, resolution=resolution)
+    cleaned, jumps = find_jumps(values, run, jump_threshold, jump_length, resolution=resolution)
+    flags = np.where(spikes, DESPIKE_SPIKE, DESPIKE_OK).astype(np.uint8)
+    flags[jumps] |= DESPIKE_JUMP
+    return cleaned, flags
+
+def despike_frame(df, columns=DESPIKE_COLUMNS, profile='File', **kwargs):
+    """
+    despike() the columns of df, one line of the survey at a time
+    """
+    values = float_columns(df, columns)
+    return despike(values, df[profile].values, **kwargs)
+
+def add_despike_columns(df, columns, cleaned, flags):
+    """
+    Add the cleaned values as <column>_despiked and the per-record channel bitmasks Spike_Mask and Jump_Mask to df
+    """
+    for k, column in enumerate(columns):
+        df[column + '_despiked'] = cleaned[:, k]
+    bits = np.left_shift(1, np.arange(len(columns), dtype=np.int64))
+    df['Spike_Mask'] = ((flags & DESPIKE_SPIKE) != 0).astype(np.int64).dot(bits)
+    df['Jump_Mask'] = ((flags & DESPIKE_JUMP) != 0).astype(np.int64).dot(bits)
+    return df
+
+def describe_despike(flags, columns=DESPIKE_COLUMNS):
+    """
+    Count of spikes and of records inside jumps in each channel
+    """
+    return dict((c, (int(((flags[:, k] & DESPIKE_SPIKE) != 0).sum()), int(((flags[:, k] & DESPIKE_JUMP) != 0).sum())))
+                for k, c in enumerate(columns))
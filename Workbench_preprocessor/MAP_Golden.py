@@ -0,0 +1,430 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Golden-output equivalence check of the preprocessor against its reference implementation.
+
+Each reach is processed twice, into <output>/<reach>/golden and <output>/<reach>/current:
+
+    golden      the original row-by-row oasis(), workbench() and workbench_checks() (see MAP_Legacy); with
+                --reference pipeline, run_oasis() with its default options instead; with --golden, the outputs an
+                earlier run left in <golden>/<reach> (a recorded reach processed by the field version, say)
+    current     run_oasis(), format_workbench() and check_workbench(), with the options given by --set
+
+Against the original the current run orders the surveys geometrically and removes overlaps with the box test, as the
+original did (LEGACY_OPTIONS, which --set overrides).
+
+The resistivity, water-quality, merged and Workbench import tables of the two are then compared column by column.
+Rows are matched on the raw file and record time (the keys of each table in TABLES, numbered in order where a key
+repeats) rather than by position, so a record one side dropped shows as a record missing from the other instead of
+shifting every row after it. The renamed files in Filename are replaced by the raw files they were copied from,
+through the renamed file directories each run writes to Raw_Data_Renamed, so the survey order does not change the
+keys; the Workbench import table has a row for each row of the merged table and is matched on that row's keys.
+Numbers match within RTOL and ATOL (missing values, and the '*' written for them, match each other), text exactly,
+file paths by their name. The findings of the Workbench checks are compared as lists of messages.
+
+Every column is assigned the stage that computes it (ADDED_COLUMNS by name, then STAGE_COLUMNS by prefix): File
+numbering, Cor_Dist, Final_Rho_n and the other outputs of each table, with the records only one side kept counted
+under overlap removal and the differing findings under QA findings. The columns of ADDED_COLUMNS that only the current
+run writes are reported as added rather than as mismatches. GOLDEN_RESULTS.csv lists each column compared and
+GOLDEN_SUMMARY.csv the mismatches of each stage of each reach; the exit status is 1 when anything differs.
+
+    python MAP_Golden.py                                        # synthetic reaches against the original
+    python MAP_Golden.py D:\\Season2018\\Gasconade --rows 0      # a recorded reach only
+    python MAP_Golden.py --reference pipeline --set memory_budget=1   # the low-memory path against the default
+"""
+#%%
+import argparse
+import ast
+import glob
+import logging
+import os
+import re
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+from MAP_Batch import find_reach
+from MAP_Despike import DESPIKE_COLUMNS, MASK_COLUMNS
+from MAP_Legacy import legacy_oasis, legacy_workbench, legacy_workbench_checks
+from MAP_Missing import MISSING, numeric_or_none
+from MAP_Pipeline import PreprocessingError, run_oasis, format_workbench, check_workbench
+from MAP_Rho import CHECK_COLUMNS
+from MAP_Station import STATION_COLUMNS
+from MAP_Synthetic import write_reach
+
+#%%
+GOLDEN_FOLDER = 'golden'
+CURRENT_FOLDER = 'current'
+FINDINGS_FILE = 'WORKBENCH_FINDINGS.txt'
+REFERENCES = ('legacy', 'pipeline')
+SYNTHETIC_ROWS = 3000       # records in each synthetic reach; the original takes about half a minute on this many
+SYNTHETIC_FILES = 6
+RTOL = 1e-6                 # relative tolerance of numeric columns
+ATOL = 1e-6                 # absolute tolerance, in the units of the column
+
+RAW_FOLDER = 'Raw_Data_Renamed'
+RENAMED_DIRECTORIES = ['RENAMED_RESISTIVITY_FILE_DIRECTORY.txt', 'RENAMED_WQ_FILE_DIRECTORY.txt']
+
+# run_oasis() options of the current run against the original
+LEGACY_OPTIONS = {'sequence': 'geometry', 'overlap': 'box'}
+
+# Output tables: file name after the river name and the columns their records are matched on
+TABLES = [('res', '_Res.csv', ['Filename', 'UTC']),
+          ('wq', '_WQ.csv', ['Filename', 'Date', 'Time']),
+          ('merged', '_Merged_WQRes.csv', ['Filename', 'UTC']),
+          ('workbench', '_WorkbenchImport.csv', ['Filename', 'UTC'])]
+KEY_TABLES = {'workbench': 'merged'}    # tables matched on the keys of the same rows of another
+
+# Columns the pipeline writes that the original does not, by stage
+ADDED_COLUMNS = [('GPS flags', ['GPS_Flag']),
+                 ('Rho checks', CHECK_COLUMNS),
+                 ('stationing', STATION_COLUMNS),
+                 ('despiking', [c + '_despiked' for c in DESPIKE_COLUMNS] + MASK_COLUMNS)]
+PASSED = ('match', 'added')
+
+# Stage of a column by the start of its name; the rest belong to their table's other outputs
+STAGE_COLUMNS = [('File numbering', ('File', 'Profile')),
+                 ('Cor_Dist', ('Cor_Dist', 'Cum_dist')),
+                 ('Final_Rho_n', ('Final_Rho_', 'Rho_'))]
+OVERLAP_STAGE = 'overlap removal'
+FINDINGS_STAGE = 'QA findings'
+
+RESULT_COLUMNS = ['reach', 'stage', 'table', 'column', 'status', 'rows', 'mismatches', 'max_abs_diff', 'first_key',
+                  'golden_value', 'current_value']
+
+#%%
+def column_stage(table, column):
+    """
+    Stage that computes column of table
+    """
+    for stage, columns in ADDED_COLUMNS:
+        if column in columns:
+            return stage
+    for stage, prefixes in STAGE_COLUMNS:
+        if column in prefixes or any(column.startswith(p) and p.endswith('_') for p in prefixes):
+            return stage
+    return table + ' outputs'
+
+def _file_name(value):
+    # The file name of a path written on either Windows or Linux
+    return re.split(r'[\\/]', value)[-1] if isinstance(value, str) else value
+
+def is_added(column):
+    """
+    Whether column is one the pipeline writes and the original does not
+    """
+    return any(column in columns for stage, columns in ADDED_COLUMNS)
+
+def column_text(series, column):
+    """
+    Text of a column for exact comparison, file paths by their name and missing values as ''
+    """
+    text = series.where(series.notnull() & (series.astype(str) != MISSING), '').astype(str)
+    if column.startswith('Filename') or column.endswith('Filename'):
+        text = text.map(_file_name)
+    return text.values
+
+#%%
+def match_rows(golden, current, keys):
+    """
+    Positions of the rows of golden and current with the same key (-1 where only the other has it)
+
+    A key that repeats is numbered in order, so the n-th record of a file at a time matches the n-th of the other.
+    """
+    keys = [k for k in keys if k in golden.columns and k in current.columns]
+
+    def keyed(frame):
+        table = pd.DataFrame(index=np.arange(len(frame)))
+        for k in keys:
+            # Numbers as numbers, so 1 and 1.0 are the same key
+            numbers = numeric_or_none(frame[k])
+            table[k] = ['{:.6f}'.format(v) for v in numbers] if numbers is not None else column_text(frame[k], k)
+        table['_n'] = table.groupby(keys).cumcount() if keys else np.arange(len(frame))
+        table['_row'] = np.arange(len(frame))
+        return table
+
+    both = keyed(golden).merge(keyed(current), how='outer', on=keys + ['_n'], suffixes=('_golden', '_current'))
+    both = both.sort_values(['_row_current', '_row_golden'])
+    rows = both[['_row_golden', '_row_current']].fillna(-1).astype(np.int64)
+    keyText = both[keys + ['_n']].astype(str).apply(' '.join, axis=1)
+    return rows['_row_golden'].values, rows['_row_current'].values, keyText.values
+
+def compare_column(golden, current, column, keyText, rtol=RTOL, atol=ATOL):
+    """
+    Mismatch count, largest numeric difference and first differing (key, golden, current) of two aligned columns
+    """
+    a = numeric_or_none(golden)
+    b = numeric_or_none(current)
+    if a is not None and b is not None:
+        with np.errstate(invalid='ignore'):
+            same = np.isclose(a, b, rtol=rtol, atol=atol, equal_nan=True)
+            diff = np.abs(a - b)
+        largest = float(np.nanmax(np.where(same, np.nan, diff))) if (~same & np.isfinite(diff)).any() else None
+        shown = (a, b)
+    else:
+        a = column_text(golden, column)
+        b = column_text(current, column)
+        same = a == b
+        largest = None
+        shown = (a, b)
+    wrong = np.flatnonzero(~same)
+    if not len(wrong):
+        return 0, None, None
+    k = wrong[0]
+    return len(wrong), largest, (keyText[k], shown[0][k], shown[1][k])
+
+def compare_tables(reach, table, golden, current, keys, rtol=RTOL, atol=ATOL, key_frames=None):
+    """
+    Result records of every column of one output table, and one for the records only one side has
+
+    The rows are matched on the keys of golden and current, or of the pair of frames key_frames with the same rows.
+    """
+    records = []
+    keyed = key_frames or (golden, current)
+    g, c, keyText = match_rows(keyed[0], keyed[1], keys)
+    paired = (g >= 0) & (c >= 0)
+    onlyGolden = int((c < 0).sum())
+    onlyCurrent = int((g < 0).sum())
+    records.append({'reach': reach, 'stage': OVERLAP_STAGE, 'table': table, 'column': '(records)',
+                    'status': 'match' if not onlyGolden and not onlyCurrent else 'mismatch',
+                    'rows': int(paired.sum()), 'mismatches': onlyGolden + onlyCurrent,
+                    'golden_value': '{} golden only'.format(onlyGolden),
+                    'current_value': '{} current only'.format(onlyCurrent)})
+    goldenRows = golden.iloc[g[paired]].reset_index(drop=True)
+    currentRows = current.iloc[c[paired]].reset_index(drop=True)
+    for column in list(golden.columns) + [x for x in current.columns if x not in golden.columns]:
+        record = {'reach': reach, 'stage': column_stage(table, column), 'table': table, 'column': column,
+                  'rows': int(paired.sum())}
+        if column not in current.columns:
+            record.update({'status': 'golden only', 'mismatches': len(golden)})
+        elif column not in golden.columns and is_added(column):
+            record.update({'status': 'added', 'mismatches': 0})
+        elif column not in golden.columns:
+            record.update({'status': 'current only', 'mismatches': len(current)})
+        else:
+            count, largest, first = compare_column(goldenRows[column], currentRows[column], column,
+                                                   keyText[paired], rtol, atol)
+            record.update({'status': 'mismatch' if count else 'match', 'mismatches': count, 'max_abs_diff': largest})
+            if first is not None:
+                record.update({'first_key': first[0], 'golden_value': first[1], 'current_value': first[2]})
+        records.append(record)
+    return records
+
+def compare_findings(reach, golden, current):
+    """
+    Result record of the Workbench check findings, compared as lists of messages
+    """
+    missing = list(golden)
+    extra = []
+    for message in current:
+        if message in missing:
+            missing.remove(message)
+        else:
+            extra.append(message)
+    return {'reach': reach, 'stage': FINDINGS_STAGE, 'table': 'workbench', 'column': '(findings)',
+            'status': 'match' if not missing and not extra else 'mismatch', 'rows': len(golden),
+            'mismatches': len(missing) + len(extra),
+            'golden_value': missing[0] if missing else None, 'current_value': extra[0] if extra else None}
+
+#%%
+def source_files(folder):
+    """
+    File name of the raw file each renamed survey file of a run was copied from, by the renamed file name
+    """
+    sources = {}
+    for name in RENAMED_DIRECTORIES:
+        path = os.path.join(folder, RAW_FOLDER, name)
+        if os.path.isfile(path):
+            directory = pd.read_csv(path)
+            sources.update(zip(column_text(directory['NewFilename'], 'NewFilename'),
+                               column_text(directory['Filename'], 'Filename')))
+        else:
+            logging.warning("No " + name + " in " + folder + ", its records are matched on the renamed files\n")
+    return sources
+
+def with_sources(frame, sources):
+    """
+    frame with the renamed files in its Filename column replaced by the raw files they were copied from
+    """
+    if 'Filename' in frame.columns:
+        renamed = column_text(frame['Filename'], 'Filename')
+        frame['Filename'] = [sources.get(name, name) for name in renamed]
+    return frame
+
+def read_findings(folder):
+    path = os.path.join(folder, FINDINGS_FILE)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+def write_workbench(folder, river, data, legacy=False):
+    """
+    Format the merged table for Workbench and check it as the GUI does, writing the table and the findings to folder
+    """
+    out = legacy_workbench(data) if legacy else format_workbench(data)
+    findings = legacy_workbench_checks(out) if legacy else [message for message, log in check_workbench(out)]
+    out.to_csv(os.path.join(folder, river + '_WorkbenchImport.csv'), index=False)
+    with open(os.path.join(folder, FINDINGS_FILE), 'w') as f:
+        f.writelines(message + '\n' for message in findings)
+
+def _run(job, folder, legacy=False, options=None):
+    # Copy the input folders so the all.txt each run writes next to the resistivity files is its own
+    if os.path.isdir(folder):
+        shutil.rmtree(folder)
+    inputs = os.path.join(folder, 'input')
+    res_folder = os.path.join(inputs, 'Resistivity')
+    wq_folder = os.path.join(inputs, 'WQ')
+    shutil.copytree(job['res_folder'], res_folder)
+    if os.path.abspath(job['wq_folder']) == os.path.abspath(job['res_folder']):
+        wq_folder = res_folder
+    else:
+        shutil.copytree(job['wq_folder'], wq_folder)
+    for f in glob.glob(os.path.join(res_folder, 'all.txt')):
+        os.remove(f)
+    if legacy:
+        legacy_oasis(job['river'], res_folder, wq_folder, job['ini_file'], folder)
+    else:
+        run_oasis(job['river'], res_folder, wq_folder, job['ini_file'], folder, catalog=False, **(options or {}))
+    write_workbench(folder, job['river'], pd.read_csv(os.path.join(folder, job['river'] + '_Merged_WQRes.csv')),
+                    legacy)
+    shutil.rmtree(inputs)
+
+def compare_reach(job, output, reference='legacy', options=None, golden=None, rtol=RTOL, atol=ATOL):
+    """
+    Process one reach both ways (or use the golden outputs given) and compare every output table
+
+    Against the original the current run takes LEGACY_OPTIONS under the options given.
+    """
+    folder = os.path.join(output, job['reach'])
+    goldenFolder = golden or os.path.join(folder, GOLDEN_FOLDER)
+    currentFolder = os.path.join(folder, CURRENT_FOLDER)
+    if golden is None:
+        print('Running the {} reference on {}'.format(reference, job['reach']))
+        _run(job, goldenFolder, legacy=reference == 'legacy')
+    if reference == 'legacy':
+        options = dict(LEGACY_OPTIONS, **(options or {}))
+    print('Running the pipeline on ' + job['reach'])
+    _run(job, currentFolder, options=options)
+
+    records = []
+    sources = [source_files(f) for f in (goldenFolder, currentFolder)]
+    tables = {}
+    for table, suffix, keys in TABLES:
+        paths = [os.path.join(f, job['river'] + suffix) for f in (goldenFolder, currentFolder)]
+        if not os.path.isfile(paths[0]):
+            logging.warning("No golden " + table + " table for " + job['reach'] + "\n")
+            continue
+        frames = tables[table] = [with_sources(pd.read_csv(p, low_memory=False), s) for p, s in zip(paths, sources)]
+        keyFrames = tables.get(KEY_TABLES.get(table))
+        if keyFrames is not None and [len(f) for f in keyFrames] != [len(f) for f in frames]:
+            logging.warning("The " + table + " tables of " + job['reach'] + " do not have a row for each " +
+                            KEY_TABLES[table] + " row, their rows are matched in order\n")
+            keyFrames = None
+        records.extend(compare_tables(job['reach'], table, frames[0], frames[1], keys, rtol, atol, keyFrames))
+    findings = read_findings(goldenFolder)
+    if findings is not None:
+        records.append(compare_findings(job['reach'], findings, read_findings(currentFolder)))
+    return records
+
+#%%
+def summarize(results):
+    """
+    Columns compared and mismatches of each stage of each reach
+    """
+    results = results.assign(failed=(~results['status'].isin(PASSED)).astype(int),
+                             mismatches=results['mismatches'].fillna(0).astype(int))
+    summary = results.groupby(['reach', 'stage'], sort=False).agg({'column': 'count', 'failed': 'sum',
+                                                                   'mismatches': 'sum'})
+    summary.columns = ['columns', 'mismatched_columns', 'mismatches']
+    return summary.reset_index()
+
+def run_golden(jobs, output, reference='legacy', options=None, golden=None, rtol=RTOL, atol=ATOL):
+    """
+    Compare every reach and write GOLDEN_RESULTS.csv and GOLDEN_SUMMARY.csv to output
+    """
+    records = []
+    for job in jobs:
+        try:
+            records.extend(compare_reach(job, output, reference, options,
+                                         os.path.join(golden, job['reach']) if golden else None, rtol, atol))
+        except PreprocessingError as e:
+            logging.error(job['reach'] + ": " + e.title + ": " + str(e) + "\n")
+            records.append({'reach': job['reach'], 'stage': 'run', 'table': '', 'column': '', 'status': 'failed',
+                            'mismatches': 1, 'golden_value': str(e)})
+    results = pd.DataFrame(records, columns=RESULT_COLUMNS)
+    results.to_csv(os.path.join(output, 'GOLDEN_RESULTS.csv'), index=False)
+    summary = summarize(results)
+    summary.to_csv(os.path.join(output, 'GOLDEN_SUMMARY.csv'), index=False)
+    return results, summary
+
+def _option(text):
+    name, _, value = text.partition('=')
+    try:
+        return name, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return name, value
+
+#%%
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the preprocessor's outputs with those of its reference")
+    parser.add_argument('reaches', nargs='*', help="recorded reach folders to compare, as MAP_Batch finds them")
+    parser.add_argument('--rows', type=int, default=SYNTHETIC_ROWS,
+                        help="records of each synthetic reach (0 for none)")
+    parser.add_argument('--files', type=int, default=SYNTHETIC_FILES, help="survey lines of each synthetic reach")
+    parser.add_argument('--seeds', type=int, nargs='*', default=[0], help="one synthetic reach per seed")
+    parser.add_argument('--reference', choices=REFERENCES, default='legacy',
+                        help="original implementation, or the pipeline with its default options")
+    parser.add_argument('--golden', default=None,
+                        help="folder of earlier outputs, one subfolder per reach, used instead of running the reference")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help="run_oasis() option of the current run, eg. memory_budget=1 or despike=True")
+    parser.add_argument('--rtol', type=float, default=RTOL)
+    parser.add_argument('--atol', type=float, default=ATOL)
+    parser.add_argument('--output', default=os.path.join(os.getcwd(), 'golden'),
+                        help="folder for the results and both runs of each reach")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    logging.basicConfig(filename=os.path.join(args.output, 'GOLDEN_LOGFILE.txt'),
+                        format='%(asctime)s %(levelname)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p',
+                        filemode='w', level=logging.INFO)
+    jobs = []
+    if args.rows:
+        for seed in args.seeds:
+            name = 'SYNTH_{}x{}_{}'.format(args.rows, args.files, seed)
+            reach = write_reach(os.path.join(args.output, 'synthetic', name), rows=args.rows, files=args.files,
+                                seed=seed)
+            jobs.append({'reach': name, 'river': 'SYNTH', 'res_folder': reach['res_folder'],
+                         'wq_folder': reach['wq_folder'], 'ini_file': reach['ini_file']})
+    for folder in args.reaches:
+        found = find_reach(folder)
+        if found is None:
+            print('No resistivity, water-quality or INI files found in ' + folder)
+            return 1
+        name = os.path.basename(os.path.abspath(folder))
+        jobs.append({'reach': name, 'river': name, 'res_folder': found[0], 'wq_folder': found[1],
+                     'ini_file': found[2]})
+    if not jobs:
+        print('No reaches to compare')
+        return 1
+
+    results, summary = run_golden(jobs, args.output, args.reference, dict(_option(s) for s in args.set),
+                                  args.golden, args.rtol, args.atol)
+    print(summary.to_string(index=False))
+    failed = results[~results['status'].isin(PASSED)]
+    if len(failed):
+        print('\n' + failed[['reach', 'stage', 'table', 'column', 'mismatches', 'max_abs_diff', 'first_key']]
+              .to_string(index=False))
+        return 1
+    print('\nEvery output matches')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,532 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+The original row-by-row Oasis and Workbench preprocessor, kept as the reference the pipeline is compared with.
+
+legacy_oasis(), legacy_workbench() and legacy_workbench_checks() are the oasis(), workbench() and workbench_checks()
+of the 4/18/2018 MAP_Preprocessing_GUI.py with only what needs a person taken out: the dialogs are arguments, the
+message boxes are returned as findings or raised as a PreprocessingError, paths are joined with os.path.join rather
+than "\\", and only the tables and the renamed file directories are written (no shapefiles, summary or data
+release). The water-quality files are imported with the columns the original read them with to find their ends, as
+its import list had lost C-uS/cm and shifted Lat and Lon by a column, and the two message typos that stopped
+workbench_checks() are fixed as they are in MAP_Pipeline.check_workbench(). Everything else, the loops over rows,
+the box overlap test between consecutive lines and the geopandas projection and join included, is as it was, so
+these are slow and only run by MAP_Golden.
+"""
+#%%
+import glob
+import logging
+import os
+from math import radians, cos, sin, asin, sqrt
+from shutil import copyfile
+
+import numpy as np
+import pandas as pd
+
+from MAP_Pipeline import PreprocessingError
+
+#%%
+LEGACY_RES_COLUMNS = ["Distance", "Depth", "Rho 1", "Rho 2", "Rho 3", "Rho 4", "Rho 5", "Rho 6", "Rho 7", "Rho 8",
+                      "Rho 9", "Rho 10", "C1", "C2", "P1", "P2", "P3", "P4", "P5", "P6", "P7", "P8", "P9", "P10", "P11",
+                      "Latitude", "Longitude", "In_p", "In_n", "V1_p", "V1_n", "V2_p", "V2_n", "V3_p", "V3_n", "V4_p",
+                      "V4_n", "V5_p", "V5_n", "V6_p", "V6_n", "V7_p", "V7_n", "V8_p", "V8_n", "V9_p", "V9_n", "V10_p",
+                      "V10_n", "GPSString", "HDOP", "EXTRANEOUS"]
+LEGACY_RECORD_COLUMNS = ["Distance", "Depth", "Rho 1", "Rho 2", "Rho 3", "Rho 4", "Rho 5", "Rho 6", "Rho 7", "Rho 8",
+                         "Rho 9", "Rho 10", "C1", "C2", "P1", "P2", "P3", "P4", "P5", "P6", "P7", "P8", "P9", "P10",
+                         "P11", "Latitude", "Longitude", "In_p", "In_n", "V1_p", "V1_n", "V2_p", "V2_n", "V3_p", "V3_n",
+                         "V4_p", "V4_n", "V5_p", "V5_n", "V6_p", "V6_n", "V7_p", "V7_n", "V8_p", "V8_n", "V9_p", "V9_n",
+                         "V10_p", "V10_n", "GPSString", "UTC", "Latitude2", "D1", "Longitude2", "D2", "Fix Quality",
+                         "Satellites", "HDOP", "Altitude", "D3", "Height of Geoid", "E1", "E2", "E3", "E4", "E5", "E6",
+                         "E7", "E8", "E9", "E10", "E11"]
+LEGACY_WQ_COLUMNS = ["Date", "Time", u"°C", "mmHg", "DO %", "SPC-uS/cm", "C-uS/cm", "ohm-cm", "pH", "NH4-N mg/L",
+                     "NO3-N mg/L", "Cl mg/L", "FNU", "TSS mg/L", "DEP m", "ALT m", "Lat", "Lon"]
+LEGACY_DATA_COLUMNS = ('Ohm_m', 'Cor_Dist', 'Cor_Depth', 'Final_Rho_1', 'Final_Rho_2', 'Final_Rho_3', 'Final_Rho_4',
+                       'Final_Rho_5', 'Final_Rho_6', 'Final_Rho_7', 'Final_Rho_8', 'Final_Rho_9', 'Final_Rho_10', 'Lat',
+                       'Lon', 'Final_Altitude')
+LEGACY_WORKBENCH_HEADERS = ('/Water_Res', 'Cor_Dist', 'Cor_Depth', 'Rho_1', 'Rho_2', 'Rho_3', 'Rho_4', 'Rho_5',
+                            'Rho_6', 'Rho_7', 'Rho_8', 'Rho_9', 'Rho_10', 'C1', 'C2', 'P1', 'P2', 'P3', 'P4', 'P5',
+                            'P6', 'P7', 'P8', 'P9', 'P10', 'P11', 'Lat', 'Lon', 'Final_Altitude', 'Profile')
+LEGACY_WORKBENCH_COLUMNS = ('Ohm_m', 'Cor_Dist', 'Cor_Depth', 'Final_Rho_1', 'Final_Rho_2', 'Final_Rho_3',
+                            'Final_Rho_4', 'Final_Rho_5', 'Final_Rho_6', 'Final_Rho_7', 'Final_Rho_8', 'Final_Rho_9',
+                            'Final_Rho_10', 'C1', 'C2', 'P1', 'P2', 'P3', 'P4', 'P5', 'P6', 'P7', 'P8', 'P9', 'P10',
+                            'P11', 'Lat', 'Lon', 'Final_Altitude', 'Profile')
+LEGACY_CRS = {'init': 'epsg:32615'}
+
+#%%
+# The filters of the original oasis(), chained assignments and all
+def _band_pass(df, column, min, max):
+    df[column+'_bandpass']=df[column]
+    df[column+'_bandpass'][df[column]<min] = np.nan
+    df[column+'_bandpass'][df[column]>max] = np.nan
+
+def _depth_filt(df, column, offset, factor):
+    df[column+'_filt']=df[column]
+    df[column+'_filt'][df[column]<offset+factor]=np.nan
+
+def _rolling_avg(df, column1, column2, width):
+    df[column1+'_rollavg']=df[column2]
+    df[column1+'_rollavg']= df[column1+'_rollavg'].rolling(width, min_periods=1).mean()
+
+def _rolling_median(df, column1, column2, width):
+    df[column1+'_rollmed']=df[column2]
+    df[column1+'_rollmed']= df[column1+'_rollmed'].rolling(width, min_periods=1).median()
+
+def _haversine(lon1, lat1, lon2, lat2):
+    # convert decimal degrees to radians
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+
+    # haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    r = 6371  # Radius of earth in kilometers. Use 3956 for miles
+    return c * r
+
+def _utm(df):
+    # Converting WGS 84 coordinates to UTM 15N coordiantes
+    import geopandas as gp
+    from shapely.geometry import Point
+
+    geometry = [Point(xy) for xy in zip(df.Lon, df.Lat)]
+    df = gp.GeoDataFrame(df, crs=None, geometry=geometry)
+    df.crs = {'init' :'epsg:4326'}
+    df = df.to_crs(LEGACY_CRS)
+    centroidseries = df['geometry'].centroid
+    x,y = [list(t) for t in zip(*map(lambda pt: (pt.x, pt.y), centroidseries))]
+    df['X_UTM']=x
+    df['Y_UTM']=y
+    return df
+
+def _order(subset, start=None):
+    # Nearest-end ordering of the survey lines; with a start, the first line is the one ending nearest to it,
+    # otherwise the one whose start is farthest from the end of any line
+    if len(subset) <= 2:
+        reorderedSubset = subset
+        reorderedSubset.drop(["StartLat", "EndLat", "StartLong", "EndLong"], axis=1, inplace=True)
+        reorderedSubset["Reverse"] = False
+        return reorderedSubset
+    reorderedSubset = pd.DataFrame(columns=["StartLat", "EndLat", "StartLong", "EndLong", "Filename", "Distance", "Reverse"])
+    subset["Distance"] = 0.00
+    for i, f in enumerate(subset.Filename):
+        if start is None:
+            startLat = subset.loc[i, "StartLat"]
+            startLong = subset.loc[i, "StartLong"]
+            dist = 0
+            # Find the greatest distance between all lines
+            for i2, f2 in enumerate(subset.Filename):
+                endLat = subset.loc[i2, "EndLat"]
+                endLong = subset.loc[i2, "EndLong"]
+                dist = max(dist, _haversine(startLong, startLat, endLong, endLat))
+        else:
+            dist = _haversine(start[1], start[0], subset.loc[i, "EndLong"], subset.loc[i, "EndLat"])
+        subset.at[i, "Distance"] = dist
+    first = subset["Distance"].idxmax() if start is None else subset["Distance"].idxmin()
+    reorderedSubset = reorderedSubset.append(subset.loc[first, :]).reset_index(drop=True)
+    reorderedSubset.loc[len(reorderedSubset) - 1, "Reverse"] = False  # First line shouldn't need reversal
+    subset.drop([first], inplace=True)
+    subset.reset_index(drop=True, inplace=True)
+
+    # Reorder remaining surveys based on distance from the end of previous survey
+    while len(subset) > 0:
+        endLat = reorderedSubset.loc[len(reorderedSubset)-1, "EndLat"]
+        endLong = reorderedSubset.loc[len(reorderedSubset)-1, "EndLong"]
+        subset["Distance"] = 999999999.00
+        subset["ReverseDistance"] = 999999999.00
+        # The next line "starts" closest to the "end" of the previous line
+        for i2, f2 in enumerate(subset.Filename):
+            startLat = subset.loc[i2, "StartLat"]
+            startLong = subset.loc[i2, "StartLong"]
+            subset.at[i2, "Distance"] = _haversine(startLong, startLat, endLong, endLat)
+            subset.at[i2, "ReverseDistance"] = _haversine(subset.loc[i2, "EndLong"], subset.loc[i2, "EndLat"], endLong, endLat)
+
+        # Check to see if next survey section is reversed
+        if min(subset["Distance"]) <= min(subset["ReverseDistance"]):
+            reorderedSubset = reorderedSubset.append(subset.loc[subset["Distance"].idxmin(), :]).reset_index(drop=True)
+            reorderedSubset.loc[len(reorderedSubset) - 1, "Reverse"] = False
+        else:
+            reorderedSubset = reorderedSubset.append(subset.loc[subset["ReverseDistance"].idxmin(), :]).reset_index(drop=True)
+            reorderedSubset.loc[len(reorderedSubset)-1, "Reverse"] = True
+        subset.drop([subset["Distance"].idxmin()], inplace=True)
+        subset.reset_index(drop=True, inplace=True)
+    reorderedSubset.loc[0, "Reverse"] = False  # First line shouldn't need reversal (need to restate)
+    reorderedSubset.drop(["StartLat", "EndLat", "StartLong", "EndLong", "Distance", "ReverseDistance"], axis=1,
+                         inplace=True)
+    return reorderedSubset
+
+def _number(df):
+    # Adding File column to process data in Oasis in chunks
+    df['File']="1"
+    j=1
+    for x in range(1,len(df.Filename)):
+        if df.ix[x,"Filename"]==df.ix[x-1,"Filename"]:
+            df.ix[x,"File"]=df.ix[x-1,"File"]
+
+        elif df.ix[x,"Filename"]!=df.ix[x-1,"Filename"]:
+            j+=1
+            df.ix[x,"File"]=j
+        else:
+            break
+    return df
+
+def _remove_overlap(frame, temp, lat, lon, filename):
+    # Creates a box with the corners being the end of the previous line and start of next line
+    # Removes any of the next line within that box
+    try:
+        # Grab the end coordinates of the previous line
+        pL_lat = frame[lat].iloc[-1]
+        pL_lon = frame[lon].iloc[-1]
+        # ... And the start coordinates of the current line
+        cL_lat = temp.loc[0, lat]
+        cL_lon = temp.loc[0, lon]
+        prevLen = len(temp)
+        temp = temp[(temp[lat] > max(pL_lat, cL_lat)) | (temp[lat] < min(pL_lat, cL_lat)) |
+                    (temp[lon] > max(pL_lon, cL_lon)) | (temp[lon] < min(pL_lon, cL_lon))]
+        if prevLen != len(temp):
+            logging.info(str(prevLen-len(temp)) + " overlapping point(s) removed from file " + filename)
+    except IndexError:
+        # Catches the case where we are looking at the first line - simply skip the removal process
+        pass
+    return temp
+
+#%%
+def legacy_oasis(userRiverName, res_folder, wq_folder, ini_file, directory):
+    """
+    The original oasis() on one reach, writing <userRiverName>_Res.csv, _WQ.csv and _Merged_WQRes.csv to directory
+
+    Returns the resistivity (importfile), water-quality (qwdata) and merged (resOhm) tables as written.
+    """
+    import geopandas as gp
+
+    if not glob.glob('{}/*.txt'.format(res_folder)):
+        raise PreprocessingError("FILE ERROR", "No resistivity files contained within folder or incorrect format")
+    if not glob.glob('{}/*.csv'.format(wq_folder)):
+        raise PreprocessingError("FILE ERROR", "No water quality files contained within folder or incorrect format")
+    path = os.path.join(directory, 'Raw_Data_Renamed')
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    # %% -----------------------------------------------------------------------------------------------------------------
+    outfilename = os.path.join(res_folder, "all.txt")
+    subset = pd.DataFrame(columns=["StartLat", "EndLat", "StartLong", "EndLong", "Filename"])
+    for filename in glob.glob('{}/*.txt'.format(res_folder)):
+        if filename == outfilename:
+            continue
+        temp = pd.read_csv(filename, sep=';').reset_index()
+        temp.columns = LEGACY_RES_COLUMNS
+
+        # Check if survey is bad (500m or 100 point threshold)
+        if len(temp) < 100:
+            logging.info("Resistivity file excluded, length: " + str(len(temp)))
+            continue
+
+        # Convert the starting and ending coordinates of the survey from degrees decimal minutes to decimal degrees
+        try:
+            startLat = float(str(temp.loc[0, "Latitude"])[0:2]) + float(str(temp.loc[0, "Latitude"])[2:]) / 60
+            endLat = float(str(temp.loc[len(temp)-1, "Latitude"])[0:2]) + float(str(temp.loc[len(temp)-1, "Latitude"])[2:]) / 60
+            startLong = float(str(temp.loc[0, "Longitude"])[0:3]) - float(str(temp.loc[0, "Longitude"])[3:]) / 60
+            endLong = float(str(temp.loc[len(temp)-1, "Longitude"])[0:3]) - float(str(temp.loc[len(temp)-1, "Longitude"])[3:]) / 60
+        except ValueError:
+            raise PreprocessingError("FORMATTING ERROR",
+                                     "Value Error: could not convert latitude or longitude in " + filename)
+        # Check to see if Longitude is formatted like we want it to
+        if startLong > 0 or endLong > 0:
+            raise PreprocessingError("FORMATTING ERROR",
+                                     "Error: please format longitude with negative sign for file " + filename)
+        subset = subset.append(pd.DataFrame([[startLat, endLat, startLong, endLong, filename]],
+                                            columns=["StartLat", "EndLat", "StartLong", "EndLong", "Filename"])).reset_index(drop=True)
+
+    reorderedSubset = _order(subset)
+    reorderedSubset["NewFilename"] = reorderedSubset.index + 1
+    reorderedSubset["NewFilename"] = reorderedSubset["NewFilename"].apply(
+        lambda k: os.path.join(directory, userRiverName + "_" + str(k).zfill(3) + ".txt"))
+    reorderedSubset.to_csv(os.path.join(path, "RENAMED_RESISTIVITY_FILE_DIRECTORY.txt"), index=False)
+    for i, fOld in enumerate(reorderedSubset["Filename"]):
+        copyfile(fOld, os.path.join(path, os.path.basename(reorderedSubset.loc[i, "NewFilename"])))
+
+    # %% -----------------------------------------------------------------------------------------------------------------
+    # Preprocessing Resistivity Data
+    importfile = pd.DataFrame(columns=LEGACY_RECORD_COLUMNS)
+    for i, filename in enumerate(reorderedSubset["Filename"]):
+        temp = pd.read_csv(filename, sep=';|,', engine='python').reset_index()
+        temp.columns = LEGACY_RECORD_COLUMNS
+        # If file flagged for reversal, reverse
+        if reorderedSubset.loc[i, "Reverse"]:
+            temp = temp.iloc[::-1]  # Reversal line
+        temp["Filename"] = reorderedSubset.loc[i, "NewFilename"]
+
+        header_size=26
+        num_data_bytes=14
+        with open('{}.bin'.format(os.path.splitext(filename)[0]),'rb') as fin:
+            header = fin.read(header_size)
+            data_str = fin.read(num_data_bytes)
+            data = data_str.split()[0]
+        temp['Date']=data
+        temp['Date'] = pd.to_datetime(temp['Date'])
+        temp['Date'] = temp['Date'].dt.dayofyear
+
+        # Attempt to remove overlapping lines
+        temp = _remove_overlap(importfile, temp, "Latitude", "Longitude", filename)
+        importfile = importfile.append(temp)
+    importfile.reset_index(drop=True, inplace=True)
+
+    # Write combined file
+    importfile.to_csv(outfilename, index=False)
+
+    # Add additional data columns listed above and remove unwanted data columns
+    for x in LEGACY_DATA_COLUMNS:
+        importfile[x]=np.nan
+    importfile.drop(['D1', 'D2', 'D3', "E1", "E2", "E3", "E4", "E5", "E6", "E7", "E8", "E9", "E10", "E11"],
+                    inplace=True, axis=1)
+
+    importfile.reset_index(drop=True, inplace=True)
+    importfile["Latitude"] = importfile["Latitude"].astype(str)
+    importfile["Longitude"] = importfile["Longitude"].astype(str)
+    # Reformat Latitude and Longitude to decimal degrees
+    importfile['Lat1'] = importfile['Latitude'].str[0:2]
+    importfile['Lat2'] = importfile['Latitude'].str[2:]
+    importfile['Lat2'] = importfile['Lat2'].astype(float)
+    importfile['Lat1'] = importfile['Lat1'].astype(float)
+    importfile['Lat'] = importfile.Lat1+importfile.Lat2/60
+
+    importfile['Lon1'] = importfile['Longitude'].str[0:3]
+    importfile['Lon2'] = importfile['Longitude'].str[3:]
+    importfile['Lon2'] = importfile['Lon2'].astype(float)
+    importfile['Lon1'] = importfile['Lon1'].astype(float)
+    importfile['Lon'] = importfile.Lon1-importfile.Lon2/60
+
+    importfile.drop(['Lat1','Lat2','Lon1','Lon2'], axis=1, inplace=True)
+    # Remove erroneous GPS measurements
+    importfile = importfile[importfile["Lat"] != 0]
+    importfile = importfile[importfile["Lon"] != 0]
+    importfile.reset_index(inplace=True, drop=True)
+
+    # Reformat numbers in the file to float
+    for col in importfile.columns[1:]:
+        try:
+            importfile[col] = importfile[col].astype(float)
+        except:
+            pass
+
+    importfile = _number(importfile)
+
+    # %% -----------------------------------------------------------------------------------------------------------------
+    # Import INI file
+    try:
+        ini = pd.read_csv(ini_file, index_col=None, sep='=')
+        depthoffset = float(ini.ix['DepthOffset', '[SwitchPro]'])
+    except Exception:
+        raise PreprocessingError("FILE ERROR", "No INI file selected or incorrect file format...")
+
+    # Applying the bandpass filter and rolling average
+    for x in range(1,11):
+        _band_pass(importfile,'Rho {}'.format(x),0,250)
+        _rolling_avg(importfile, 'Rho {}'.format(x), 'Rho {}_bandpass'.format(x), 20)
+
+    # Applying the depth filter
+    _depth_filt(importfile, 'Depth', depthoffset, 0.01)
+    _rolling_avg(importfile, 'Depth', 'Depth_filt', 20)
+
+    # Filtering Altitude via rolling median filter, rounded to the decimeter
+    _rolling_median(importfile, 'Altitude', 'Altitude', 20)
+    importfile['Altitude_rollmed']=importfile['Altitude_rollmed'].round(1)
+
+    importfile = _utm(importfile)
+
+    # Calculating the distance from UTM coordinates
+    importfile["Cor_Dist"] = np.sqrt(np.square(importfile['X_UTM'] - importfile['X_UTM'].shift()) +
+                                     np.square(importfile['Y_UTM'] - importfile['Y_UTM'].shift()))
+    importfile["Cor_Dist"][0]=0.00
+    importfile["Cum_dist"] = importfile["Cor_Dist"].cumsum()
+    importfile["Cum_dist"][0]=0.00
+
+    #Replacing all NaNs with "*" and dropping geometry column
+    importfile.fillna('*', inplace=True)
+    importfile1 = importfile.drop('geometry', axis=1)
+    importfile1.to_csv(os.path.join(directory, '{}_Res.csv'.format(userRiverName)), index=False)
+
+    # %% -----------------------------------------------------------------------------------------------------------------
+    # Preprocessing QW Data
+    wqsubset = pd.DataFrame(columns=["StartLat", "EndLat", "StartLong", "EndLong", "Filename"])
+    for filename in glob.glob('{}/*.csv'.format(wq_folder)):
+        temp = pd.read_csv(filename, sep=',', skiprows=12, index_col=False, engine='python', encoding='utf-16',
+                           names=LEGACY_WQ_COLUMNS)
+
+        # Check if survey is bad (only one entry)
+        if len(temp) < 2:
+            logging.info("Water quality file excluded, length: " + str(len(temp)))
+            continue
+
+        startLat = temp.loc[0, "Lat"]
+        endLat = temp.loc[len(temp)-1, "Lat"]
+        startLong = temp.loc[0, "Lon"]
+        endLong = temp.loc[len(temp)-1, "Lon"]
+        # Check to see if Longitude is formatted like we want it to
+        if startLong > 0 or endLong > 0:
+            raise PreprocessingError("FORMATTING ERROR",
+                                     "Error: please format longitude with negative sign for file " + filename)
+        wqsubset = wqsubset.append(pd.DataFrame([[startLat, endLat, startLong, endLong, filename]],
+                                                columns=["StartLat", "EndLat", "StartLong", "EndLong", "Filename"])).reset_index(drop=True)
+
+    # Start survey is one with shortest starting distance from the first resistivity survey
+    wqreorderedSubset = _order(wqsubset, start=(importfile1.loc[0, "Lat"], importfile1.loc[0, "Lon"]))
+    wqreorderedSubset["NewFilename"] = wqreorderedSubset.index + 1
+    wqreorderedSubset["NewFilename"] = wqreorderedSubset["NewFilename"].apply(
+        lambda k: os.path.join(directory, userRiverName + "_" + str(k).zfill(3) + "_WQ.csv"))
+    wqreorderedSubset.to_csv(os.path.join(path, "RENAMED_WQ_FILE_DIRECTORY.txt"), index=False)
+    for i, fOld in enumerate(wqreorderedSubset["Filename"]):
+        copyfile(fOld, os.path.join(path, os.path.basename(wqreorderedSubset.loc[i, "NewFilename"])))
+
+    # Import the water quality data based on the reordered index
+    qwdata = pd.DataFrame(columns=LEGACY_WQ_COLUMNS)
+    for i, filename in enumerate(wqreorderedSubset["Filename"]):
+        temp = pd.read_csv(filename, sep=',', skiprows=12, index_col=False, engine='python', encoding='utf-16',
+                           names=LEGACY_WQ_COLUMNS)
+        # If file flagged for reversal, reverse
+        if wqreorderedSubset.loc[i, "Reverse"]:
+            temp = temp.iloc[::-1]  # Reversal line
+        temp["Filename"] = wqreorderedSubset.loc[i, "NewFilename"]
+        # Attempt to remove overlapping lines
+        temp = _remove_overlap(qwdata, temp, "Lat", "Lon", filename)
+        qwdata = qwdata.append(temp)
+    qwdata.reset_index(drop=True, inplace=True)
+
+    # %% -----------------------------------------------------------------------------------------------------------------
+    # Remove erroneous GPS measurements
+    qwdata = qwdata[qwdata["Lat"] != 0.00]
+    qwdata = qwdata[qwdata["Lon"] != 0.00]
+    qwdata.reset_index(inplace=True, drop=True)
+
+    qwdata.dropna(axis=1, how='all', inplace=True)
+    qwdata.rename(columns={u'°C':'Temp_C', 'SPC-uS/cm': 'SPC_mscm','C-uS/cm':'Cond_mscm','ohm-cm':'Res_ocm','ALT m':'Alt_m'}, inplace=True)
+    try:
+        qwdata = qwdata.loc[qwdata.Res_ocm!="    +++++",:]
+    except:
+        pass
+    qwdata['Res_ocm'] = qwdata['Res_ocm'].astype('float')
+    qwdata['Ohm_m']=qwdata['Res_ocm']/100
+
+    # Applying a rolling average on resistivity
+    _rolling_avg(qwdata, 'Ohm_m', 'Ohm_m', 20)
+    for col in qwdata.columns[1:]:
+        try:
+            qwdata[col] = qwdata[col].astype(float)
+        except:
+            pass
+
+    qwdata = _utm(qwdata)
+    qwdata.reset_index(inplace=True)
+    qwdata = _number(qwdata)
+
+    # %% -----------------------------------------------------------------------------------------------------------------
+    # Creating buffers and spatially joining QW with resitivity data
+    Ohm_buffer = qwdata.buffer(5)
+    qwdata1 = qwdata[['X_UTM','Y_UTM','Ohm_m_rollavg','Temp_C','Date','Time','geometry']]
+    qwdata1['geometry'] = Ohm_buffer
+    qwdata1 = qwdata1.set_geometry('geometry')
+    resOhm = gp.sjoin(importfile,qwdata1,how='left', op='intersects')
+    resOhm[['Ohm_m_rollavg','Temp_C']] = resOhm[['Ohm_m_rollavg','Temp_C']].interpolate()
+    resOhm[['Ohm_m_rollavg','Temp_C']] = resOhm[['Ohm_m_rollavg','Temp_C']].fillna(method='bfill')
+    resOhm['Temp_C'] = resOhm['Temp_C'].round(1)
+
+    # Populating the final fields
+    resOhm['Ohm_m'] = resOhm['Ohm_m_rollavg']
+    resOhm['Final_Altitude'] = resOhm['Altitude_rollmed']
+    resOhm['Cor_Depth'] = resOhm['Depth_filt']
+    for x in range(1,11):
+        resOhm['Final_Rho_{}'.format(x)] = resOhm['Rho {}_rollavg'.format(x)]
+
+    # Converting *s to NaNs for import into GIS as a float
+    resOhm.replace('*',np.nan, inplace=True)
+    resOhm_df = pd.DataFrame(resOhm.drop('geometry',axis=1))
+    resOhm_df.to_csv(os.path.join(directory, '{}_Merged_WQRes.csv'.format(userRiverName)), index=False)
+
+    qwdata = pd.DataFrame(qwdata.drop('geometry',axis=1))
+    qwdata.to_csv(os.path.join(directory, '{}_WQ.csv'.format(userRiverName)), index=False)
+
+    return {'importfile': pd.DataFrame(importfile1),
+            'qwdata': qwdata,
+            'resOhm': resOhm_df,
+            'reorderedSubset': reorderedSubset,
+            'wqreorderedSubset': wqreorderedSubset}
+
+#%%
+def legacy_workbench(data):
+    """
+    The original workbench(): the Workbench import table of an Oasis output table
+    """
+    try:
+        data['File_w']=data['Line'].str.split('L',1)
+        data['File']=''
+        data['File']=data.apply(lambda row: row['File_w'][1],axis=1)
+        data['File']=data['File'].astype('int')
+
+    except:
+
+        try:
+            data['File']=data['File'].astype('int')
+
+        except KeyError as e:
+            logging.info('The following column is missing in the input file: %s. Check to make sure all required columns are present.\n' % str(e))
+
+    out = pd.DataFrame()
+
+    data.rename(columns={'File':'Profile'}, inplace=True)
+
+    zipped = list(zip(LEGACY_WORKBENCH_HEADERS, LEGACY_WORKBENCH_COLUMNS))
+    for x,y in reversed(zipped):
+        out.insert(0,x,data['{}'.format(y)].values)
+    return out
+
+#%%
+def legacy_workbench_checks(out):
+    """
+    The original workbench_checks(): the message of every warning it showed, in order
+    """
+    import scipy.stats
+
+    findings = []
+    for x in range(1,len(out.Profile)):
+        # Line-to-Line Continuity Check
+        if out.ix[x,"Profile"]!=out.ix[x-1,"Profile"]:
+            for s in range(1,11):
+                if np.abs((out.ix[x,"Rho_{}".format(s)]-out.ix[x-1,"Rho_{}".format(s)])/(out.ix[x,"Rho_{}".format(s)]+out.ix[x-1,"Rho_{}".format(s)])/2*100)>=50:
+                    findings.append("Large relative percent difference (>50%) in Rho {} on Line {} / row {}".format(s,out.ix[x,"Profile"],x+2))
+            if np.abs((out.ix[x,"/Water_Res"]-out.ix[x-1,"/Water_Res"])/(out.ix[x,"/Water_Res"]+out.ix[x-1,"/Water_Res"])/2*100)>=50:
+                findings.append("Large relative percent difference (>50%) in Water_Res on Line {} / row {}".format(out.ix[x,"Profile"],x+2))
+
+    # Line-to-Line Min/Max Check
+    mult=2 #Mulitiple of the inner quartile range (1st and 3rd) that defines outliers
+
+    # Resistivity checks
+    for x in out['Profile'].unique():
+        for s in range(1,11):
+            if np.max(out['Rho_{}'.format(s)][out['Profile']==x])>mult*(scipy.stats.mstats.mquantiles(out['Rho_{}'.format(s)][out['Profile']==x])[2]):
+                findings.append("Maximum Rho_{} in row {} larger than {} times the 3rd quantile of Line {}".format(s,out.index[out['Rho_{}'.format(s)]==np.max(out['Rho_{}'.format(s)][out['Profile']==x])][0]+2,mult,x))
+            elif np.min(out['Rho_{}'.format(s)][out['Profile']==x])<1/mult*(scipy.stats.mstats.mquantiles(out['Rho_{}'.format(s)][out['Profile']==x])[0]):
+                findings.append("Minimum Rho_{} in row {} smaller than 1/{} times the 1st quartile of Line {}".format(s,out.index[out['Rho_{}'.format(s)]==np.min(out['Rho_{}'.format(s)][out['Profile']==x])][0]+2,mult,x))
+
+    # QW checks
+    for x in out['Profile'].unique():
+        if np.max(out['/Water_Res'][out['Profile']==x])>mult*(scipy.stats.mstats.mquantiles(out['/Water_Res'][out['Profile']==x])[2]):
+            findings.append("Maximum Water_Res in row {} larger than {} times the 3rd quantile of Line {}".format(out.index[out['/Water_Res']==np.max(out['/Water_Res'][out['Profile']==x])][0]+2,mult,x))
+        elif np.min(out['/Water_Res'][out['Profile']==x])<1/mult*(scipy.stats.mstats.mquantiles(out['/Water_Res'][out['Profile']==x])[0]):
+            findings.append("Minimum Water_Res in row {} smaller than 1/{} times the 1st quartile of Line {}".format(out.index[out['/Water_Res']==np.min(out['/Water_Res'][out['Profile']==x])][0]+2,mult,x))
+
+    # Altitude checks
+        if np.max(out['Final_Altitude'][out['Profile']==x])>mult*(scipy.stats.mstats.mquantiles(out['Final_Altitude'][out['Profile']==x])[2]):
+            findings.append("Maximum Altitude in row {} larger than {} times the 3rd quantile of Line {}".format(out.index[out['Final_Altitude']==np.max(out['Final_Altitude'][out['Profile']==x])][0]+2,mult,x))
+        elif np.min(out['Final_Altitude'][out['Profile']==x])<1/mult*(scipy.stats.mstats.mquantiles(out['Final_Altitude'][out['Profile']==x])[0]):
+            findings.append("Minimum Altitude in row {} smaller than 1/{} times the 1st quartile of Line {}".format(out.index[out['Final_Altitude']==np.min(out['Final_Altitude'][out['Profile']==x])][0]+2,mult,x))
+
+    # Blank Cells Check
+    if out.isnull().values.any():
+        nulls = out.isnull()
+        for t in range(0,len(out.columns)):
+            for x in range(0,len(out.Profile)):
+                if nulls.ix[x,t]:
+                    findings.append("Blank {} cell in row {}".format(out.columns.values[t],x+2))
+    return findings
@@ -0,0 +1,216 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Memory high-water tracking and the memory estimate of a run.
+
+tracemalloc is not available on Python 2, and most of the pipeline's memory is numpy and pandas buffers that it
+would not see anyway, so the process's resident set size (RSS) is sampled instead. A MemorySampler thread reads it
+every MEMORY_INTERVAL seconds and keeps the highest value seen during each open stage; StageMetrics adds the RSS at
+the end of each stage, its growth over the stage and the stage's peak to the stage metrics. The RSS comes from
+psutil when it is installed, otherwise from /proc on Linux or GetProcessMemoryInfo on Windows.
+
+Before the resistivity files are read, estimate_memory() projects the peak of a run from the record counts found by
+discovery (and the lines of the water-quality files, which are only read later), at MEMORY_PER_RES_ROW and
+MEMORY_PER_WQ_ROW bytes a record. These were measured on synthetic reaches of 3,000 and 50,000 resistivity records
+with every output written; the peak comes while the merged frame is joined and exported, when the resistivity,
+water-quality and merged frames are all held and the csv and shapefile writers each hold a copy of what they are
+writing. run_oasis() compares the projection with the memory budget (MEMORY_BUDGET of the physical memory unless
+given) and, when it is over, writes its outputs one at a time and its shapefiles in chunks and collects garbage
+between stages instead. It also reads the resistivity files RES_CHUNK records at a time and keeps the Rho channels
+and electrode positions as float32 (see read_res_file() in MAP_Pipeline), with the same outputs.
+
+On the synthetic reach of 50,000 resistivity and 10,000 water-quality records the peak was 764 MB written normally
+and 383 to 404 MB on the low-memory path: about 6.7 KB a resistivity record above the 70 MB of the interpreter and
+its libraries instead of 13.9 KB. Nearly all of that comes from writing one output at a time; the float32 columns
+save 92 bytes a record of each copy of the frame, within the noise of the measurement. The limit is the join: the
+merged frame is still built whole from the processed frame, whose gaps are text by then, so the low-memory peak
+still grows with the reach, to some 7 GB for a reach of 1,000,000 records. A reach that will not fit in that has
+to be split and processed in parts.
+"""
+#%%
+import ctypes
+import logging
+import os
+import sys
+import threading
+import weakref
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+#%%
+MB = 1024.0 * 1024.0
+MEMORY_INTERVAL = 0.05          # s between RSS samples
+MEMORY_BUDGET = 0.75            # fraction of the physical memory a run may use by default
+MEMORY_BASE = 150 * MB          # interpreter, pandas, numpy and the geospatial stack
+MEMORY_PER_RES_ROW = 12000.0    # bytes at the peak for each resistivity record
+MEMORY_PER_WQ_ROW = 5000.0      # bytes at the peak for each water-quality record
+COUNT_BLOCK = 1 << 20           # bytes read at a time when counting lines
+
+#%%
+if sys.platform == 'win32':
+    class _ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [('cb', ctypes.c_ulong), ('PageFaultCount', ctypes.c_ulong),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    class _MemoryStatus(ctypes.Structure):
+        _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                    ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                    ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                    ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                    ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+def current_rss():
+    """
+    Resident set size of this process in bytes, None when it cannot be read
+    """
+    if psutil is not None:
+        return psutil.Process(os.getpid()).memory_info().rss
+    if sys.platform == 'win32':
+        counters = _ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                    ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+
+def physical_memory():
+    """
+    Physical memory of the machine in bytes, None when it cannot be read
+    """
+    if psutil is not None:
+        return psutil.virtual_memory().total
+    if sys.platform == 'win32':
+        status = _MemoryStatus()
+        status.dwLength = ctypes.sizeof(status)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+        return None
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def memory_limit(budget=None):
+    """
+    Memory a run may use in bytes: budget (MB) when given, otherwise MEMORY_BUDGET of the physical memory; None when
+    neither is known
+    """
+    if budget is not None:
+        return budget * MB
+    total = physical_memory()
+    return total * MEMORY_BUDGET if total else None
+
+def count_lines(paths):
+    """
+    Total number of lines in the files, without parsing them
+    """
+    total = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            last = b''
+            for block in iter(lambda: f.read(COUNT_BLOCK), b''):
+                total += block.count(b'\n')
+                last = block
+            # A last line without a line break
+            if last and not last.endswith(b'\n'):
+                total += 1
+    return total
+
+def estimate_memory(res_rows, wq_rows):
+    """
+    Projected peak memory of a run in bytes from its resistivity and water-quality record counts
+    """
+    return MEMORY_BASE + res_rows * MEMORY_PER_RES_ROW + wq_rows * MEMORY_PER_WQ_ROW
+
+#%%
+class MemorySampler(object):
+    """
+    Samples the RSS on a background thread and keeps the peak of the whole run and of every open stage
+    """
+    def __init__(self, interval=MEMORY_INTERVAL):
+        self.interval = interval
+        self.peak = current_rss()
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if self.peak is not None:
+            # The thread only holds a weak reference, so a sampler dropped without close() stops too
+            self._thread = threading.Thread(target=MemorySampler._run, args=(weakref.ref(self), self._stop, interval),
+                                            name='MemorySampler')
+            self._thread.daemon = True
+            self._thread.start()
+
+    @staticmethod
+    def _run(ref, stop, interval):
+        while not stop.wait(interval):
+            sampler = ref()
+            if sampler is None:
+                return
+            sampler.sample()
+            del sampler
+
+    def sample(self):
+        """
+        Read the RSS now and raise the peaks it is above; returns it
+        """
+        rss = current_rss()
+        if rss is None:
+            return None
+        with self._lock:
+            self.peak = max(self.peak, rss)
+            for stage, peak in self._stages.items():
+                if rss > peak:
+                    self._stages[stage] = rss
+        return rss
+
+    def begin(self, stage):
+        """
+        Start tracking the peak of stage; returns the RSS at its start
+        """
+        rss = current_rss()
+        with self._lock:
+            self._stages[stage] = rss or 0
+        return rss
+
+    def end(self, stage):
+        """
+        Stop tracking stage; returns the RSS now and the stage's peak
+        """
+        rss = self.sample()
+        with self._lock:
+            peak = self._stages.pop(stage, None)
+        return rss, peak
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+#%%
+def log_memory_plan(estimate, budget):
+    """
+    Log the projected peak against the budget; True when it is over
+    """
+    if budget is None:
+        logging.info("Projected peak memory {:.0f} MB, no memory budget known\n".format(estimate / MB))
+        return False
+    over = estimate > budget
+    (logging.warning if over else logging.info)(
+        "Projected peak memory {:.0f} MB, budget {:.0f} MB{}\n".format(
+            estimate / MB, budget / MB, ": using the low-memory path" if over else ""))
+    return over
@@ -0,0 +1,148 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Per-stage timing and throughput metrics for the preprocessing pipeline.
+
+Each stage records wall and CPU time, rows in and out, bytes read and written and rows per second, and with a
+MemorySampler (see MAP_Memory) the RSS at its end, its growth over the stage and its peak, next to the memory the run
+was projected to need. A one-line summary of every stage goes to the log and the full set is written as JSON next to
+the preprocessing summary.
+"""
+#%%
+import datetime
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+#%%
+def cpu_time():
+    """
+    User plus system CPU seconds used by this process
+    """
+    t = os.times()
+    return t[0] + t[1]
+
+#%%
+def file_size(paths):
+    """
+    Total size in bytes of one path or a list of paths
+
+    A shapefile is counted together with its sidecar files (.shx, .dbf, .prj, ...). Missing files count as zero.
+    """
+    if not isinstance(paths, (list, tuple)):
+        paths = [paths]
+    total = 0
+    for p in paths:
+        if not p:
+            continue
+        if p.lower().endswith('.shp'):
+            parts = glob.glob(os.path.splitext(p)[0] + '.*')
+        else:
+            parts = [p]
+        for part in parts:
+            try:
+                total += os.path.getsize(part)
+            except OSError:
+                pass
+    return total
+
+def _mb(size):
+    return round(size / 1048576.0, 1) if size is not None else None
+
+#%%
+class StageMetrics(object):
+    """
+    Collects timing and throughput for the named stages of one preprocessing run
+
+    Call start() when a stage begins and stop() when it ends, or skip() for a stage that is not run. Counts not known
+    at start can be passed to stop().
+    Stages may be started and stopped from several threads; CPU time and memory are for the whole process, so they
+    overlap between stages that run at the same time.
+    """
+    def __init__(self, name='oasis', memory=None):
+        self.name = name
+        self.created = datetime.datetime.now()
+        self.stages = []
+        self.memory = memory
+        self.memory_plan = None
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def start(self, stage, rows_in=None, bytes_read=None):
+        rss = self.memory.begin(stage) if self.memory is not None else None
+        with self._lock:
+            self._open[stage] = {'stage': stage,
+                                 'rows_in': rows_in,
+                                 'bytes_read': bytes_read,
+                                 '_wall': time.time(),
+                                 '_cpu': cpu_time(),
+                                 '_rss': rss}
+
+    def stop(self, stage, rows_out=None, rows_in=None, bytes_read=None, bytes_written=None):
+        with self._lock:
+            record = self._open.pop(stage)
+        wall = time.time() - record.pop('_wall')
+        cpu = cpu_time() - record.pop('_cpu')
+        rss = record.pop('_rss')
+        if self.memory is not None:
+            end, peak = self.memory.end(stage)
+            record['rss_mb'] = _mb(end)
+            record['rss_change_mb'] = _mb(end - rss) if end is not None and rss is not None else None
+            record['peak_rss_mb'] = _mb(peak)
+        if rows_in is not None:
+            record['rows_in'] = rows_in
+        if bytes_read is not None:
+            record['bytes_read'] = bytes_read
+        record['rows_out'] = rows_out
+        record['bytes_written'] = bytes_written
+        record['wall_s'] = round(wall, 6)
+        record['cpu_s'] = round(cpu, 6)
+        rows = rows_out if rows_out is not None else record['rows_in']
+        record['rows_per_s'] = round(rows / wall, 1) if rows is not None and wall > 0 else None
+        with self._lock:
+            self.stages.append(record)
+        logging.info("Stage {}: {:.3f} s wall, {:.3f} s CPU, rows in {}, rows out {}, {} rows/s\n".format(
+            stage, wall, cpu, record['rows_in'], rows_out, record['rows_per_s']))
+        return record
+
+    def skip(self, stage, rows_in=None):
+        """
+        Record a stage that was not run, with status 'skipped' and no timings
+        """
+        record = {'stage': stage, 'status': 'skipped', 'rows_in': rows_in}
+        with self._lock:
+            self.stages.append(record)
+        logging.info("Stage {}: skipped, rows in {}\n".format(stage, rows_in))
+        return record
+
+    def total(self):
+        """
+        Summed wall and CPU time over all finished stages
+        """
+        return {'wall_s': round(sum(s.get('wall_s', 0.0) for s in self.stages), 6),
+                'cpu_s': round(sum(s.get('cpu_s', 0.0) for s in self.stages), 6)}
+
+    def to_dict(self):
+        result = {'run': self.name,
+                  'started': '{:%Y-%m-%d %H:%M:%S}'.format(self.created),
+                  'total': self.total(),
+                  'stages': self.stages}
+        if self.memory is not None:
+            result['peak_rss_mb'] = _mb(self.memory.peak)
+        if self.memory_plan is not None:
+            result['memory_plan'] = self.memory_plan
+        return result
+
+    def write(self, path):
+        """
+        Write all finished stages to path as JSON
+        """
+        with open(path, 'w') as fout:
+            json.dump(self.to_dict(), fout, indent=2, sort_keys=True)
+        logging.info("Stage metrics written to " + path + "\n")
@@ -0,0 +1,89 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Missing values of the processed tables.
+
+The pipeline writes MISSING for a missing value in its csv exports, so a numeric column read back, or one holding a
+gap while it is being exported, is text. fill_missing() and restore_missing() put the marker in and take it out
+again; the rest turn a column that may hold it into floats:
+
+    exact_floats        float64 values of a numeric column, a float32 one as the decimals it was read from
+    coerce_floats       every value that is not a number becomes NaN
+    numeric_or_none     MISSING becomes NaN, and a column holding any other text gives None
+    float_columns       coerce_floats() of several columns, records by columns, NaN for the columns a frame lacks
+
+MAP_Pipeline re-exports these; the modules it imports take them from here.
+"""
+#%%
+import numpy as np
+import pandas as pd
+
+#%%
+MISSING = '*'               # what the pipeline writes for missing values
+
+#%%
+def fill_missing(df, value=MISSING):
+    """
+    Replace the missing values of the frame with value in place, one column at a time
+
+    The same as df.fillna(value, inplace=True), which converts the whole block of float columns to objects once for
+    every column with a gap in it and can take several GB on a long reach.
+    """
+    for col in df.columns:
+        if df[col].isnull().any():
+            column = df[col]
+            if column.dtype == np.float32:
+                column = pd.Series(exact_floats(column.values), index=df.index)
+            df[col] = column.fillna(value)
+    return df
+
+def restore_missing(df, value=MISSING):
+    """
+    Turn value back into NaN in place, one text column at a time, converting the columns left all numbers to float
+
+    The same as df.replace(value, np.nan, inplace=True), without its copies of the whole block of text columns.
+    """
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].replace(value, np.nan)
+    return df
+
+#%%
+def exact_floats(values):
+    """
+    Float values of a numeric array
+
+    A float32 value becomes the shortest decimal that reads back as it, which is the value as it was read from a file
+    logged to fewer than 7 significant digits, where a plain cast would add digits to it.
+    """
+    values = np.asarray(values)
+    if values.dtype == np.float32:
+        return values.astype(str).astype(float)
+    return values.astype(float)
+
+def coerce_floats(values):
+    """
+    Float values of a column, NaN for MISSING and any other text
+    """
+    return exact_floats(pd.to_numeric(values, errors='coerce').values)
+
+def numeric_or_none(values):
+    """
+    Float values of a column (NaN for MISSING), or None when it holds other text
+    """
+    if values.dtype.kind in 'biuf':
+        return exact_floats(values.values)
+    numbers = pd.to_numeric(values.where(values != MISSING), errors='coerce')
+    if (numbers.isnull() & values.notnull() & (values != MISSING)).any():
+        return None
+    return numbers.values.astype(float)
+
+def float_columns(df, columns):
+    """
+    Records by columns of df as floats (see coerce_floats()), NaN for the columns df does not have
+    """
+    return np.column_stack([coerce_floats(df[c]) if c in df else np.full(len(df), np.nan) for c in columns]
+                           if len(columns) else np.empty((len(df), 0)))
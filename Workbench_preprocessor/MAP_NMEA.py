@@ -0,0 +1,267 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Vectorized NMEA 0183 parser for the GPS sentence logged with each resistivity record.
+
+The sentences are handled as one byte matrix (a row per sentence). Checksums are validated, GGA and RMC fields are
+located from the comma positions and decoded straight into typed arrays, and every sentence gets a flag instead of
+shifting the columns when it is corrupt:
+
+    FLAG_OK             0   checksum verified and all required fields decoded
+    FLAG_NO_CHECKSUM    1   no *hh checksum; fields decoded but not verified
+    FLAG_BAD_CHECKSUM   2   checksum does not match, fields left empty
+    FLAG_MALFORMED      4   missing $, too few fields or a required field could not be decoded, fields left empty
+    FLAG_UNSUPPORTED    8   a sentence other than GGA or RMC, fields left empty
+"""
+#%%
+import numpy as np
+import pandas as pd
+
+#%%
+FLAG_OK = 0
+FLAG_NO_CHECKSUM = 1
+FLAG_BAD_CHECKSUM = 2
+FLAG_MALFORMED = 4
+FLAG_UNSUPPORTED = 8
+
+# Flags whose fields are not trusted
+FLAG_REJECT = FLAG_BAD_CHECKSUM | FLAG_MALFORMED | FLAG_UNSUPPORTED
+
+# Field positions after the sentence id, and the number of fields each sentence must have
+GGA_FIELDS = {'UTC': 1, 'Latitude': 2, 'NS': 3, 'Longitude': 4, 'EW': 5, 'Fix Quality': 6, 'Satellites': 7,
+              'HDOP': 8, 'Altitude': 9, 'Height of Geoid': 11}
+RMC_FIELDS = {'UTC': 1, 'Status': 2, 'Latitude': 3, 'NS': 4, 'Longitude': 5, 'EW': 6, 'Speed': 7, 'Course': 8,
+              'Date': 9}
+GGA_MIN_FIELDS = 15
+RMC_MIN_FIELDS = 12
+
+# Sentences decoded per pass; bounds the size of the byte and position matrices
+CHUNK_SIZE = 100000
+
+NUMERIC_COLUMNS = ['UTC', 'Latitude', 'Longitude', 'Fix Quality', 'Satellites', 'HDOP', 'Altitude',
+                   'Height of Geoid', 'Speed', 'Course', 'Date', 'Lat', 'Lon']
+TEXT_COLUMNS = ['Sentence', 'NS', 'EW', 'Status']
+
+#%%
+def to_bytes(sentences):
+    """
+    Sentences as a fixed-width bytes array; missing values become empty sentences
+    """
+    sentences = np.asarray(sentences)
+    if sentences.dtype.kind == 'S':
+        return sentences
+    sentences = np.where(pd.isnull(sentences), '', sentences)
+    try:
+        return sentences.astype('S')
+    except UnicodeError:
+        return np.array([s.encode('ascii', 'replace') if not isinstance(s, bytes) else s for s in sentences],
+                        dtype='S')
+
+#%%
+def byte_matrix(sentences):
+    """
+    A row of byte codes per sentence, padded with zeros
+    """
+    raw = to_bytes(sentences)
+    # Width rounded up to whole 8-byte words for xor_rows()
+    width = max(-(-raw.dtype.itemsize // 8) * 8, 8)
+    raw = raw.astype('S{}'.format(width))
+    return raw.view(np.uint8).reshape(len(raw), width)
+
+#%%
+def xor_rows(codes):
+    """
+    XOR of all the bytes in each row of a byte matrix whose width is a multiple of 8
+    """
+    words = np.bitwise_xor.reduce(np.ascontiguousarray(codes).view(np.uint64), axis=1)
+    for shift in (32, 16, 8):
+        words ^= words >> np.uint64(shift)
+    return (words & np.uint64(0xFF)).astype(np.uint8)
+
+#%%
+def _hex(codes):
+    """
+    Value of hexadecimal digit codes, -1 where the code is not a hex digit
+    """
+    value = np.full(codes.shape, -1, dtype=np.int16)
+    digit = (codes >= 48) & (codes <= 57)
+    upper = (codes >= 65) & (codes <= 70)
+    lower = (codes >= 97) & (codes <= 102)
+    value[digit] = codes[digit] - 48
+    value[upper] = codes[upper] - 55
+    value[lower] = codes[lower] - 87
+    return value
+
+#%%
+def field_matrix(codes, start, stop):
+    """
+    Bytes from start to stop of every row, left aligned and padded with zeros
+    """
+    length = np.clip(stop - start, 0, None)
+    width = int(length.max()) if len(length) else 0
+    if width == 0:
+        return np.zeros((len(codes), 0), dtype=np.uint8)
+    cols = start[:, None] + np.arange(width)
+    inside = np.arange(width) < length[:, None]
+    rows = np.arange(len(codes))[:, None]
+    return np.where(inside, codes[rows, np.clip(cols, 0, codes.shape[1] - 1)], 0).astype(np.uint8)
+
+#%%
+def parse_numbers(field):
+    """
+    Decimal numbers in a field matrix; NaN where the field is empty or not a number
+
+    The digits are summed as an integer and divided by a power of ten once, which gives the same float as parsing
+    the text.
+    """
+    n, width = field.shape
+    if width == 0:
+        return np.full(n, np.nan)
+    pos = np.arange(width)
+    isdigit = (field >= 48) & (field <= 57)
+    isdot = field == 46
+    sign = (pos == 0) & ((field == 45) | (field == 43))
+    ndigits = isdigit.sum(axis=1)
+    valid = (np.all(isdigit | isdot | sign | (field == 0), axis=1) & (isdot.sum(axis=1) <= 1) &
+             (ndigits > 0) & (ndigits <= 18))
+
+    # Horner's rule over the columns: each digit shifts the mantissa one place
+    mantissa = np.zeros(n, dtype=np.int64)
+    decimals = np.zeros(n, dtype=np.int64)
+    seenDot = np.zeros(n, dtype=bool)
+    for j in range(width):
+        d = isdigit[:, j]
+        mantissa = np.where(d, mantissa * 10 + (field[:, j].astype(np.int64) - 48), mantissa)
+        decimals += d & seenDot
+        seenDot |= isdot[:, j]
+    value = mantissa / np.power(10.0, decimals)
+    value[field[:, 0] == 45] *= -1
+    value[~valid] = np.nan
+    return value
+
+#%%
+def field_text(field):
+    """
+    Field matrix as an array of strings
+    """
+    n, width = field.shape
+    if width == 0:
+        return np.full(n, '', dtype=str)
+    return np.ascontiguousarray(field).view('S{}'.format(width)).reshape(n).astype(str)
+
+#%%
+def ddm_degrees(value, hemisphere, negative):
+    """
+    Signed decimal degrees from degrees-decimal-minutes and the hemisphere letters
+    """
+    degrees = np.floor(value / 100)
+    result = degrees + (value - degrees * 100) / 60
+    return np.where(hemisphere == negative, -result, result)
+
+#%%
+def parse_nmea(sentences, chunk_size=CHUNK_SIZE):
+    """
+    Decode GGA and RMC sentences into a frame of typed columns plus a Flag column
+
+    Columns not carried by a sentence type (Altitude for RMC, Date for GGA, ...) are NaN or empty.
+    """
+    sentences = to_bytes(sentences)
+    if len(sentences) <= chunk_size:
+        return _parse_chunk(sentences)
+    chunks = [_parse_chunk(sentences[start:start + chunk_size]) for start in range(0, len(sentences), chunk_size)]
+    return pd.concat(chunks, ignore_index=True)
+
+def _parse_chunk(sentences):
+    codes = byte_matrix(sentences)
+    n, width = codes.shape
+    pos = np.arange(width)
+    flag = np.zeros(n, dtype=np.int16)
+
+    # Checksum: XOR of the bytes between $ and *, compared with the two hex digits after *
+    hasDollar = codes[:, 0] == 36 if width else np.zeros(n, dtype=bool)
+    isStar = codes == 42
+    hasStar = isStar.any(axis=1)
+    star = np.where(hasStar, isStar.argmax(axis=1), (codes != 0).sum(axis=1))
+    body = (pos >= 1) & (pos < star[:, None])
+    computed = xor_rows(np.where(body, codes, 0).astype(np.uint8))
+    high = _hex(codes[np.arange(n), np.clip(star + 1, 0, width - 1)])
+    low = _hex(codes[np.arange(n), np.clip(star + 2, 0, width - 1)])
+    given = np.where((high >= 0) & (low >= 0) & (star + 2 < width), high * 16 + low, -1)
+    flag[~hasDollar] |= FLAG_MALFORMED
+    flag[hasDollar & ~hasStar] |= FLAG_NO_CHECKSUM
+    flag[hasStar & (given != computed)] |= FLAG_BAD_CHECKSUM
+
+    # Fields are separated by the commas before the *
+    comma = (codes == 44) & (pos < star[:, None])
+    fieldCount = comma.sum(axis=1) + 1
+    commaPos = np.full((n, int(fieldCount.max()) if n else 1), -1, dtype=np.int64)
+    rows, cols = np.nonzero(comma)
+    commaPos[rows, np.cumsum(comma, axis=1)[rows, cols] - 1] = cols
+
+    def field(k):
+        # Field k runs from after the k-th comma (after the $ for the sentence id) to the next comma or the *
+        start = commaPos[:, k - 1] + 1 if k > 0 else np.ones(n, dtype=np.int64)
+        stop = commaPos[:, k] if k < commaPos.shape[1] else np.full(n, -1)
+        stop = np.where(stop >= 0, stop, star)
+        present = fieldCount > k
+        return field_matrix(codes, np.where(present, start, 0), np.where(present, stop, 0))
+
+    sentence = field_text(field(0))
+    isGGA = np.char.endswith(sentence, 'GGA')
+    isRMC = np.char.endswith(sentence, 'RMC')
+    flag[hasDollar & ~isGGA & ~isRMC] |= FLAG_UNSUPPORTED
+    flag[isGGA & (fieldCount < GGA_MIN_FIELDS)] |= FLAG_MALFORMED
+    flag[isRMC & (fieldCount < RMC_MIN_FIELDS)] |= FLAG_MALFORMED
+
+    out = {'Sentence': np.where(hasDollar, np.char.add('$', sentence), '').astype(object)}
+    for column in NUMERIC_COLUMNS:
+        out[column] = np.full(n, np.nan)
+    for column in TEXT_COLUMNS[1:]:
+        out[column] = np.full(n, '', dtype=object)
+
+    # Decode each field once for both sentence types where they share a position
+    fields = {}
+    for kindMask, layout in ((isGGA, GGA_FIELDS), (isRMC, RMC_FIELDS)):
+        if not kindMask.any():
+            continue
+        for column, k in layout.items():
+            if k not in fields:
+                fields[k] = field(k)
+            if column in TEXT_COLUMNS:
+                values = field_text(fields[k])
+            else:
+                values = parse_numbers(fields[k])
+            out[column][kindMask] = values[kindMask]
+
+    # The time and position are required
+    for column in ['UTC', 'Latitude', 'Longitude']:
+        flag[(isGGA | isRMC) & np.isnan(out[column])] |= FLAG_MALFORMED
+    flag[(isGGA | isRMC) & ~np.in1d(out['NS'], ['N', 'S'])] |= FLAG_MALFORMED
+    flag[(isGGA | isRMC) & ~np.in1d(out['EW'], ['E', 'W'])] |= FLAG_MALFORMED
+
+    out['Lat'] = ddm_degrees(out['Latitude'], out['NS'], 'S')
+    out['Lon'] = ddm_degrees(out['Longitude'], out['EW'], 'W')
+
+    # Leave the fields of rejected sentences empty
+    reject = (flag & FLAG_REJECT) != 0
+    for column in NUMERIC_COLUMNS:
+        out[column][reject] = np.nan
+    for column in TEXT_COLUMNS[1:]:
+        out[column][reject] = ''
+    out['Flag'] = flag
+    return pd.DataFrame(out, columns=TEXT_COLUMNS[:1] + NUMERIC_COLUMNS + TEXT_COLUMNS[1:] + ['Flag'])
+
+#%%
+def describe_flags(flag):
+    """
+    Count of sentences carrying each flag
+    """
+    flag = np.asarray(flag)
+    return {'ok': int((flag == FLAG_OK).sum()),
+            'no_checksum': int(((flag & FLAG_NO_CHECKSUM) != 0).sum()),
+            'bad_checksum': int(((flag & FLAG_BAD_CHECKSUM) != 0).sum()),
+            'malformed': int(((flag & FLAG_MALFORMED) != 0).sum()),
+            'unsupported': int(((flag & FLAG_UNSUPPORTED) != 0).sum())}
@@ -0,0 +1,190 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Removes re-surveyed coverage from the combined resistivity and water-quality data.
+
+A point is an overlap when it lies within the tolerance of the track of an earlier survey line, the segments joining
+its consecutive points, regardless of whether the two lines are adjacent in the survey order. The earlier line is
+always kept. The segments of all lines are sampled every OVERLAP_SPACING of the tolerance and the samples held in
+one KD-tree; the segments with a sample within the tolerance plus half that spacing of a point are the only ones
+that can pass within the tolerance of it, and the exact point-to-segment distance is taken to those. A re-surveyed
+stretch whose points fall between the points of the earlier line is found as well, however far apart they are.
+
+The test of the original preprocessor is kept as the 'box' mode: the points of a line inside the latitude/longitude
+box whose corners are the last point kept before it and the first record of the line (its last point when the line
+was reversed) are removed, which only finds the overlap of consecutive lines where they meet. 'none' keeps every
+point.
+"""
+#%%
+import logging
+import numpy as np
+import pandas as pd
+
+#%%
+OVERLAP_MODES = ('track', 'box', 'none')
+OVERLAP_MODE = 'track'
+
+# Distance (m) from an earlier line's track within which a point of a later line counts as re-surveyed coverage
+OVERLAP_TOLERANCE = 2.0
+
+# Spacing of the track samples in the search tree, as a fraction of the tolerance
+OVERLAP_SPACING = 1.0
+
+# Number of query points handled per pass; bounds the size of the neighbour pair arrays
+CHUNK_SIZE = 250000
+
+#%%
+def track_segments(line):
+    """
+    First and last point of each segment of the tracks: consecutive points of the same line, and a segment of no
+    length for a line of one point
+    """
+    line = np.asarray(line)
+    same = line[1:] == line[:-1]
+    first = np.flatnonzero(same)
+    alone = np.flatnonzero(~np.concatenate(([False], same)) & ~np.concatenate((same, [False])))
+    first = np.concatenate((first, alone))
+    last = np.concatenate((first[:len(first) - len(alone)] + 1, alone))
+    order = np.argsort(first, kind='mergesort')
+    return first[order], last[order]
+
+def segment_distance(px, py, ax, ay, bx, by):
+    """
+    Distance from each point (px, py) to the segment from (ax, ay) to (bx, by)
+    """
+    vx = bx - ax
+    vy = by - ay
+    squared = vx * vx + vy * vy
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.where(squared > 0, ((px - ax) * vx + (py - ay) * vy) / squared, 0.0)
+    t = np.clip(t, 0, 1)
+    return np.hypot(px - ax - t * vx, py - ay - t * vy)
+
+def find_overlaps(x, y, line, tolerance=OVERLAP_TOLERANCE, chunk_size=CHUNK_SIZE, query=None):
+    """
+    Flag points that fall within the tolerance of the track of any earlier line
+
+    x, y are projected coordinates in meters and line is an integer line number that increases with survey order.
+    Returns a boolean array, True where the point duplicates earlier coverage. With query (positions of points) only
+    those points are tested, against every track, and the others are left False.
+    """
+    from scipy.spatial import cKDTree
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    line = np.asarray(line)
+    overlap = np.zeros(len(x), dtype=bool)
+    valid = np.isfinite(x) & np.isfinite(y)
+    if valid.sum() < 2 or len(np.unique(line[valid])) < 2:
+        return overlap
+
+    # The tracks join the valid points of each line in order
+    index = np.flatnonzero(valid)
+    px = x[index]
+    py = y[index]
+    pointLine = line[index]
+    start, end = track_segments(pointLine)
+
+    # Samples every spacing metres or less along each segment, both ends included
+    spacing = OVERLAP_SPACING * tolerance
+    length = np.hypot(px[end] - px[start], py[end] - py[start])
+    counts = np.maximum(np.ceil(length / spacing).astype(np.int64), 1) + 1
+    segment = np.repeat(np.arange(len(start)), counts)
+    fraction = ((np.arange(len(segment)) - np.repeat(np.cumsum(counts) - counts, counts)) /
+                np.repeat(counts - 1, counts).astype(float))
+    a = start[segment]
+    b = end[segment]
+    # Median splits of a long, narrow reach make the pair search quadratic; sliding midpoint splits keep it fast
+    tree = cKDTree(np.column_stack((px[a] + fraction * (px[b] - px[a]), py[a] + fraction * (py[b] - py[a]))),
+                   balanced_tree=False)
+    sampleLine = pointLine[a]
+    # A point within the tolerance of a segment is within half a spacing more of one of its samples
+    radius = tolerance + 0.5 * (length / (counts - 1)).max()
+
+    # Query in chunks so the neighbour pairs stay bounded in memory on large reaches
+    hit = np.zeros(len(index), dtype=bool)
+    tested = np.arange(len(index)) if query is None else np.flatnonzero(np.in1d(index, query))
+    for begin in range(0, len(tested), chunk_size):
+        stop = min(begin + chunk_size, len(tested))
+        chunkTree = cKDTree(np.column_stack((px[tested[begin:stop]], py[tested[begin:stop]])), balanced_tree=False)
+        pairs = chunkTree.sparse_distance_matrix(tree, radius, output_type='ndarray')
+        if len(pairs) == 0:
+            continue
+        i = tested[pairs['i'] + begin]
+        earlier = sampleLine[pairs['j']] < pointLine[i]
+        # A sample lies on its segment, so one within the tolerance settles the point without the exact distance
+        hit[i[earlier & (pairs['v'] <= tolerance)]] = True
+        rest = earlier & (pairs['v'] > tolerance)
+        rest[rest] = ~hit[i[rest]]
+        i = i[rest]
+        s = segment[pairs['j'][rest]]
+        near = segment_distance(px[i], py[i], px[start[s]], py[start[s]], px[end[s]], py[end[s]]) <= tolerance
+        hit[i[near]] = True
+    overlap[index[hit]] = True
+    return overlap
+
+def find_box_overlaps(lat, lon, line, start):
+    """
+    Flag the points of each line inside the box between the last point kept before it and its start point
+
+    line is an integer line number that increases with survey order and start the position of the start point of each
+    line in turn. A point without coordinates is flagged, as the original test did not keep it either.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    line = np.asarray(line)
+    overlap = np.zeros(len(lat), dtype=bool)
+    bounds = np.flatnonzero(line[1:] != line[:-1]) + 1
+    last = None
+    for first, stop, s in zip(np.r_[0, bounds], np.r_[bounds, len(line)], start):
+        if last is not None:
+            with np.errstate(invalid='ignore'):
+                outside = ((lat[first:stop] > max(lat[last], lat[s])) | (lat[first:stop] < min(lat[last], lat[s])) |
+                           (lon[first:stop] > max(lon[last], lon[s])) | (lon[first:stop] < min(lon[last], lon[s])))
+            overlap[first:stop] = ~outside
+        kept = np.flatnonzero(~overlap[first:stop])
+        if len(kept):
+            last = first + kept[-1]
+    return overlap
+
+#%%
+def remove_overlaps(df, line_column, x_column='X_UTM', y_column='Y_UTM', tolerance=OVERLAP_TOLERANCE, flag_column=None,
+                    mode=OVERLAP_MODE, reversed_lines=(), lat_column='Lat', lon_column='Lon'):
+    """
+    Remove (or flag) re-surveyed points of later lines in one batch pass
+
+    Lines are numbered in order of first appearance in line_column, so the frame must already be in survey order.
+    When flag_column is given the points are kept and marked in that column instead of being dropped. mode is one of
+    OVERLAP_MODES; the box test starts the lines named in reversed_lines at their last point.
+    """
+    if mode not in OVERLAP_MODES:
+        raise ValueError("Unknown overlap mode " + str(mode) + ", expected one of " + ", ".join(OVERLAP_MODES))
+    line = pd.factorize(df[line_column], sort=False)[0]
+    if mode == 'box':
+        names = df[line_column].values
+        bounds = np.flatnonzero(line[1:] != line[:-1]) + 1
+        start = [stop - 1 if names[first] in reversed_lines else first
+                 for first, stop in zip(np.r_[0, bounds], np.r_[bounds, len(line)])]
+        overlap = find_box_overlaps(df[lat_column].values, df[lon_column].values, line, start)
+    elif mode == 'none':
+        overlap = np.zeros(len(df), dtype=bool)
+    else:
+        overlap = find_overlaps(df[x_column].values, df[y_column].values, line, tolerance)
+    log_overlaps(overlap, df[line_column].values, "flagged in" if flag_column is not None else "removed from")
+
+    if flag_column is not None:
+        df[flag_column] = overlap
+        return df
+    return df[~overlap].reset_index(drop=True)
+
+def log_overlaps(overlap, names, action="removed from"):
+    """
+    Log the number of overlapping points of each file, named by names
+    """
+    if overlap.any():
+        counts = pd.Series(overlap).groupby(names).sum()
+        for name, count in counts[counts > 0].iteritems():
+            logging.info(str(int(count)) + " overlapping point(s) " + action + " file " + str(name))
@@ -0,0 +1,1742 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Headless Oasis and Workbench preprocessing stages.
+
+The processing behind the GUI lives here so it can be run and timed without any dialogs. oasis() in
+MAP_Preprocessing_GUI.py gathers the inputs and save locations from the user and hands them to run_oasis();
+workbench() and workbench_checks() use format_workbench() and check_workbench().
+
+Errors that used to show a message box and exit raise PreprocessingError instead, carrying the same title and
+message for the GUI to display.
+
+The stages take and return frames or arrays and keep nothing between calls, so services can import this module and
+run several reaches in one process, one after another or in threads. Everything a run produces comes back from
+run_oasis(); the one thing shared between runs is _SPATIAL_LOCK, which lets one thread at a time into pyproj and GEOS
+(see project_utm, join_pairs, write_shapefile and load_centerline). The fiona writes of the shapefiles, each to its own
+file, are left outside it.
+
+geopandas, shapely and scipy are imported by the stages that use them (project_utm, join_wq, check_workbench and the
+centerline, overlap and section modules), so the Workbench stages and the GUI menu start without loading them.
+
+The resistivity and water-quality frames stay plain frames throughout: project_utm() adds the projected X_UTM/Y_UTM
+columns, the water-quality join works from those columns (see join_pairs()) and shapely points are only built from
+them for the shapefiles (see point_geometry()).
+"""
+#%%
+import datetime
+import gc
+import glob
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+from math import radians, cos, sin, asin, sqrt
+
+import numpy as np
+import pandas as pd
+
+from MAP_Archive import ARCHIVE_MODE, RawArchive, compressor
+from MAP_Catalog import RES_STAT_COLUMNS, WQ_STAT_COLUMNS, catalog_path, profile_table, record_run
+from MAP_Decimate import BIN_MODE, bin_survey, decimate
+from MAP_Despike import DESPIKE_COLUMNS, add_despike_columns, describe_despike, despike_frame
+from MAP_Memory import MB, MemorySampler, count_lines, estimate_memory, log_memory_plan, memory_limit
+from MAP_Metrics import StageMetrics, file_size
+from MAP_Missing import (MISSING, coerce_floats, exact_floats, fill_missing, float_columns, numeric_or_none,
+                         restore_missing)
+from MAP_NMEA import FLAG_OK, describe_flags, parse_nmea
+from MAP_Overlap import OVERLAP_MODE, OVERLAP_TOLERANCE, remove_overlaps
+from MAP_Rho import RHO_COLUMNS, RHO_OUT_OF_BAND, RHO_QUALITY, add_check_columns, check_rho, describe_rho_flags
+from MAP_Section import SECTION_FOLDER, section_path, write_sections
+from MAP_Sequence import (SEQUENCE_MODE, SEQUENCE_MODES, line_direction, order_by_time, record_times, time_span,
+                          wq_time_span)
+from MAP_Station import STATION_COLUMNS, UTM_CRS, Centerline, add_stations, read_centerline
+from MAP_Store import store_path, write_store
+from MAP_Tiles import TILE_FOLDER, TILE_JSON, write_tiles
+from MAP_Writer import OutputWriter
+
+#%%
+# Correct names of columns in resistivity raw data files
+RES_COLUMNS = ["Distance", "Depth", "Rho 1", "Rho 2", "Rho 3", "Rho 4", "Rho 5", "Rho 6", "Rho 7", "Rho 8", "Rho 9",
+               "Rho 10", "C1", "C2", "P1", "P2", "P3", "P4", "P5", "P6", "P7", "P8", "P9", "P10", "P11", "Latitude",
+               "Longitude", "In_p", "In_n", "V1_p", "V1_n", "V2_p", "V2_n", "V3_p", "V3_n", "V4_p", "V4_n", "V5_p", "V5_n",
+               "V6_p", "V6_n", "V7_p", "V7_n", "V8_p", "V8_n", "V9_p", "V9_n", "V10_p", "V10_n", "GPSString", "HDOP",
+               "EXTRANEOUS"]
+
+# Resistivity columns once the GPS sentence is decoded (see read_res_file)
+RES_RECORD_COLUMNS = ["Distance", "Depth", "Rho 1", "Rho 2", "Rho 3", "Rho 4", "Rho 5", "Rho 6", "Rho 7", "Rho 8", "Rho 9",
+                      "Rho 10", "C1", "C2", "P1", "P2", "P3", "P4", "P5", "P6", "P7", "P8", "P9", "P10", "P11", "Latitude",
+                      "Longitude", "In_p", "In_n", "V1_p", "V1_n", "V2_p", "V2_n", "V3_p", "V3_n", "V4_p", "V4_n", "V5_p", "V5_n",
+                      "V6_p", "V6_n", "V7_p", "V7_n", "V8_p", "V8_n", "V9_p", "V9_n", "V10_p", "V10_n", "GPSString", "UTC",
+                      "Latitude2", "D1", "Longitude2", "D2", "Fix Quality", "Satellites", "HDOP", "Altitude", "D3",
+                      "Height of Geoid", "E1", "E2", "E3", "E4", "E5", "E6", "E7", "E8", "E9", "E10", "E11", "GPS_Flag"]
+
+# Columns held as float32 by the low-memory path (see read_res_file): the Rho channels and electrode positions, which
+# the instrument logs to fewer than 7 significant digits. The currents and voltages carry 8 and stay float64.
+RES_COMPACT_COLUMNS = RES_COLUMNS[2:25]
+RES_CHUNK = 50000               # records read and decoded at a time by the low-memory path
+
+# Water-quality sonde columns; the files are read by the names in their header row (see read_wq_file)
+WQ_COLUMNS = ["Date", "Time", "°C", "mmHg", "DO %", "SPC-uS/cm", "C-uS/cm", "ohm-cm", "pH",
+              "NH4-N mg/L", "NO3-N mg/L", "Cl mg/L", "FNU", "TSS mg/L", "DEP m", "ALT m", "Lat", "Lon"]
+WQ_REQUIRED_COLUMNS = ["Date", "Time", "°C", "ohm-cm", "Lat", "Lon"]
+WQ_TEXT_COLUMNS = ["Date", "Time"]
+WQ_OVERRANGE = '+++++'          # sonde reading out of the sensor's range, read as missing
+WQ_HEADER_LINES = 50            # lines searched for the header row
+
+# Columns added to the resistivity data and filled during processing
+DATA_COLUMNS = ('Ohm_m',
+                'Cor_Dist',
+                'Cor_Depth',
+                'Final_Rho_1',
+                'Final_Rho_2',
+                'Final_Rho_3',
+                'Final_Rho_4',
+                'Final_Rho_5',
+                'Final_Rho_6',
+                'Final_Rho_7',
+                'Final_Rho_8',
+                'Final_Rho_9',
+                'Final_Rho_10',
+                'Lat',
+                'Lon',
+                'Final_Altitude')
+
+# Workbench import headers and the Oasis columns they are taken from
+WORKBENCH_HEADERS = ('/Water_Res','Cor_Dist','Cor_Depth','Rho_1','Rho_2','Rho_3','Rho_4','Rho_5','Rho_6','Rho_7','Rho_8','Rho_9','Rho_10','C1','C2','P1','P2','P3','P4','P5','P6','P7','P8','P9','P10','P11','Lat','Lon','Final_Altitude','Profile')
+WORKBENCH_COLUMNS = ('Ohm_m',
+                     'Cor_Dist',
+                     'Cor_Depth',
+                     'Final_Rho_1',
+                     'Final_Rho_2',
+                     'Final_Rho_3',
+                     'Final_Rho_4',
+                     'Final_Rho_5',
+                     'Final_Rho_6',
+                     'Final_Rho_7',
+                     'Final_Rho_8',
+                     'Final_Rho_9',
+                     'Final_Rho_10',
+                     'C1','C2','P1','P2','P3','P4','P5','P6','P7','P8','P9','P10','P11',
+                     'Lat',
+                     'Lon',
+                     'Final_Altitude',
+                     'Profile')
+
+# Data-release column selections
+DR_RAW_COLUMNS = ['File','Date','UTC','Depth','Lat','Lon','Altitude','Cum_dist','In_n','In_p','V1_n','V1_p','V2_n','V2_p','V3_n','V3_p','V4_n','V4_p','V5_n','V5_p','V6_n','V6_p','V7_n','V7_p','V8_n','V8_p','V9_n','V9_p','V10_n','V10_p','Rho 1','Rho 2','Rho 3','Rho 4','Rho 5','Rho 6','Rho 7','Rho 8','Rho 9','Rho 10','C1','C2','P1','P2','P3','P4','P5','P6','P7','P8','P9','P10','P11']
+DR_POST_COLUMNS = ['File','Date','UTC','Depth_rollavg','Ohm_m','Lat','Lon','Altitude_rollmed','Cum_dist','Rho 1_rollavg','Rho 2_rollavg','Rho 3_rollavg','Rho 4_rollavg','Rho 5_rollavg','Rho 6_rollavg','Rho 7_rollavg','Rho 8_rollavg','Rho 9_rollavg','Rho 10_rollavg']
+DR_RAW_NAMES = {'Station':'River_station','Offset':'Lateral_offset','File':'Profile','UTC':'Time','Lat':'Latitude','Lon':'Longitude','Cum_dist':'UTM_distance','Rho 1':'Rho_1','Rho 2':'Rho_2','Rho 3':'Rho_3','Rho 4':'Rho_4','Rho 5':'Rho_5','Rho 6':'Rho_6','Rho 7':'Rho_7','Rho 8':'Rho_8','Rho 9':'Rho_9','Rho 10':'Rho_10','Altitude':'Elevation'}
+DR_POST_NAMES = {'Station':'River_station','Offset':'Lateral_offset','File':'Profile','UTC':'Time','Lat':'Latitude','Lon':'Longitude','Cum_dist':'UTM_distance','Rho 1_rollavg':'Rho1','Rho 2_rollavg':'Rho2','Rho 3_rollavg':'Rho3','Rho 4_rollavg':'Rho4','Rho 5_rollavg':'Rho5','Rho 6_rollavg':'Rho6','Rho 7_rollavg':'Rho7','Rho 8_rollavg':'Rho8','Rho 9_rollavg':'Rho9','Rho 10_rollavg':'Rho10','Altitude':'Elevation','Ohm_m':'Water_Res'}
+DR_SERIAL_COLUMNS = ['Iris_SN', 'Cable_SN', 'Echo_GPS_SN', 'QW_SN']
+DR_CHUNK = 50000                # rows formatted and written at a time
+SHAPEFILE_CHUNK = 10000         # rows turned into features at a time by the low-memory shapefile export
+DR_EXTENSIONS = {'gz': '.gz', 'zstd': '.zst'}
+DR_MANIFEST_FILE = 'DATA_RELEASE_MANIFEST.csv'
+DR_MANIFEST_COLUMNS = ['File', 'Rows', 'Bytes', 'SHA256', 'Compression']
+
+#%%
+# Default filter and join parameters
+BANDPASS_MIN = 0            # ohm-m
+BANDPASS_MAX = 250          # ohm-m
+FILTER_WINDOW = 20          # records in the rolling average and rolling median filters
+DEPTH_FACTOR = 0.01         # m above the INI depth offset below which depths are dropped
+MIN_SURVEY_POINTS = 100     # resistivity files with fewer records are excluded
+JOIN_BUFFER = 5             # m around each water-quality point joined to the resistivity data
+JOIN_COLUMNS = ['X_UTM','Y_UTM','Ohm_m_rollavg','Temp_C','Date','Time']   # water-quality columns joined
+RECORD_MEAN_COLUMNS = ['Ohm_m_rollavg', 'Temp_C', 'Ohm_m']   # averaged over the buffers a record falls in
+RECORD_KEY = ['Filename', 'UTC', 'Cum_dist']    # tells the records of a merged table read back from csv apart
+JOIN_RESOLUTION = 16        # segments per quarter circle of the buffer polygons, as shapely draws them by default
+JOIN_TOLERANCE = 1e-6       # m; points this close to either circle of a buffer are tested against the polygon
+
+WGS84_CRS = {'init': 'epsg:4326'}
+
+# The projection, shapefile and geometry libraries keep process-wide state, so reaches run in threads take turns
+_SPATIAL_LOCK = threading.Lock()
+
+#%%
+class PreprocessingError(Exception):
+    """
+    A problem with the input data or an output file that stops the run
+
+    title is the heading the GUI shows in its error box and str(error) the message.
+    """
+    def __init__(self, title, message):
+        Exception.__init__(self, message)
+        self.title = title
+
+#%%
+# Defining bandpass filter to filter resistivity data channels
+def band_pass(df,column, min, max):
+    df[column+'_bandpass']=df[column].mask((df[column]<min) | (df[column]>max))
+    return df
+
+#%%
+# Defining depth filter
+def depth_filt(df, column, offset, factor, source=None):
+    source = column if source is None else source
+    df[column+'_filt']=df[source].mask(df[source]<offset+factor)
+    return df
+
+#%%
+# Defining rolling average filter
+def rolling_avg(df, column1, column2, width):
+    df[column1+'_rollavg']=df[column2]
+    df[column1+'_rollavg']= df[column1+'_rollavg'].rolling(width, min_periods=1).mean()
+    return df
+
+#%%
+# Defining the rolling median filter
+def rolling_median(df, column1, column2, width):
+    df[column1+'_rollmed']=df[column2]
+    df[column1+'_rollmed']= df[column1+'_rollmed'].rolling(width, min_periods=1).median()
+    return df
+
+def haversine(lon1, lat1, lon2, lat2):
+    """
+    Calculate the great circle distance between two points
+    on the earth (specified in decimal degrees)
+    """
+    # convert decimal degrees to radians
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+
+    # haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    r = 6371  # Radius of earth in kilometers. Use 3956 for miles
+    return c * r
+
+#%%
+def check_inputs(res_folder, wq_folder, ini_file):
+    """
+    Make sure the input folders hold data and an INI file was given
+    """
+    if not glob.glob('{}/*.txt'.format(res_folder)):
+        logging.error("No text files found within selected resistivity folder\n")
+        raise PreprocessingError("FILE ERROR", "No resistivity files contained within folder or incorrect format")
+    if not glob.glob('{}/*.csv'.format(wq_folder)):
+        logging.error("No csv files found within the selected water quality folder\n")
+        raise PreprocessingError("FILE ERROR", "No water quality files contained within folder or incorrect format")
+    if not ini_file:
+        logging.error("No INI file selected by the user\n")
+        raise PreprocessingError("FILE ERROR", "No INI file selected")
+
+#%%
+def raw_data_folder(directory):
+    """
+    Create the Raw_Data_Renamed folder inside the save directory and return its path
+    """
+    path = os.path.join(directory, 'Raw_Data_Renamed')
+    try:
+        os.makedirs(path)
+        print('Raw data folder created')
+        logging.info("Raw data folder created\n")
+    except OSError:
+        logging.info("Unable to create raw data folder or folder already exists\n")
+    return path
+
+#%%
+def discover_resistivity(res_folder, outfilename, min_points=MIN_SURVEY_POINTS, counts=None):
+    """
+    Read the start and end coordinates of every resistivity survey in the folder
+
+    Returns the surveys kept for processing, with the times of their first and last records, and those excluded for
+    having fewer than min_points points. When counts is a dict the number of records of each survey kept is put in
+    it by filename.
+    """
+    # Grab starting and ending points of each survey to reorder
+    # NOTE: THIS ASSUMES CONTINUITY WITHIN SURVEY - NO TURNING BOAT AROUND WITHIN SURVEY LINE
+    subset = pd.DataFrame(columns=["StartLat", "EndLat", "StartLong", "EndLong", "Filename", "StartTime", "EndTime"])
+    excludeSurveys = pd.DataFrame(columns=["Filename", "Number_of_Data_Points"])
+    for filename in glob.glob('{}/*.txt'.format(res_folder)):
+        if filename == outfilename:
+            continue
+        temp = pd.read_csv(filename, sep=';').reset_index()
+        temp.columns = RES_COLUMNS
+
+        # Check if survey is bad (500m or 100 point threshold)
+        if len(temp) < min_points:
+            excludeSurveys = excludeSurveys.append(pd.DataFrame([[filename, str(len(temp))]],
+                                                                columns=["Filename",
+                                                                         "Number_of_Data_Points"])).reset_index(drop=True)
+            logging.info("Resistivity file excluded, length: " + str(len(temp)))
+            logging.info(filename + "\n")
+            continue
+
+        if counts is not None:
+            counts[filename] = len(temp)
+        startLat, endLat, startLong, endLong = res_endpoints(temp, filename)
+        startTime, endTime = res_time_span(temp, filename, startLong)
+        subset = subset.append(pd.DataFrame([[startLat, endLat, startLong, endLong, filename, startTime, endTime]],
+                                            columns=["StartLat", "EndLat", "StartLong", "EndLong", "Filename",
+                                                     "StartTime", "EndTime"])).reset_index(drop=True)
+    return subset, excludeSurveys
+
+#%%
+def res_endpoints(temp, filename):
+    """
+    Starting and ending latitude and longitude of a resistivity survey in decimal degrees
+    """
+    # Convert the starting and ending coordinates of the survey from degrees decimal minutes to decimal degrees
+    try:
+        startLat = float(str(temp.loc[0, "Latitude"])[0:2]) + float(str(temp.loc[0, "Latitude"])[2:]) / 60
+        endLat = float(str(temp.loc[len(temp)-1, "Latitude"])[0:2]) + float(str(temp.loc[len(temp)-1, "Latitude"])[2:]) / 60
+        startLong = float(str(temp.loc[0, "Longitude"])[0:3]) - float(str(temp.loc[0, "Longitude"])[3:]) / 60
+        endLong = float(str(temp.loc[len(temp)-1, "Longitude"])[0:3]) - float(str(temp.loc[len(temp)-1, "Longitude"])[3:]) / 60
+    except ValueError:
+        logging.critical("Could not convert latitude or longitude in " + filename + "\n")
+        raise PreprocessingError("FORMATTING ERROR",
+                                 "Value Error: could not convert latitude or longitude in " + filename)
+    # Check to see if Longitude is formatted like we want it to
+    if startLong > 0 or endLong > 0:
+        logging.error("Incorrect longitude format in " + filename + "\n")
+        raise PreprocessingError("FORMATTING ERROR",
+                                 "Error: please format longitude with negative sign for file " + filename)
+    return startLat, endLat, startLong, endLong
+
+#%%
+def res_time_span(temp, filename, longitude=None):
+    """
+    Times of the first and last records of a resistivity survey from its .bin date and GPS UTC, NaT when unavailable
+
+    longitude places the survey in its time zone (see MAP_Sequence.record_times()).
+    """
+    try:
+        date = pd.Timestamp(read_bin_date(filename))
+    except (IOError, IndexError, ValueError):
+        logging.warning("No survey date for " + filename + "\n")
+        return pd.NaT, pd.NaT
+    return time_span(record_times(date, parse_nmea(temp["GPSString"].values)["UTC"].values, longitude))
+
+#%%
+def discover_wq(wq_folder, frames=None):
+    """
+    Read the start and end coordinates of every water-quality file in the folder
+
+    Returns the files kept for processing, with the times of their first and last records, and those excluded for
+    having a single entry. When frames is a dict the
+    records read are kept in it by filename, so read_wq() does not read the files again.
+    """
+    # Grab starting and ending points of each survey to reorder
+    # NOTE: THIS ASSUMES CONTINUITY WITHIN SURVEY - NO TURNING BOAT AROUND WITHIN SURVEY LINE
+    wqsubset = pd.DataFrame(columns=["StartLat", "EndLat", "StartLong", "EndLong", "Filename", "StartTime", "EndTime"])
+    wqexcludeSurveys = pd.DataFrame(columns=["Filename", "Number_of_Data_Points"])
+    for filename in glob.glob('{}/*.csv'.format(wq_folder)):
+        temp = read_wq_file(filename)
+        if frames is not None:
+            frames[filename] = temp
+
+        # Check if survey is bad (only one entry)
+        if len(temp) < 2:
+            wqexcludeSurveys = wqexcludeSurveys.append(pd.DataFrame([[filename, str(len(temp))]],
+                                                                columns=["Filename",
+                                                                         "Number_of_Data_Points"])).reset_index(drop=True)
+            logging.info("Water quality file excluded, length: " + str(len(temp)))
+            logging.info(filename + "\n")
+            continue
+
+        startLat, endLat, startLong, endLong = wq_endpoints(temp, filename)
+        startTime, endTime = wq_time_span(temp)
+        wqsubset = wqsubset.append(pd.DataFrame([[startLat, endLat, startLong, endLong, filename, startTime, endTime]],
+                                                columns=["StartLat", "EndLat", "StartLong", "EndLong", "Filename",
+                                                         "StartTime", "EndTime"])).reset_index(drop=True)
+    return wqsubset, wqexcludeSurveys
+
+#%%
+def wq_endpoints(temp, filename):
+    """
+    Starting and ending latitude and longitude of a water-quality file
+    """
+    try:
+        startLat = temp.loc[0, "Lat"]
+        endLat = temp.loc[len(temp)-1, "Lat"]
+        startLong = temp.loc[0, "Lon"]
+        endLong = temp.loc[len(temp)-1, "Lon"]
+    except ValueError:
+        logging.critical("Could not convert latitude or longitude in " + filename + "\n")
+        raise PreprocessingError("FORMATTING ERROR",
+                                 "Value Error: could not convert latitude or longitude in " + filename)
+    # Check to see if Longitude is formatted like we want it to
+    if startLong > 0 or endLong > 0:
+        logging.error("Incorrect longitude format in " + filename + "\n")
+        raise PreprocessingError("FORMATTING ERROR",
+                                 "Error: please format longitude with negative sign for file " + filename)
+    return startLat, endLat, startLong, endLong
+
+#%%
+def _unicode(text):
+    return text.decode('utf-8') if isinstance(text, bytes) else text
+
+def _column_key(name):
+    return ' '.join(_unicode(name).split()).lower()
+
+# Header names as found in the files, matched without regard to case or spacing
+WQ_COLUMN_KEYS = dict((_column_key(c), c) for c in WQ_COLUMNS)
+
+def wq_encoding(filename):
+    """
+    Text encoding of a water-quality file from its byte order mark; sonde exports are normally utf-16
+    """
+    with open(filename, 'rb') as fin:
+        start = fin.read(4)
+    if start[:2] in (b'\xff\xfe', b'\xfe\xff'):
+        return 'utf-16'
+    if start[:3] == b'\xef\xbb\xbf':
+        return 'utf-8-sig'
+    # utf-16 without a byte order mark still has a zero byte in every ASCII character
+    if b'\x00' in start:
+        return 'utf-16-le' if start[1:2] == b'\x00' else 'utf-16-be'
+    return 'utf-8'
+
+def wq_layout(filename, encoding):
+    """
+    Column names from the header row of a water-quality file and the number of lines before the first record
+
+    The header row is the first line naming both a Date and a Time column; lines after it that do not start with a
+    digit (the units row) are skipped too. Known names are given their WQ_COLUMNS spelling.
+    """
+    with io.open(filename, encoding=encoding) as fin:
+        header = None
+        for k, line in enumerate(fin):
+            fields = [f.strip() for f in line.strip().split(',')]
+            if header is None:
+                if k >= WQ_HEADER_LINES:
+                    break
+                keys = [_column_key(f) for f in fields]
+                if 'date' in keys and 'time' in keys:
+                    header = fields
+            elif fields[0][:1].isdigit():
+                return _wq_names(header), k
+    raise PreprocessingError("FORMATTING ERROR", "Could not find the header row or any records in " + filename)
+
+def _wq_names(header):
+    while header and not header[-1]:
+        header = header[:-1]
+    names = []
+    for k, field in enumerate(header):
+        name = WQ_COLUMN_KEYS.get(_column_key(field))
+        if name is None:
+            name = field.encode('utf-8') if not isinstance(field, str) else field
+            name = name or 'Unnamed: {}'.format(k)
+        if name in names:
+            name = '{}.{}'.format(name, names.count(name))
+        names.append(name)
+    return names
+
+#%%
+def read_wq_file(filename):
+    """
+    Records of one water-quality sonde file, with its columns named from the file's header row
+
+    The preamble length and header row are found by wq_layout(). The records are parsed by the C reader, which
+    transcodes the file as it goes; Date and Time are kept as text and every other column is read as a float, with
+    the +++++ overrange marker read as missing.
+    """
+    encoding = wq_encoding(filename)
+    names, skip = wq_layout(filename, encoding)
+    missing = [c for c in WQ_REQUIRED_COLUMNS if c not in names]
+    if missing:
+        logging.error("Water-quality file " + filename + " has no column(s) " + ", ".join(missing) + "\n")
+        raise PreprocessingError("FORMATTING ERROR", "Water-quality file " + filename + " is missing column(s): " +
+                                 ", ".join(_unicode(c) for c in missing))
+    # Columns not in WQ_COLUMNS are left to the reader to type
+    numeric = [c for c in names if c in WQ_COLUMNS and c not in WQ_TEXT_COLUMNS]
+    dtypes = dict((c, object if c in WQ_TEXT_COLUMNS else np.float64) for c in names if c in WQ_COLUMNS)
+    options = dict(encoding=encoding, skiprows=skip, header=None, names=names, index_col=False,
+                   na_values=[WQ_OVERRANGE], skipinitialspace=True, float_precision='round_trip')
+    try:
+        return pd.read_csv(filename, dtype=dtypes, **options)
+    except ValueError:
+        # A sensor column holding something other than numbers; keep what converts and read the rest as missing
+        logging.warning("Non-numeric values in " + filename + " read as missing\n")
+        dtypes.update((c, object) for c in numeric)
+        temp = pd.read_csv(filename, dtype=dtypes, **options)
+        for c in numeric:
+            temp[c] = pd.to_numeric(temp[c], errors='coerce').astype(np.float64)
+        return temp
+
+#%%
+def order_surveys(subset, start=None):
+    """
+    Reorganize surveys based upon their location to one another
+
+    Without start the first survey is the one whose start is farthest from any survey's end (resistivity). With a
+    (lat, lon) start the first survey is the one ending closest to it (water quality, seeded from the first
+    resistivity point). Each following survey is the one that starts, or when reversed ends, closest to the end of
+    the previous one.
+    """
+    # ONLY IF MORE THAN TWO SURVEYS FOUND
+    if len(subset) > 2:
+        reorderedSubset = pd.DataFrame(columns=["StartLat", "EndLat", "StartLong", "EndLong", "Filename", "Distance", "Reverse"])
+        subset["Distance"] = 0.00
+        if start is None:
+            # Pick starting survey as one where start is farthest away from finish
+            for i, f in enumerate(subset.Filename):
+                startLat = subset.loc[i, "StartLat"]
+                startLong = subset.loc[i, "StartLong"]
+                dist = 0
+                # Find the greatest distance between all lines
+                for i2, f2 in enumerate(subset.Filename):
+                    endLat = subset.loc[i2, "EndLat"]
+                    endLong = subset.loc[i2, "EndLong"]
+                    dist = max(dist, haversine(startLong, startLat, endLong, endLat))
+                subset.at[i, "Distance"] = dist
+            # Start survey is one with greatest starting distance from any survey
+            first = subset["Distance"].idxmax()
+        else:
+            # Pick starting survey as one where start is closest to the resistivity start
+            startLat, startLong = start
+            for i, f in enumerate(subset.Filename):
+                endLat = subset.loc[i, "EndLat"]
+                endLong = subset.loc[i, "EndLong"]
+                subset.at[i, "Distance"] = haversine(startLong, startLat, endLong, endLat)
+            # Start survey is one with shortest starting distance from the first resistivity survey
+            first = subset["Distance"].idxmin()
+        reorderedSubset = reorderedSubset.append(subset.loc[first, :]).reset_index(drop=True)
+        reorderedSubset.loc[len(reorderedSubset) - 1, "Reverse"] = False  # First line shouldn't need reversal
+        subset.drop([first], inplace=True)
+        subset.reset_index(drop=True, inplace=True)
+
+        # Reorder remaining surveys based on distance from the end of previous survey
+        while len(subset) > 0:
+            endLat = reorderedSubset.loc[len(reorderedSubset)-1, "EndLat"]
+            endLong = reorderedSubset.loc[len(reorderedSubset)-1, "EndLong"]
+            subset["Distance"] = 999999999.00
+            subset["ReverseDistance"] = 999999999.00
+            # The next line "starts" closest to the "end" of the previous line
+            for i2, f2 in enumerate(subset.Filename):
+                startLat = subset.loc[i2, "StartLat"]
+                startLong = subset.loc[i2, "StartLong"]
+                subset.at[i2, "Distance"] = haversine(startLong, startLat, endLong, endLat)
+                subset.at[i2, "ReverseDistance"] = haversine(subset.loc[i2, "EndLong"], subset.loc[i2, "EndLat"], endLong, endLat)
+
+            # Check to see if next survey section is reversed
+            if min(subset["Distance"]) <= min(subset["ReverseDistance"]):
+                nextSurvey = subset["Distance"].idxmin()
+                reorderedSubset = reorderedSubset.append(subset.loc[nextSurvey, :]).reset_index(drop=True)
+                reorderedSubset.loc[len(reorderedSubset) - 1, "Reverse"] = False
+            else:
+                nextSurvey = subset["ReverseDistance"].idxmin()
+                reorderedSubset = reorderedSubset.append(subset.loc[nextSurvey, :]).reset_index(drop=True)
+                reorderedSubset.loc[len(reorderedSubset)-1, "Reverse"] = True
+            # Remove the survey that was taken, which for a reversed survey is not the one starting closest
+            subset.drop([nextSurvey], inplace=True)
+            subset.reset_index(drop=True, inplace=True)
+        reorderedSubset.loc[0, "Reverse"] = False  # First line shouldn't need reversal (need to restate)
+        reorderedSubset.drop(["StartLat", "EndLat", "StartLong", "EndLong", "Distance", "ReverseDistance"], axis=1,
+                             inplace=True)
+    else:
+        # Otherwise, we don't need to reorder
+        reorderedSubset = subset
+        reorderedSubset.drop(["StartLat", "EndLat", "StartLong", "EndLong"], axis=1, inplace=True)
+        reorderedSubset["Reverse"] = False
+    return reorderedSubset
+
+#%%
+def sequence_surveys(subset, mode=SEQUENCE_MODE, start=None, direction=None):
+    """
+    Order surveys by the time of their first record ('time') or by the location of their ends ('geometry')
+
+    Time ordering needs StartTime for every survey and falls back to the geometric ordering otherwise. direction
+    (east, north) is the direction of travel reversed surveys run against; without it the first survey sets it. start
+    seeds the geometric ordering as in order_surveys(). Returns the Filename and Reverse columns in survey order.
+    """
+    if mode not in SEQUENCE_MODES:
+        raise ValueError("Unknown sequence mode " + str(mode) + ", expected one of " + ", ".join(SEQUENCE_MODES))
+    if mode == 'time':
+        if len(subset) > 0 and "StartTime" in subset and subset["StartTime"].notnull().all():
+            return order_by_time(subset, direction)
+        logging.warning("Survey times missing, ordering surveys by their location\n")
+    # order_surveys() changes the frame it is given
+    return order_surveys(subset[["StartLat", "EndLat", "StartLong", "EndLong", "Filename"]].copy(), start)
+
+#%%
+def name_surveys(reorderedSubset, directory, userRiverName, suffix):
+    """
+    Create new filenames for surveys based on their order
+    """
+    reorderedSubset["NewFilename"] = reorderedSubset.index + 1
+    reorderedSubset["NewFilename"] = reorderedSubset["NewFilename"].apply(
+        lambda k: os.path.join(directory, userRiverName + "_" + str(k).zfill(3) + suffix))
+    return reorderedSubset
+
+def reversed_lines(reorderedSubset):
+    """
+    New file names of the surveys flagged for reversal
+    """
+    return set(reorderedSubset.loc[reorderedSubset["Reverse"].astype(bool), "NewFilename"])
+
+#%%
+def read_bin_date(filename):
+    """
+    Survey date stored in the header of the .bin file that accompanies a resistivity .txt file
+    """
+    bname = os.path.splitext(filename)[0]
+
+    header_size=26
+    num_data_bytes=14
+
+    with open('{}.bin'.format(bname),'rb') as fin:
+        header = fin.read(header_size)
+        data_str = fin.read(num_data_bytes)
+        data = data_str.split()[0]
+    return data
+
+#%%
+def read_res_file(source, skiprows=1, name=None, compact=False):
+    """
+    Read a raw resistivity .txt file, or an open file holding its lines, into the RES_RECORD_COLUMNS layout
+
+    The records are split on the semicolons only and the GPS sentence is decoded by parse_nmea(), so a corrupt
+    sentence leaves its GPS fields empty and is flagged in GPS_Flag instead of shifting the columns after it. compact
+    reads and decodes RES_CHUNK records at a time and keeps the RES_COMPACT_COLUMNS as float32.
+    """
+    reader = pd.read_csv(source, sep=';', header=None, skiprows=skiprows, names=RES_COLUMNS,
+                         float_precision='round_trip', chunksize=RES_CHUNK if compact else None)
+    if compact:
+        # A file without records gives no chunks
+        parts = ([decode_res_records(records, True) for records in reader] or
+                 [decode_res_records(pd.DataFrame(columns=RES_COLUMNS), True)])
+        temp = pd.concat(parts, ignore_index=True) if len(parts) != 1 else parts[0]
+        del parts
+    else:
+        temp = decode_res_records(reader)
+
+    # Counts are whole numbers when every sentence carried them
+    for column in ["Fix Quality", "Satellites"]:
+        if len(temp) and temp[column].notnull().all():
+            temp[column] = temp[column].astype(np.int64)
+
+    flagged = int((temp["GPS_Flag"] != FLAG_OK).sum())
+    if flagged:
+        counts = describe_flags(temp["GPS_Flag"])
+        logging.warning(str(flagged) + " GPS sentence(s) flagged in " + str(name or source) + ": " +
+                        ", ".join(k + " " + str(v) for k, v in sorted(counts.items()) if k != 'ok' and v) + "\n")
+    return temp
+
+def decode_res_records(records, compact=False):
+    """
+    The records of a raw resistivity file, as split by read_res_file(), with the GPS sentence decoded
+    """
+    gps = parse_nmea(records["GPSString"].values)
+
+    temp = records[RES_COLUMNS[:49]].copy()
+    if compact:
+        # A channel holding text is left as it is
+        for column in RES_COMPACT_COLUMNS:
+            if temp[column].dtype.kind == 'f':
+                temp[column] = temp[column].astype(np.float32)
+    temp["GPSString"] = gps["Sentence"].values
+    temp["UTC"] = gps["UTC"].values
+    temp["Latitude2"] = gps["Latitude"].values
+    temp["D1"] = gps["NS"].values
+    temp["Longitude2"] = gps["Longitude"].values
+    temp["D2"] = gps["EW"].values
+    for column in ["Fix Quality", "Satellites", "HDOP", "Altitude"]:
+        temp[column] = gps[column].values
+    temp["D3"] = np.nan
+    temp["Height of Geoid"] = gps["Height of Geoid"].values
+    for column in ["E1", "E2", "E3", "E4", "E5", "E6", "E7", "E8", "E9"]:
+        temp[column] = np.nan
+    temp["E10"] = records["HDOP"].values
+    temp["E11"] = records["EXTRANEOUS"].values
+    temp["GPS_Flag"] = gps["Flag"].values
+    return temp
+
+#%%
+def read_resistivity(reorderedSubset, compact=False):
+    """
+    Copy resistivity data into a single frame in survey order, reversing lines flagged for reversal
+
+    compact reads the files as read_res_file() does with compact and joins them once at the end instead of after
+    each file, so the frame is not copied again for every file read.
+    """
+    print('Aggregating raw data files')
+    logging.info("Aggregating raw data files\n")
+    importfile = pd.DataFrame(columns=RES_RECORD_COLUMNS)
+    frames = []
+    for i, filename in enumerate(reorderedSubset["Filename"]):
+        temp = read_res_file(filename, compact=compact)
+        # If file flagged for reversal, reverse
+        if reorderedSubset.loc[i, "Reverse"]:
+            temp = temp.iloc[::-1]  # Reversal line
+        temp["Filename"] = reorderedSubset.loc[i, "NewFilename"]
+
+        temp['Date']=read_bin_date(filename)
+
+        temp['Date'] = pd.to_datetime(temp['Date'])
+        temp['Date'] = temp['Date'].dt.dayofyear
+
+        if compact:
+            frames.append(temp)
+        else:
+            importfile = importfile.append(temp)
+    if frames:
+        importfile = importfile.append(pd.concat(frames))
+        del frames
+    importfile.reset_index(drop=True, inplace=True)
+    return importfile
+
+#%%
+def decode_coordinates(importfile):
+    """
+    Add the processing columns and convert the degrees decimal minutes coordinates to decimal degrees
+    """
+    # Add additional data columns listed above and remove unwanted data columns
+    for x in DATA_COLUMNS:
+        importfile[x]=np.nan
+    importfile.drop(['D1', 'D2', 'D3', "E1", "E2", "E3", "E4", "E5", "E6", "E7", "E8", "E9", "E10", "E11"],
+                    inplace=True, axis=1)
+
+    importfile.set_index([range(0,len(importfile.Distance))], inplace=True)
+    importfile["Latitude"] = importfile["Latitude"].astype(str)
+    importfile["Longitude"] = importfile["Longitude"].astype(str)
+    # Reformat Latitude and Longitude to decimal degrees
+    importfile['Lat1'] = importfile['Latitude'].str[0:2]
+    importfile['Lat2'] = importfile['Latitude'].str[2:]
+    importfile['Lat2'] = importfile['Lat2'].astype(float)
+    importfile['Lat1'] = importfile['Lat1'].astype(float)
+    importfile['Lat'] = importfile.Lat1+importfile.Lat2/60
+
+    importfile['Lon1'] = importfile['Longitude'].str[0:3]
+    importfile['Lon2'] = importfile['Longitude'].str[3:]
+    importfile['Lon2'] = importfile['Lon2'].astype(float)
+    importfile['Lon1'] = importfile['Lon1'].astype(float)
+    importfile['Lon'] = importfile.Lon1-importfile.Lon2/60
+
+    importfile.drop(['Lat1','Lat2','Lon1','Lon2'], axis=1, inplace=True)
+    # Remove erroneous GPS measurements
+    importfile = importfile[importfile["Lat"] != 0]
+    importfile = importfile[importfile["Lon"] != 0]
+    importfile.reset_index(inplace=True, drop=True)
+    return importfile
+
+#%%
+def project_utm(df):
+    """
+    Converting WGS 84 coordinates to UTM 15N coordiantes
+
+    Adds the X_UTM/Y_UTM columns, projected as whole columns with the transformation geopandas uses for to_crs().
+    """
+    import pyproj
+
+    lon = np.asarray(df.Lon, dtype=float)
+    lat = np.asarray(df.Lat, dtype=float)
+    with _SPATIAL_LOCK:
+        if hasattr(pyproj, 'Transformer'):
+            x, y = pyproj.Transformer.from_crs(WGS84_CRS, UTM_CRS, always_xy=True).transform(lon, lat)
+        else:
+            x, y = pyproj.transform(pyproj.Proj(WGS84_CRS, preserve_units=True), pyproj.Proj(UTM_CRS, preserve_units=True),
+                                    lon, lat)
+
+    df['X_UTM']=x
+    df['Y_UTM']=y
+    return df
+
+def point_geometry(df, x='X_UTM', y='Y_UTM'):
+    """
+    Points at the projected coordinates of df, as a GeoSeries on its index
+
+    Call it holding _SPATIAL_LOCK.
+    """
+    import geopandas as gp
+    from shapely.geometry import Point
+
+    return gp.GeoSeries([Point(xy) for xy in zip(df[x], df[y])], index=df.index, crs=UTM_CRS)
+
+#%%
+def to_float(df):
+    """
+    Reformat numbers in the frame to float, leaving columns that cannot be converted and those already float
+    """
+    for col in df.columns[1:]:
+        if df[col].dtype.kind == 'f':
+            continue
+        try:
+            df[col] = df[col].astype(float)
+        except:
+            pass
+    return df
+
+#%%
+def number_files(df, start=1):
+    """
+    Adding File column to process data in Oasis in chunks
+
+    start is the number of the first file, for a frame that continues one already numbered.
+    """
+    # Files are numbered from 1 in order of appearance, a new number each time the file name changes. The first file
+    # keeps the text value "1" the original row-by-row loop gave it.
+    run = (df['Filename'] != df['Filename'].shift()).cumsum() + (start - 1)
+    df['File'] = run.astype(object)
+    df.loc[run == 1, 'File'] = "1"
+    return df
+
+#%%
+def read_ini(ini_file, warn=None):
+    """
+    Depth offset from the [SwitchPro] section of the INI file used to collect the resistivity data
+    """
+    try:
+        ini = pd.read_csv(ini_file, index_col=None, sep='=')
+        depthoffset = float(ini.ix['DepthOffset', '[SwitchPro]'])
+    except:
+        logging.error("No INI file selected or incorrect file format\n")
+        raise PreprocessingError("FILE ERROR", "No INI file selected or incorrect file format...")
+    if depthoffset > 0:
+        logging.warning("Positive value for depth offset from ini file\n")
+        if warn is not None:
+            warn("Positive value for depth offset from INI file")
+    return depthoffset
+
+#%%
+def screen_rho(importfile, band=(BANDPASS_MIN, BANDPASS_MAX), reject=RHO_OUT_OF_BAND, despike=False):
+    """
+    Rho of every record and channel with the channels carrying any of the reject flags set to NaN: the bandpass of
+    filter_resistivity(), without changing importfile
+
+    Returns the bandpassed Rho, the check_rho() results (logged, rho, snr, flags), and with despike the cleaned
+    DESPIKE_COLUMNS values and their despike flags (None and None without).
+    """
+    logged, rho, snr, flags = check_rho(importfile, band)
+    values = logged
+    cleaned = despikeFlags = None
+    if despike:
+        cleaned, despikeFlags = despike_frame(importfile, DESPIKE_COLUMNS)
+        # The band is checked again on the cleaned values
+        values = cleaned[:, :len(RHO_COLUMNS)]
+        with np.errstate(invalid='ignore'):
+            outside = (values < band[0]) | (values > band[1])
+        flags = (flags & ~np.uint8(RHO_OUT_OF_BAND)) | np.where(outside, RHO_OUT_OF_BAND, 0).astype(np.uint8)
+    return np.where(flags & reject, np.nan, values), (logged, rho, snr, flags), cleaned, despikeFlags
+
+def filter_resistivity(importfile, depthoffset, band=(BANDPASS_MIN, BANDPASS_MAX), window=FILTER_WINDOW,
+                       depth_factor=DEPTH_FACTOR, reject=RHO_OUT_OF_BAND, despike=False):
+    """
+    Bandpass, rolling average, depth and altitude filters on the resistivity data
+
+    Every channel is checked against Rho recomputed from the raw current and voltages (see MAP_Rho) and the channels
+    carrying any of the reject flags are dropped by the bandpass; by default only those outside the band. With despike
+    the spikes and bridge jumps are first taken out of Rho, depth and altitude (see MAP_Despike) and the filters run on
+    the <column>_despiked values.
+    """
+    if despike:
+        logging.info("Removing spikes and jumps\n")
+    bandpass, (logged, rho, snr, flags), cleaned, despikeFlags = screen_rho(importfile, band, reject, despike)
+    if despike:
+        add_despike_columns(importfile, DESPIKE_COLUMNS, cleaned, despikeFlags)
+        counts = describe_despike(despikeFlags, DESPIKE_COLUMNS)
+        logging.info("Despiked: " + (", ".join(c + " " + str(s) + " spike(s) " + str(j) + " jump record(s)"
+                                                for c, (s, j) in sorted(counts.items()) if s or j) or "none") + "\n")
+
+    # Applying the bandpass filter and rolling average
+    logging.info("Applying bandpass filter\n")
+    counts = describe_rho_flags(flags & RHO_QUALITY)
+    flagged = int(((flags & RHO_QUALITY) != 0).sum())
+    if flagged:
+        logging.warning(str(flagged) + " resistivity channel(s) flagged: " +
+                        ", ".join(k + " " + str(v) for k, v in sorted(counts.items()) if k != 'ok' and v) + "\n")
+    for x in range(1,11):
+        importfile['Rho {}_bandpass'.format(x)] = bandpass[:, x - 1]
+        rolling_avg(importfile, 'Rho {}'.format(x), 'Rho {}_bandpass'.format(x), window)
+    add_check_columns(importfile, logged, rho, snr, flags)
+
+    #%%
+    # Applying the depth filter
+    logging.info("Applying depth filter\n")
+    depth_filt(importfile, 'Depth', depthoffset, depth_factor, 'Depth_despiked' if despike else None)
+    rolling_avg(importfile, 'Depth', 'Depth_filt', window)
+
+    #%%
+    # Filtering Altitude via rolling median filter
+    logging.info("Filtering altitude via rolling median filter\n")
+    rolling_median(importfile, 'Altitude', 'Altitude_despiked' if despike else 'Altitude', window)
+
+    #%%
+    #Rounding Altitude to the decimeter
+    importfile['Altitude_rollmed']=importfile['Altitude_rollmed'].round(1)
+    return importfile
+
+#%%
+def corrected_distance(importfile):
+    """
+    Calculating the distance from UTM coordinates
+    """
+    print("Calculating distance from UTM coordinates")
+    logging.info("Calculating distance from UTM coordinates\n")
+    importfile["Cor_Dist"] = np.sqrt(np.square(importfile['X_UTM'] - importfile['X_UTM'].shift()) +
+                                     np.square(importfile['Y_UTM'] - importfile['Y_UTM'].shift()))
+    importfile["Cor_Dist"][0]=0.00
+    importfile["Cum_dist"] = importfile["Cor_Dist"].cumsum()
+    importfile["Cum_dist"][0]=0.00
+    return importfile
+
+#%%
+def read_wq(wqreorderedSubset, frames=None):
+    """
+    Import the water quality data based on the reordered index, using the records in frames where discover_wq()
+    kept them
+    """
+    print('Importing water quality data')
+    qwdata = pd.DataFrame(columns=WQ_COLUMNS)
+    for i, filename in enumerate(wqreorderedSubset["Filename"]):
+        temp = frames[filename] if frames is not None and filename in frames else read_wq_file(filename)
+        # If file flagged for reversal, reverse
+        if wqreorderedSubset.loc[i, "Reverse"]:
+            temp = temp.iloc[::-1]  # Reversal line
+        temp["Filename"] = wqreorderedSubset.loc[i, "NewFilename"]
+        qwdata = qwdata.append(temp)
+    qwdata.reset_index(drop=True, inplace=True)
+    print('Water-quality data imported')
+    return qwdata
+
+#%%
+def clean_wq(qwdata):
+    """
+    Remove erroneous GPS and overrange records and convert the sonde resistivity to ohm-m
+    """
+    print('Processing water-quality data')
+    logging.info("Processing water-quality data\n")
+    # Remove erroneous GPS measurements
+    qwdata = qwdata[qwdata["Lat"] != 0.00]
+    qwdata = qwdata[qwdata["Lon"] != 0.00]
+    qwdata.reset_index(inplace=True, drop=True)
+
+    qwdata.dropna(axis=1, how='all', inplace=True)
+    qwdata.rename(columns={'°C':'Temp_C', 'SPC-uS/cm': 'SPC_mscm','C-uS/cm':'Cond_mscm','ohm-cm':'Res_ocm','ALT m':'Alt_m'}, inplace=True)
+    # Overrange readings (+++++) were read as missing
+    qwdata = qwdata.loc[qwdata.Res_ocm.notnull(),:]
+    qwdata['Res_ocm'] = qwdata['Res_ocm'].astype('float')
+    qwdata['Ohm_m']=qwdata['Res_ocm']/100
+    return qwdata
+
+#%%
+def join_pairs(x, y, wqx, wqy, buffer=JOIN_BUFFER):
+    """
+    Positions of the points (x, y) and of the water-quality points (wqx, wqy) whose buffers they intersect, in point
+    order and then water-quality order, with -1 for a point no buffer reaches
+
+    The buffers are the polygons shapely draws around each water-quality point. Their vertices lie on the circle of
+    radius buffer and their edges outside the circle of the inscribed radius, so the KD-tree distance decides every
+    pair except the few points between the two circles, which are tested against the polygon itself.
+    """
+    from scipy.spatial import cKDTree
+    from shapely.geometry import Point
+    from shapely.prepared import prep
+
+    x, y, wqx, wqy = [np.asarray(v, dtype=float) for v in (x, y, wqx, wqy)]
+    points = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    wqPoints = np.flatnonzero(np.isfinite(wqx) & np.isfinite(wqy))
+    point = np.array([], dtype=np.int64)
+    wq = np.array([], dtype=np.int64)
+    if len(points) and len(wqPoints):
+        tree = cKDTree(np.column_stack((x[points], y[points])))
+        wqTree = cKDTree(np.column_stack((wqx[wqPoints], wqy[wqPoints])))
+        near = wqTree.query_ball_tree(tree, buffer + JOIN_TOLERANCE)
+        wq = np.repeat(wqPoints, [len(n) for n in near])
+        point = points[np.concatenate([np.asarray(n, dtype=np.int64) for n in near])]
+        distance = np.hypot(x[point] - wqx[wq], y[point] - wqy[wq])
+        edge = np.flatnonzero(distance > buffer * np.cos(np.pi / (4 * JOIN_RESOLUTION)) - JOIN_TOLERANCE)
+        if len(edge):
+            keep = np.ones(len(point), dtype=bool)
+            polygons = {}
+            with _SPATIAL_LOCK:
+                for k in edge:
+                    if wq[k] not in polygons:
+                        polygons[wq[k]] = prep(Point(wqx[wq[k]], wqy[wq[k]]).buffer(buffer, JOIN_RESOLUTION))
+                    keep[k] = polygons[wq[k]].intersects(Point(x[point[k]], y[point[k]]))
+            point = point[keep]
+            wq = wq[keep]
+
+    # Points no buffer reaches keep a row without a match
+    alone = np.setdiff1d(np.arange(len(x)), point)
+    point = np.concatenate((point, alone))
+    wq = np.concatenate((wq, np.full(len(alone), -1, dtype=np.int64)))
+    order = np.lexsort((wq, point))
+    return point[order], wq[order]
+
+def join_wq(importfile, qwdata, buffer=JOIN_BUFFER):
+    """
+    Creating buffers and spatially joining QW with resitivity data, then populating the final fields
+
+    The rows and columns are those of a geopandas left sjoin of the resistivity points with the buffered
+    water-quality points: a row for each buffer a point intersects, or one without a match, with index_right and
+    the _left/_right names it gives. The pairs come from join_pairs(), so no geometry is built for the frames.
+    """
+    return finish_join(join_rows(importfile, qwdata, buffer)[0])
+
+def join_rows(importfile, qwdata, buffer=JOIN_BUFFER):
+    """
+    The rows of join_wq() before the water quality is interpolated over the points without a match, and the position
+    in importfile of each; the rows are in importfile order
+    """
+    point, wq = join_pairs(importfile['X_UTM'], importfile['Y_UTM'], qwdata['X_UTM'], qwdata['Y_UTM'], buffer)
+    resOhm = importfile.iloc[point]
+    # Unmatched points get a row of NaN (position -1)
+    qwdata1 = qwdata[JOIN_COLUMNS].reset_index(drop=True).reindex(wq)
+    qwdata1.insert(0, 'index_right', pd.Series(qwdata.index.values[wq]).where(wq >= 0).values)
+    both = set(resOhm.columns) & set(qwdata1.columns)
+    resOhm.rename(columns=dict((c, c + '_left') for c in both), inplace=True)
+    for c in qwdata1.columns:
+        resOhm[c + '_right' if c in both else c] = qwdata1[c].values
+    return resOhm, point
+
+def finish_join(resOhm):
+    """
+    Interpolating the water quality over the rows of join_rows() without a match and populating the final fields
+    """
+    resOhm[['Ohm_m_rollavg','Temp_C']] = resOhm[['Ohm_m_rollavg','Temp_C']].interpolate()
+    resOhm[['Ohm_m_rollavg','Temp_C']] = resOhm[['Ohm_m_rollavg','Temp_C']].fillna(method='bfill')
+    resOhm['Temp_C'] = resOhm['Temp_C'].round(1)
+
+    #%%
+    # Populating the final fields
+    resOhm['Ohm_m'] = resOhm['Ohm_m_rollavg']
+    resOhm['Final_Altitude'] = resOhm['Altitude_rollmed']
+    resOhm['Cor_Depth'] = resOhm['Depth_filt']
+    for x in range(1,11):
+        resOhm['Final_Rho_{}'.format(x)] = resOhm['Rho {}_rollavg'.format(x)]
+
+    #%%
+    # Converting *s to NaNs for import into GIS as a float
+    restore_missing(resOhm)
+    return resOhm
+
+def merged_records(resOhm):
+    """
+    One row per resistivity record of a merged QW/resistivity table, which has a row for every water-quality buffer a
+    record falls in: the first row of each record, with RECORD_MEAN_COLUMNS averaged over its rows
+
+    The rows of a record are next to each other and share its index in the frame join_wq() returns; in a table read
+    back from csv they are told apart by RECORD_KEY, and a table without those columns is returned as it is.
+    """
+    if isinstance(resOhm.index, pd.RangeIndex):
+        if not set(RECORD_KEY) <= set(resOhm.columns):
+            return resOhm
+        key = resOhm[RECORD_KEY].astype(str)
+        record = (key != key.shift()).any(axis=1).cumsum().values
+    else:
+        record = resOhm.index.values
+    first = ~pd.Series(record).duplicated().values
+    if first.all():
+        return resOhm
+    records = resOhm[first].copy()
+    for c in RECORD_MEAN_COLUMNS:
+        if c in resOhm.columns:
+            mean = pd.to_numeric(resOhm[c], errors='coerce').groupby(record, sort=False).mean().values
+            records[c] = mean.round(1) if c == 'Temp_C' else mean
+    return records
+
+#%%
+def write_summary(summaryPath, importfile1, reorderedSubset, wqreorderedSubset):
+    """
+    Write summary file
+    """
+    try:
+        summaryFile = open(summaryPath, "w+")
+    except IOError:
+        logging.critical("Error: could not write summary file")
+        raise PreprocessingError("FILE ERROR", "Could not write summary file")
+    summaryFile.write("Processed on {:%Y-%m-%d %H:%M:%S}\n\n".format(datetime.datetime.now()))
+    totalDistance = importfile1.loc[len(importfile1)-1, "Cum_dist"]/1000
+    summaryFile.write("Total distance processed: %.2f" % totalDistance + " kilometers\n")
+    summaryFile.write("Number of resistivity files read: " + str(len(reorderedSubset)) + "\n")
+    for f in reorderedSubset.NewFilename:
+        summaryFile.write(f)
+        summaryFile.write('\n')
+    summaryFile.write("\n\nNumber of water quality files read: " + str(len(wqreorderedSubset)) + "\n")
+    for f in wqreorderedSubset.NewFilename:
+        summaryFile.write(f)
+        summaryFile.write('\n')
+    summaryFile.write("\n\n")
+    summaryFile.close()
+
+#%%
+def release_columns(importfile, columns):
+    """
+    Data-release columns, followed by the river station and lateral offset when the run was stationed
+    """
+    return columns + [c for c in STATION_COLUMNS if c in importfile.columns]
+
+#%%
+def data_release_frames(importfile, fieldValues):
+    """
+    Raw and processed data-release tables with the instrument serial numbers attached
+
+    Builds both tables in memory; write_data_release() streams the same files without them.
+    """
+    dr_raw=importfile[release_columns(importfile, DR_RAW_COLUMNS)]
+
+    dr_post=importfile[release_columns(importfile, DR_POST_COLUMNS)]
+    #%%
+    for name, value in zip(DR_SERIAL_COLUMNS, fieldValues):
+        dr_raw[name]=value
+        dr_post[name]=value
+
+    dr_raw.rename(columns=DR_RAW_NAMES, inplace=True)
+
+    dr_post.rename(columns=DR_POST_NAMES, inplace=True)
+    return dr_raw, dr_post
+
+#%%
+def locked_features(points):
+    """
+    The features of a GeoDataFrame one at a time, each built holding _SPATIAL_LOCK
+
+    Only the GEOS calls that turn a point into its feature take turns; whatever is done with the feature is not.
+    """
+    features = points.iterfeatures()
+    while True:
+        with _SPATIAL_LOCK:
+            feature = next(features, None)
+        if feature is None:
+            return
+        yield feature
+
+def write_shapefile(frame, savePath, xy=('X_UTM', 'Y_UTM'), chunk_size=None):
+    """
+    Write frame as a shapefile with a point at the xy columns of each row, chunk_size rows at a time when given
+
+    The features of a whole frame take several hundred MB on a long reach; written a chunk at a time only those of
+    one chunk are held, and the file is the same. The points, the schema and each feature are built holding
+    _SPATIAL_LOCK, but not the fiona writes, so shapefiles written in other threads are written at the same time.
+    """
+    import fiona
+    import geopandas as gp
+    from geopandas.io.file import infer_schema
+
+    step = chunk_size or max(len(frame), 1)
+    collection = None
+    try:
+        with fiona.Env():
+            for first in range(0, max(len(frame), 1), step):
+                part = frame.iloc[first:first + step]
+                compact = [c for c in part.columns if part[c].dtype == np.float32]
+                if compact:
+                    part = part.copy(deep=False)
+                    for c in compact:
+                        part[c] = exact_floats(part[c].values)
+                with _SPATIAL_LOCK:
+                    # A shallow copy, as adding the geometry column would otherwise add it to frame
+                    points = gp.GeoDataFrame(part.copy(deep=False), geometry=point_geometry(part, *xy))
+                    schema = infer_schema(points) if collection is None else None
+                if collection is None:
+                    collection = fiona.open(savePath, 'w', driver='ESRI Shapefile', crs=points.crs, schema=schema)
+                collection.writerecords(locked_features(points))
+    finally:
+        if collection is not None:
+            collection.close()
+
+def export(frame, savePath, description, shapefile=False, xy=('X_UTM', 'Y_UTM'), chunk_size=None):
+    """
+    Write a csv file or shapefile, turning an IOError into a PreprocessingError naming the output
+
+    A shapefile gets a point at the xy columns of each row, chunk_size rows at a time when given (see
+    write_shapefile()).
+    """
+    try:
+        if shapefile:
+            write_shapefile(frame, savePath, xy, chunk_size)
+        else:
+            frame.to_csv(savePath, index=False)
+    except IOError:
+        kind = "shapefile" if shapefile else "file"
+        logging.critical("Error: could not save {} to {}.  Ensure file is not open.".format(description, kind))
+        raise PreprocessingError("FILE ERROR", "Could not save {} to {}.  Ensure filename is not open.".format(description, kind))
+
+#%%
+def release_path(path, compression=None):
+    """
+    Data-release path with the extension of its compression added
+    """
+    if compression and not path.endswith(DR_EXTENSIONS[compression]):
+        path += DR_EXTENSIONS[compression]
+    return path
+
+#%%
+def write_release_file(importfile, columns, names, constants, path, compression=None, chunk_size=DR_CHUNK):
+    """
+    Write the columns of importfile as a data-release csv, chunk_size rows at a time
+
+    Columns are renamed with names and the (name, value) pairs in constants are added as columns at the end of each
+    chunk as it is written, so neither the selected table nor the constant columns are built at full length. The
+    file is gzip or zstd compressed when compression is given, with its extension added to path. Returns the
+    manifest record of the file written.
+    """
+    path = release_path(path, compression)
+    header = [names.get(c, c) for c in columns] + [name for name, value in constants]
+    digest = hashlib.sha256()
+    frame = compressor(compression) if compression else None
+    size = 0
+    try:
+        with open(path, 'wb') as fout:
+            for start in range(0, max(len(importfile), 1), chunk_size):
+                chunk = importfile.iloc[start:start + chunk_size][columns].copy()
+                for name, value in constants:
+                    chunk[name] = value
+                text = chunk.to_csv(None, header=header if start == 0 else False, index=False)
+                data = text if isinstance(text, bytes) else text.encode('utf-8')
+                if frame is not None:
+                    data = frame.compress(data)
+                fout.write(data)
+                digest.update(data)
+                size += len(data)
+            if frame is not None:
+                data = frame.flush()
+                fout.write(data)
+                digest.update(data)
+                size += len(data)
+    except IOError:
+        logging.critical("Error: could not save {} to file.  Ensure file is not open.".format(os.path.basename(path)))
+        raise PreprocessingError("FILE ERROR", "Could not save {} to file.  Ensure filename is not open.".format(path))
+    return {'File': path, 'Rows': len(importfile), 'Bytes': size, 'SHA256': digest.hexdigest(),
+            'Compression': compression or 'none'}
+
+#%%
+def write_release_manifest(records, folder):
+    """
+    Write the size, row count and SHA-256 checksum of each data-release file to DATA_RELEASE_MANIFEST.csv in folder
+    """
+    manifest = pd.DataFrame(records, columns=DR_MANIFEST_COLUMNS)
+    manifest['File'] = [os.path.relpath(f, folder) for f in manifest['File']]
+    manifestPath = os.path.join(folder, DR_MANIFEST_FILE)
+    manifest.to_csv(manifestPath, index=False)
+    return manifestPath
+
+#%%
+def load_centerline(path):
+    """
+    River centerline from a shapefile, indexed for stationing (see MAP_Station)
+    """
+    try:
+        with _SPATIAL_LOCK:
+            x, y = read_centerline(path)
+        return Centerline(x, y)
+    except (IOError, OSError, ValueError) as e:
+        logging.error("Could not read river centerline " + path + ": " + str(e) + "\n")
+        raise PreprocessingError("FILE ERROR", "Could not read river centerline " + path + ": " + str(e))
+
+#%%
+def default_save_as(directory):
+    """
+    Save-location chooser for headless runs: every output goes into directory under its default name
+    """
+    def save_as(initialfile, title):
+        return os.path.join(directory, initialfile)
+    return save_as
+
+#%%
+def run_oasis(userRiverName, res_folder, wq_folder, ini_file, directory, save_as=None, warn=None, metrics=None,
+              archive_mode=ARCHIVE_MODE, sequence=SEQUENCE_MODE, overlap=OVERLAP_MODE,
+              overlap_tolerance=OVERLAP_TOLERANCE, centerline=None, bin_size=None, bin_by=BIN_MODE,
+              sections=None, reject_flagged=False, despike=False, tiles=False, catalog=True,
+              store=None, memory_budget=None):
+    """
+    Combine, filter, project and join a reach's resistivity and water-quality surveys and write the Oasis outputs
+
+    save_as(initialfile, title) returns the path for each output; by default everything is written to directory.
+    warn(message) is called for non-fatal problems the user should see. archive_mode picks how the raw files are kept in
+    Raw_Data_Renamed (see MAP_Archive), sequence how the surveys are ordered (see sequence_surveys()) and overlap how
+    re-surveyed coverage is found ('box' for the test of the original preprocessor, 'none' to keep it; see MAP_Overlap),
+    overlap_tolerance how near (m) an earlier line's track a point is re-surveyed coverage. With a centerline shapefile
+    every resistivity and water-quality point gets its river Station and lateral Offset. With a bin_size the merged data
+    are also written binned every bin_size metres of Cum_dist, or seconds when bin_by is 'time' (see MAP_Decimate).
+    sections ('npz' or 'netcdf') also writes a pseudo-section of each profile into Sections (see MAP_Section).
+    reject_flagged also drops the resistivity channels whose logged Rho disagrees with the raw current and voltages or
+    whose signal is weak (see MAP_Rho). despike removes the spikes and bridge jumps from Rho, depth and altitude before
+    they are filtered (see MAP_Despike). tiles also writes the merged data as a pyramid of web map tiles into Tiles (see
+    MAP_Tiles). Once everything is written the reach is recorded in the survey catalog (see MAP_Catalog): by default
+    OASIS_CATALOG.sqlite in the folder above directory, or the catalog path given; False leaves it out. store loads the
+    processed, water-quality and merged tables into a typed SQLite database (see MAP_Store): True for OASIS_STORE.sqlite
+    in the folder above directory, or its path. The memory the run will need is projected from the record counts found
+    by discovery (see MAP_Memory); when it is over memory_budget (MB, by default three quarters of the physical memory)
+    the outputs are written one at a time, the shapefiles in chunks, garbage is collected between stages and the Rho
+    channels are read in chunks and held as float32. That about halves the peak (764 MB to some 400 MB on 50,000
+    records), but the join is still built whole, so a reach of 1,000,000 records still needs some 7 GB. Returns a dict
+    with the processed frames, the ordered file lists, the output paths and the stage metrics.
+    """
+    if save_as is None:
+        save_as = default_save_as(directory)
+    if metrics is None:
+        metrics = StageMetrics(userRiverName)
+    # Sample the memory of the run, unless the caller already does
+    sampler = None
+    if metrics.memory is None:
+        sampler = metrics.memory = MemorySampler()
+    # A stage that raises must not leave the writer threads or the sampler running in the caller's process
+    writer = None
+    try:
+        check_inputs(res_folder, wq_folder, ini_file)
+        line = load_centerline(centerline) if centerline else None
+        outputs = {}
+
+        # %% -----------------------------------------------------------------------------------------------------------------
+        path = raw_data_folder(directory)
+        archive = RawArchive(path, userRiverName, archive_mode)
+
+        # %% -----------------------------------------------------------------------------------------------------------------
+        print("Verifying continuity of surveys")
+        logging.info("Verifying continuity of surveys\n")
+        outfilename = os.path.join(res_folder, "all.txt")
+        resFiles = [f for f in glob.glob('{}/*.txt'.format(res_folder)) if f != outfilename]
+        metrics.start('res_discovery', rows_in=len(resFiles), bytes_read=file_size(resFiles))
+        resCounts = {}
+        subset, excludeSurveys = discover_resistivity(res_folder, outfilename, counts=resCounts)
+
+        # Track files that were removed due to their length
+        if len(excludeSurveys) > 0:
+            logging.info("Writing excluded surveys to file\n")
+            excludeSurveys.to_csv(os.path.join(path, "EXCLUDED_SURVEYS_RES.txt"), index=False)
+        metrics.stop('res_discovery', rows_out=len(subset))
+
+        # Project the peak memory of the run before the surveys are read in full; the water-quality files are only
+        # counted by their lines here
+        wqFiles = glob.glob('{}/*.csv'.format(wq_folder))
+        resRows = sum(resCounts.values())
+        wqRows = count_lines(wqFiles)
+        estimate = estimate_memory(resRows, wqRows)
+        budget = memory_limit(memory_budget)
+        lowMemory = log_memory_plan(estimate, budget)
+        metrics.memory_plan = {'res_rows': resRows,
+                               'wq_lines': wqRows,
+                               'estimate_mb': round(estimate / MB, 1),
+                               'budget_mb': round(budget / MB, 1) if budget is not None else None,
+                               'low_memory': lowMemory}
+
+        # Outputs are written in the background while the processing continues; over the budget one at a time and the
+        # shapefiles a chunk at a time, so only one output holds its copy of a frame at once
+        writer = OutputWriter(metrics, threads=1, queue_size=1) if lowMemory else OutputWriter(metrics)
+        shapeChunk = SHAPEFILE_CHUNK if lowMemory else None
+
+        metrics.start('res_ordering', rows_in=len(subset))
+        reorderedSubset = sequence_surveys(subset, sequence)
+        reorderedSubset = name_surveys(reorderedSubset, directory, userRiverName, ".txt")
+        logging.info("Writing renamed resistivity directory to file\n")
+        reorderedSubset.to_csv(os.path.join(path, "RENAMED_RESISTIVITY_FILE_DIRECTORY.txt"), index=False)
+        metrics.stop('res_ordering', rows_out=len(reorderedSubset))
+
+        # Rename the actual files in the renamed directory
+        metrics.start('res_archive', rows_in=len(reorderedSubset))
+        written = archive.add(reorderedSubset)
+        metrics.stop('res_archive', rows_out=len(reorderedSubset),
+                     bytes_read=file_size(list(reorderedSubset["Filename"])) if written else 0, bytes_written=written)
+
+        # %% -----------------------------------------------------------------------------------------------------------------
+        # Preprocessing Resistivity Data
+        resInputs = list(reorderedSubset["Filename"]) + [os.path.splitext(f)[0] + '.bin' for f in reorderedSubset["Filename"]]
+        metrics.start('res_ingest', rows_in=len(reorderedSubset), bytes_read=file_size(resInputs))
+        importfile = read_resistivity(reorderedSubset, compact=lowMemory)
+
+        # Write combined file
+        importfile.to_csv(outfilename, index=False)
+        metrics.stop('res_ingest', rows_out=len(importfile), bytes_written=file_size(outfilename))
+
+        print('Processing resistivity data')
+        logging.info("Processing resistivity data\n")
+        metrics.start('res_coordinate_decode', rows_in=len(importfile))
+        importfile = decode_coordinates(importfile)
+        metrics.stop('res_coordinate_decode', rows_out=len(importfile))
+
+        #%%
+        logging.info("Converting WGS84 coordinates\n")
+        metrics.start('res_projection', rows_in=len(importfile))
+        importfile = project_utm(importfile)
+        metrics.stop('res_projection', rows_out=len(importfile))
+
+        #%%
+        # Removing re-surveyed coverage (by default points within tolerance of any earlier line's track)
+        logging.info("Removing overlapping survey coverage\n")
+        metrics.start('res_overlap', rows_in=len(importfile))
+        importfile = remove_overlaps(importfile, 'Filename', tolerance=overlap_tolerance, mode=overlap,
+                                     reversed_lines=reversed_lines(reorderedSubset))
+        metrics.stop('res_overlap', rows_out=len(importfile))
+
+        importfile = to_float(importfile)
+
+        metrics.start('res_numbering', rows_in=len(importfile))
+        importfile = number_files(importfile)
+        metrics.stop('res_numbering', rows_out=len(importfile))
+
+        # %% -----------------------------------------------------------------------------------------------------------------
+        # Import INI file
+        depthoffset = read_ini(ini_file, warn)
+
+        metrics.start('res_filtering', rows_in=len(importfile))
+        importfile = filter_resistivity(importfile, depthoffset,
+                                        reject=RHO_OUT_OF_BAND | (RHO_QUALITY if reject_flagged else 0), despike=despike)
+        metrics.stop('res_filtering', rows_out=len(importfile))
+
+        metrics.start('res_distance', rows_in=len(importfile))
+        importfile = corrected_distance(importfile)
+        metrics.stop('res_distance', rows_out=len(importfile))
+
+        if line is not None:
+            logging.info("Stationing resistivity data along the river centerline\n")
+            metrics.start('res_stationing', rows_in=len(importfile))
+            importfile = add_stations(importfile, line)
+            metrics.stop('res_stationing', rows_out=len(importfile))
+
+        # %% -----------------------------------------------------------------------------------------------------------------
+        #Replacing all NaNs with "*"
+        fill_missing(importfile)
+        if lowMemory:
+            gc.collect()
+
+        #%%
+        logging.info("Saving processed resistivity file\n")
+        outputs['res_csv'] = save_as('{}_Res.csv'.format(userRiverName), "Designate resitivity csv name and location")
+        writer.submit('export_res_csv', export, (importfile, outputs['res_csv'], "resistivity data"),
+                      rows=len(importfile), paths=outputs['res_csv'])
+
+        if sections:
+            logging.info("Gridding resistivity pseudo-sections\n")
+            outputs['sections'] = os.path.join(directory, SECTION_FOLDER)
+            writer.submit('export_sections', write_sections, (importfile, outputs['sections'], userRiverName, sections),
+                          rows=len(importfile),
+                          paths=[section_path(outputs['sections'], userRiverName, p, sections)
+                                 for p in importfile['File'].astype(str).unique()])
+
+        # %% -----------------------------------------------------------------------------------------------------------------
+        # Preprocessing QW Data
+        metrics.start('wq_discovery', rows_in=len(wqFiles), bytes_read=file_size(wqFiles))
+        wqFrames = {}
+        wqsubset, wqexcludeSurveys = discover_wq(wq_folder, wqFrames)
+
+        # Track files that were removed due to their length
+        logging.info("Writing excluded surveys to file\n")
+        wqexcludeSurveys.to_csv(os.path.join(path, "EXCLUDED_SURVEYS_WQ.txt"), index=False)
+        metrics.stop('wq_discovery', rows_out=len(wqsubset))
+
+        metrics.start('wq_ordering', rows_in=len(wqsubset))
+        wqreorderedSubset = sequence_surveys(wqsubset, sequence, start=(importfile.loc[0, "Lat"], importfile.loc[0, "Lon"]),
+                                             direction=line_direction(importfile))
+        wqreorderedSubset = name_surveys(wqreorderedSubset, directory, userRiverName, "_WQ.csv")
+        logging.info("Writing renamed water quality directory to file\n")
+        wqreorderedSubset.to_csv(os.path.join(path, "RENAMED_WQ_FILE_DIRECTORY.txt"), index=False)
+        metrics.stop('wq_ordering', rows_out=len(wqreorderedSubset))
+
+        # Rename the actual files in the renamed directory
+        metrics.start('wq_archive', rows_in=len(wqreorderedSubset))
+        written = archive.add(wqreorderedSubset)
+        outputs['raw_archive'] = archive.close()
+        metrics.stop('wq_archive', rows_out=len(wqreorderedSubset),
+                     bytes_read=file_size(list(wqreorderedSubset["Filename"])) if written else 0, bytes_written=written)
+
+        # %% -----------------------------------------------------------------------------------------------------------------
+        metrics.start('wq_ingest', rows_in=len(wqreorderedSubset), bytes_read=file_size(list(wqreorderedSubset["Filename"])))
+        qwdata = read_wq(wqreorderedSubset, wqFrames)
+        del wqFrames
+        metrics.stop('wq_ingest', rows_out=len(qwdata))
+
+        # %% -----------------------------------------------------------------------------------------------------------------
+        metrics.start('wq_cleaning', rows_in=len(qwdata))
+        qwdata = clean_wq(qwdata)
+        metrics.stop('wq_cleaning', rows_out=len(qwdata))
+
+        # %% -----------------------------------------------------------------------------------------------------------------
+        metrics.start('wq_projection', rows_in=len(qwdata))
+        qwdata = project_utm(qwdata)
+        metrics.stop('wq_projection', rows_out=len(qwdata))
+
+        #%%
+        # Removing re-surveyed coverage (by default points within tolerance of any earlier line's track)
+        logging.info("Removing overlapping water-quality coverage\n")
+        metrics.start('wq_overlap', rows_in=len(qwdata))
+        qwdata = remove_overlaps(qwdata, 'Filename', tolerance=overlap_tolerance, mode=overlap,
+                                 reversed_lines=reversed_lines(wqreorderedSubset))
+        metrics.stop('wq_overlap', rows_out=len(qwdata))
+
+        if line is not None:
+            metrics.start('wq_stationing', rows_in=len(qwdata))
+            qwdata = add_stations(qwdata, line)
+            metrics.stop('wq_stationing', rows_out=len(qwdata))
+
+        # %% -----------------------------------------------------------------------------------------------------------------
+        # Applying a rolling average on resistivity
+        metrics.start('wq_filtering', rows_in=len(qwdata))
+        rolling_avg(qwdata, 'Ohm_m', 'Ohm_m', FILTER_WINDOW)
+        qwdata = to_float(qwdata)
+        metrics.stop('wq_filtering', rows_out=len(qwdata))
+
+        # %% -----------------------------------------------------------------------------------------------------------------
+        metrics.start('wq_numbering', rows_in=len(qwdata))
+        qwdata.reset_index(inplace=True)
+        qwdata = number_files(qwdata)
+        metrics.stop('wq_numbering', rows_out=len(qwdata))
+
+        #%%
+        #Exporting resistivity data as a shapefile
+        logging.info("Saving processed water-quality shapefile\n")
+        outputs['wq_shp'] = save_as('{}_WQ.shp'.format(userRiverName), "Designate water-quality shapefile name and location")
+        writer.submit('export_wq_shp', export,
+                      (qwdata, outputs['wq_shp'], "processed water-quality data", True, ('X_UTM', 'Y_UTM'), shapeChunk),
+                      rows=len(qwdata), paths=outputs['wq_shp'])
+
+        #%%
+        if lowMemory:
+            gc.collect()
+        metrics.start('join', rows_in=len(importfile))
+        resOhm = join_wq(importfile, qwdata)
+        metrics.stop('join', rows_out=len(resOhm))
+
+        #%%
+        logging.info("Saving preliminary merged QW/resistivity shapefile\n")
+        outputs['merged_shp'] = save_as('{}_Merged_QWRes.shp'.format(userRiverName), "Designate preliminary merged QW/resitivity shapefile name and location")
+        writer.submit('export_merged_shp', export,
+                      (resOhm, outputs['merged_shp'], "preliminary merged QW/resistivity data", True, ('X_UTM_left', 'Y_UTM_left'),
+                       shapeChunk),
+                      rows=len(resOhm), paths=outputs['merged_shp'])
+
+        #%%
+        logging.info("Export preliminary merged QW/resisitivty data\n")
+        outputs['merged_csv'] = save_as('{}_Merged_WQRes.csv'.format(userRiverName), "Designate preliminary merged QW/resisitivty csv name and location")
+        writer.submit('export_merged_csv', export, (resOhm, outputs['merged_csv'], "preliminary merged QW/resisitivty data"),
+                      rows=len(resOhm), paths=outputs['merged_csv'])
+
+        # The tiles and bins are of resistivity records, not of their rows for each water-quality buffer
+        records = merged_records(resOhm) if tiles or bin_size else None
+
+        if tiles:
+            logging.info("Building the web map tile pyramid\n")
+            outputs['tiles'] = os.path.join(directory, TILE_FOLDER)
+            writer.submit('export_tiles', write_tiles, (records, outputs['tiles'], userRiverName),
+                          rows=len(records), paths=os.path.join(outputs['tiles'], TILE_JSON))
+
+        #%%
+        if bin_size:
+            logging.info("Binning merged QW/resistivity data every {:g} {}\n".format(bin_size, 's' if bin_by == 'time' else 'm'))
+            metrics.start('decimation', rows_in=len(records))
+            binned = decimate(records, bin_size, bin_by)
+            fill_missing(binned)
+            metrics.stop('decimation', rows_out=len(binned))
+            outputs['binned_csv'] = save_as('{}_Merged_WQRes_Binned.csv'.format(userRiverName), "Designate binned merged QW/resisitivty csv name and location")
+            writer.submit('export_binned_csv', export, (binned, outputs['binned_csv'], "binned merged QW/resisitivty data"),
+                          rows=len(binned), paths=outputs['binned_csv'])
+
+        #%%
+        logging.info("Export water quality data\n")
+        outputs['wq_csv'] = save_as('{}_WQ.csv'.format(userRiverName), "Designate water-quality csv name and location")
+        writer.submit('export_wq_csv', export, (qwdata, outputs['wq_csv'], "water-quality data"),
+                      rows=len(qwdata), paths=outputs['wq_csv'])
+
+        if store:
+            logging.info("Loading the processed tables into the store\n")
+            outputs['store'] = store_path(directory) if store is True else store
+            writer.submit('export_store', write_store,
+                          (outputs['store'], userRiverName, directory, importfile, qwdata, resOhm, reorderedSubset, subset),
+                          rows=len(importfile) + len(qwdata) + len(resOhm), paths=outputs['store'])
+
+        # %% -----------------------------------------------------------------------------------------------------------------
+        outputs['summary'] = os.path.join(directory, "OASIS_PREPROCESSING_SUMMARY.txt")
+        writer.submit('export_summary', write_summary, (outputs['summary'], importfile, reorderedSubset, wqreorderedSubset),
+                      paths=outputs['summary'])
+
+        # Wait for the writes, then report every output that could not be saved at once
+        errors = writer.close()
+        if not errors:
+            print('Resistivity, water-quality and merged QW/resistivity outputs exported!')
+
+        # Write stage metrics next to the summary file
+        outputs['metrics'] = os.path.join(directory, "OASIS_PREPROCESSING_METRICS.json")
+        try:
+            metrics.write(outputs['metrics'])
+        except IOError:
+            logging.error("Error: could not write stage metrics file\n")
+        if errors:
+            raise PreprocessingError("FILE ERROR", "\n".join(errors))
+
+        # Record the reach in the survey catalog; a catalog that cannot be written does not fail the run
+        if catalog:
+            catalogPath = catalog_path(directory) if catalog is True else catalog
+            try:
+                record_run(catalogPath, userRiverName, directory,
+                           [profile_table(importfile, 'res', reorderedSubset, subset, RES_STAT_COLUMNS),
+                            profile_table(qwdata, 'wq', wqreorderedSubset, wqsubset, WQ_STAT_COLUMNS)],
+                           outputs, {'res': len(importfile), 'wq': len(qwdata), 'merged': len(resOhm)})
+                outputs['catalog'] = catalogPath
+            except (sqlite3.Error, IOError, OSError) as e:
+                logging.error("Error: could not update the survey catalog " + catalogPath + ": " + str(e) + "\n")
+
+        return {'importfile': importfile,
+                'importfile1': importfile,     # the same frame, kept for callers of the copy without geometry
+                'qwdata': qwdata,
+                'resOhm': resOhm,
+                'reorderedSubset': reorderedSubset,
+                'wqreorderedSubset': wqreorderedSubset,
+                'outputs': outputs,
+                'metrics': metrics}
+    finally:
+        if writer is not None:
+            writer.close(discard=True)
+        if sampler is not None:
+            sampler.close()
+
+#%%
+def write_data_release(importfile, fieldValues, raw, post, metrics=None, metricsFile=None, compression=None):
+    """
+    Write the raw and processed data-release csv files and their checksum manifest
+
+    The files are streamed from importfile by write_release_file(), gzip or zstd compressed when compression is
+    given. The manifest is written next to the processed file. Returns the manifest path.
+    """
+    constants = list(zip(DR_SERIAL_COLUMNS, fieldValues))
+    records = []
+    def release(*args):
+        records.append(write_release_file(*args))
+    writer = OutputWriter(metrics)
+    writer.submit('export_datarelease_post', release,
+                  (importfile, release_columns(importfile, DR_POST_COLUMNS), DR_POST_NAMES, constants, post, compression),
+                  rows=len(importfile),
+                  paths=release_path(post, compression))
+    writer.submit('export_datarelease_raw', release,
+                  (importfile, release_columns(importfile, DR_RAW_COLUMNS), DR_RAW_NAMES, constants, raw, compression),
+                  rows=len(importfile),
+                  paths=release_path(raw, compression))
+    errors = writer.close()
+    manifestPath = None
+    if records:
+        manifestPath = write_release_manifest(sorted(records, key=lambda r: r['File']),
+                                              os.path.dirname(os.path.abspath(post)))
+    if metrics is not None and metricsFile:
+        try:
+            metrics.write(metricsFile)
+        except IOError:
+            logging.error("Error: could not write stage metrics file\n")
+    if errors:
+        raise PreprocessingError("FILE ERROR", "\n".join(errors))
+    return manifestPath
+
+#%%
+def format_workbench(data, bin_size=None):
+    """
+    Format an Oasis output table for import into Workbench
+
+    With a bin_size each profile is binned every bin_size metres of its Cor_Dist (see MAP_Decimate), leaving far
+    fewer rows for the inversion; a merged table is first reduced to one row per resistivity record (merged_records()).
+    """
+    if bin_size:
+        data = merged_records(data)
+    try:
+        data['File_w']=data['Line'].str.split('L',1)
+        data['File']=''
+        data['File']=data.apply(lambda row: row['File_w'][1],axis=1)
+        data['File']=data['File'].astype('int')
+
+    except:
+
+        try:
+            data['File']=data['File'].astype('int')
+
+        except KeyError as e:
+            logging.info('The following column is missing in the input file: %s. Check to make sure all required columns are present.\n' % str(e))
+
+    out = pd.DataFrame()
+
+    data.rename(columns={'File':'Profile'}, inplace=True)
+
+    zipped = list(zip(WORKBENCH_HEADERS, WORKBENCH_COLUMNS))
+    for x,y in reversed(zipped):
+        out.insert(0,x,data['{}'.format(y)].values)
+    # Along-river coordinate of a stationed run, after the Workbench columns
+    for x in STATION_COLUMNS:
+        if x in data.columns:
+            out[x] = data[x].values
+    if bin_size:
+        position = out.groupby('Profile')['Cor_Dist'].cumsum().values
+        out = bin_survey(out, bin_size, position, 'Profile', statistics=())
+        out = out.drop(['Bin_start', 'Bin_count'], axis=1)
+        logging.info("Profiles binned every {:g} m\n".format(bin_size))
+    logging.info("File formatted\n")
+    return out
+
+#%%
+def check_workbench(out):
+    """
+    Line-to-line continuity, min/max and blank cell checks on a Workbench import table
+
+    Returns a list of (message, log message) pairs, one per finding, in the order they were found.
+    """
+    import scipy.stats
+
+    findings = []
+    for x in range(1,len(out.Profile)):
+        # Line-to-Line Continuity Check
+        if out.ix[x,"Profile"]==out.ix[x-1,"Profile"]:
+            pass
+
+        elif out.ix[x,"Profile"]!=out.ix[x-1,"Profile"]:
+            for s in range(1,11):
+                if np.abs((out.ix[x,"Rho_{}".format(s)]-out.ix[x-1,"Rho_{}".format(s)])/(out.ix[x,"Rho_{}".format(s)]+out.ix[x-1,"Rho_{}".format(s)])/2*100)>=50:
+                    findings.append(("Large relative percent difference (>50%) in Rho {} on Line {} / row {}".format(s,out.ix[x,"Profile"],x+2),
+                                     "Line-to-Line Disconitnuity (>50%) in Rho {}".format(s)))
+                else:
+                    pass
+            if np.abs((out.ix[x,"/Water_Res"]-out.ix[x-1,"/Water_Res"])/(out.ix[x,"/Water_Res"]+out.ix[x-1,"/Water_Res"])/2*100)>=50:
+                    findings.append(("Large relative percent difference (>50%) in Water_Res on Line {} / row {}".format(out.ix[x,"Profile"],x+2),
+                                     "Line-to-Line Disconitnuity (>50%) in Water_Res"))
+            else:
+                pass
+        else:
+            pass
+    logging.info("Continuity check finished\n")
+
+# Line-to-Line Min/Max Check
+    mult=2 #Mulitiple of the inner quartile range (1st and 3rd) that defines outliers
+
+    # Resistivity checks
+    for x in out['Profile'].unique():
+        for s in range(1,11):
+            if np.max(out['Rho_{}'.format(s)][out['Profile']==x])>mult*(scipy.stats.mstats.mquantiles(out['Rho_{}'.format(s)][out['Profile']==x])[2]):
+                findings.append(("Maximum Rho_{} in row {} larger than {} times the 3rd quantile of Line {}".format(s,out.index[out['Rho_{}'.format(s)]==np.max(out['Rho_{}'.format(s)][out['Profile']==x])][0]+2,mult,x),
+                                 'Maximum Rho_{} in row {} larger than {} times the 3rd quartile of Line {}'.format(s,out.index[out['Rho_{}'.format(s)]==np.max(out['Rho_{}'.format(s)][out['Profile']==x])][0]+2,mult,x)))
+            elif np.min(out['Rho_{}'.format(s)][out['Profile']==x])<1/mult*(scipy.stats.mstats.mquantiles(out['Rho_{}'.format(s)][out['Profile']==x])[0]):
+                findings.append(("Minimum Rho_{} in row {} smaller than 1/{} times the 1st quartile of Line {}".format(s,out.index[out['Rho_{}'.format(s)]==np.min(out['Rho_{}'.format(s)][out['Profile']==x])][0]+2,mult,x),
+                                 "Minimum Rho_{} in row {} smaller than 1/{} times the 1st quartile of Line {}".format(s,out.index[out['Rho_{}'.format(s)]==np.min(out['Rho_{}'.format(s)][out['Profile']==x])][0]+2,mult,x)))
+            else:
+                pass
+
+
+    # QW checks
+    for x in out['Profile'].unique():
+        if np.max(out['/Water_Res'][out['Profile']==x])>mult*(scipy.stats.mstats.mquantiles(out['/Water_Res'][out['Profile']==x])[2]):
+            findings.append(("Maximum Water_Res in row {} larger than {} times the 3rd quantile of Line {}".format(out.index[out['/Water_Res']==np.max(out['/Water_Res'][out['Profile']==x])][0]+2,mult,x),
+                             'Maximum Water_Res in row {} larger than {} times the 3rd quartile of Line {}'.format(out.index[out['/Water_Res']==np.max(out['/Water_Res'][out['Profile']==x])][0]+2,mult,x)))
+        elif np.min(out['/Water_Res'][out['Profile']==x])<1/mult*(scipy.stats.mstats.mquantiles(out['/Water_Res'][out['Profile']==x])[0]):
+            findings.append(("Minimum Water_Res in row {} smaller than 1/{} times the 1st quartile of Line {}".format(out.index[out['/Water_Res']==np.min(out['/Water_Res'][out['Profile']==x])][0]+2,mult,x),
+                             "Minimum Water_Res in row {} smaller than 1/{} times the 1st quartile of Line {}".format(out.index[out['/Water_Res']==np.min(out['/Water_Res'][out['Profile']==x])][0]+2,mult,x)))
+        else:
+            pass
+
+    # Altitude checks
+        if np.max(out['Final_Altitude'][out['Profile']==x])>mult*(scipy.stats.mstats.mquantiles(out['Final_Altitude'][out['Profile']==x])[2]):
+            findings.append(("Maximum Altitude in row {} larger than {} times the 3rd quantile of Line {}".format(out.index[out['Final_Altitude']==np.max(out['Final_Altitude'][out['Profile']==x])][0]+2,mult,x),
+                             'Maximum Altitude in row {} larger than {} times the 3rd quartile of Line {}'.format(out.index[out['Final_Altitude']==np.max(out['Final_Altitude'][out['Profile']==x])][0]+2,mult,x)))
+        elif np.min(out['Final_Altitude'][out['Profile']==x])<1/mult*(scipy.stats.mstats.mquantiles(out['Final_Altitude'][out['Profile']==x])[0]):
+            findings.append(("Minimum Altitude in row {} smaller than 1/{} times the 1st quartile of Line {}".format(out.index[out['Final_Altitude']==np.min(out['Final_Altitude'][out['Profile']==x])][0]+2,mult,x),
+                             "Minimum Altitude in row {} smaller than 1/{} times the 1st quartile of Line {}".format(out.index[out['Final_Altitude']==np.min(out['Final_Altitude'][out['Profile']==x])][0]+2,mult,x)))
+        else:
+            pass
+
+    logging.info("Min/max check finished\n")
+
+# Blank Cells Check
+    if out.isnull().values.any():
+        nulls = out.isnull()
+        for t in range(0,len(out.columns)):
+            for x in range(0,len(out.Profile)):
+                if nulls.ix[x,t]:
+                    findings.append(("Blank {} cell in row {}".format(out.columns.values[t],x+2),
+                                     'Blank {} cell in row {}'.format(out.columns.values[t],x+2)))
+                else:
+                    pass
+    else:
+        pass
+    logging.info("Blank cell check finished\n")
+    return findings
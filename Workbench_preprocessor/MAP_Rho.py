@@ -0,0 +1,167 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Apparent resistivity recomputed from the raw current and voltages, and per-channel quality flags.
+
+Each record logs the transmitted current for the positive and negative half-cycles (In_p, In_n), the ten received
+voltages for each (V1_p, V1_n ... V10_p, V10_n) and the electrode positions (C1, C2, P1..P11, m). With the half-space
+geometric factor K of each C1-C2 / Pn-Pn+1 array,
+
+    Rho n = K n (Vn_p - Vn_n) / (In_p - In_n)
+
+which is worked out for all records and channels as one records-by-channels array. The voltage common to both
+half-cycles, (Vn_p + Vn_n) / 2, is self-potential drift and noise rather than signal, so the signal-to-noise ratio of
+a channel is |Vn_p - Vn_n| / |Vn_p + Vn_n|, with the noise floored at half the logged voltage resolution. Every
+channel gets a flag:
+
+    RHO_OK              0   recomputed Rho agrees with the logged Rho, enough signal, inside the band
+    RHO_NO_SIGNAL       1   no current, voltage or electrode positions to recompute it from
+    RHO_LOW_SNR         2   signal-to-noise ratio below RHO_MIN_SNR
+    RHO_MISMATCH        4   recomputed and logged Rho differ by more than RHO_TOLERANCE
+    RHO_OUT_OF_BAND     8   logged Rho outside the bandpass limits
+
+filter_resistivity() takes its bandpass from these flags, so the same pass finds both the out-of-band and the
+inconsistent channels; each record keeps the combined flag, its weakest SNR and its largest difference.
+"""
+#%%
+import numpy as np
+import pandas as pd
+
+from MAP_Missing import float_columns
+
+#%%
+RHO_CHANNELS = 10
+RHO_COLUMNS = ['Rho {}'.format(n) for n in range(1, RHO_CHANNELS + 1)]
+ELECTRODE_COLUMNS = ['C1', 'C2'] + ['P{}'.format(n) for n in range(1, RHO_CHANNELS + 2)]
+VOLTAGE_COLUMNS = [('V{}_p'.format(n), 'V{}_n'.format(n)) for n in range(1, RHO_CHANNELS + 1)]
+CHECK_COLUMNS = ['Rho_Flag', 'Rho_SNR', 'Rho_Diff']
+
+RHO_OK = 0
+RHO_NO_SIGNAL = 1
+RHO_LOW_SNR = 2
+RHO_MISMATCH = 4
+RHO_OUT_OF_BAND = 8
+
+# Flags of a channel whose logged value is not trusted
+RHO_QUALITY = RHO_NO_SIGNAL | RHO_LOW_SNR | RHO_MISMATCH
+
+RHO_TOLERANCE = 0.01        # relative difference between recomputed and logged Rho
+RHO_RESOLUTION = 0.001      # ohm-m, the logged Rho decimals
+VOLT_RESOLUTION = 0.0001    # the logged voltage decimals
+RHO_MIN_SNR = 10.0
+
+#%%
+def electrode_layouts(electrodes):
+    """
+    The distinct rows of C1, C2, P1..P11 positions and the layout of each row (-1 where a position is missing)
+
+    The positions change between runs of records, so only the first record of each run is compared with the others.
+    """
+    electrodes = np.asarray(electrodes, dtype=float)
+    which = np.full(len(electrodes), -1, dtype=np.int64)
+    known = np.flatnonzero(~np.isnan(electrodes).any(axis=1))
+    if not len(known):
+        return np.empty((0, electrodes.shape[1])), which
+    rows = electrodes[known]
+    run = np.concatenate(([0], np.cumsum(np.any(np.diff(rows, axis=0) != 0, axis=1))))
+    first = np.flatnonzero(np.concatenate(([True], np.diff(run) != 0)))
+    layouts, layout = np.unique(rows[first], axis=0, return_inverse=True)
+    which[known] = layout[run]
+    return layouts, which
+
+def geometric_factors(electrodes):
+    """
+    Half-space geometric factors (m) of the ten channels for each row of C1, C2, P1..P11 positions
+
+    NaN where a position is missing or two electrodes coincide.
+    """
+    layouts, which = electrode_layouts(electrodes)
+    k = np.full((len(which), RHO_CHANNELS), np.nan)
+    if not len(layouts):
+        return k
+    a = layouts[:, [0]]
+    b = layouts[:, [1]]
+    m = layouts[:, 2:2 + RHO_CHANNELS]
+    n = layouts[:, 3:3 + RHO_CHANNELS]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        g = 1.0 / np.abs(m - a) - 1.0 / np.abs(m - b) - 1.0 / np.abs(n - a) + 1.0 / np.abs(n - b)
+        factors = np.abs(2 * np.pi / g)
+    factors[~np.isfinite(factors)] = np.nan
+    known = which >= 0
+    k[known] = factors[which[known]]
+    return k
+
+#%%
+def apparent_resistivity(current_p, current_n, volts_p, volts_n, k):
+    """
+    Apparent resistivity and signal-to-noise ratio of every channel (records by channels) from the half-cycle
+    currents (records) and voltages and the geometric factors (records by channels)
+    """
+    current = np.asarray(current_p, dtype=float) - current_n
+    signal = np.asarray(volts_p, dtype=float) - volts_n
+    noise = np.maximum(np.abs(np.asarray(volts_p, dtype=float) + volts_n), VOLT_RESOLUTION / 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rho = k * signal / current[:, None]
+        snr = np.abs(signal) / noise
+    rho[~np.isfinite(rho)] = np.nan
+    return rho, snr
+
+def channel_flags(logged, rho, snr, band=None, tolerance=RHO_TOLERANCE, min_snr=RHO_MIN_SNR):
+    """
+    Flags of every channel from the logged and recomputed Rho and the signal-to-noise ratio; band is the
+    (min, max) bandpass or None
+    """
+    flags = np.zeros(logged.shape, dtype=np.uint8)
+    missing = np.isnan(rho)
+    difference = np.abs(rho - logged)
+    with np.errstate(invalid='ignore'):
+        flags[missing] |= RHO_NO_SIGNAL
+        flags[~missing & (snr < min_snr)] |= RHO_LOW_SNR
+        flags[difference > tolerance * np.abs(logged) + RHO_RESOLUTION / 2] |= RHO_MISMATCH
+        if band is not None:
+            flags[(logged < band[0]) | (logged > band[1])] |= RHO_OUT_OF_BAND
+    return flags
+
+def check_rho(df, band=None, tolerance=RHO_TOLERANCE, min_snr=RHO_MIN_SNR):
+    """
+    Recompute Rho 1..10 of every record of df from its raw columns and flag each channel
+
+    Returns the logged and recomputed Rho, the signal-to-noise ratios and the flags, each records by channels.
+    """
+    k = geometric_factors(float_columns(df, ELECTRODE_COLUMNS))
+    current = float_columns(df, ['In_p', 'In_n'])
+    volts_p = float_columns(df, [p for p, n in VOLTAGE_COLUMNS])
+    volts_n = float_columns(df, [n for p, n in VOLTAGE_COLUMNS])
+    rho, snr = apparent_resistivity(current[:, 0], current[:, 1], volts_p, volts_n, k)
+    logged = float_columns(df, RHO_COLUMNS)
+    return logged, rho, snr, channel_flags(logged, rho, snr, band, tolerance, min_snr)
+
+#%%
+def add_check_columns(df, logged, rho, snr, flags):
+    """
+    Add each record's combined channel flags (Rho_Flag), weakest signal-to-noise ratio (Rho_SNR) and largest
+    relative difference between recomputed and logged Rho (Rho_Diff) to df
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        difference = np.abs(rho - logged) / np.abs(logged)
+    difference[~np.isfinite(difference)] = np.nan
+    snr = np.where(np.isnan(rho), np.nan, snr)
+    df['Rho_Flag'] = np.bitwise_or.reduce(flags, axis=1) if flags.shape[1] else 0
+    with np.errstate(invalid='ignore'):
+        df['Rho_SNR'] = np.round(pd.DataFrame(snr).min(axis=1).values, 1)
+        df['Rho_Diff'] = np.round(pd.DataFrame(difference).max(axis=1).values, 5)
+    return df
+
+def describe_rho_flags(flags):
+    """
+    Count of channels carrying each flag
+    """
+    flags = np.asarray(flags)
+    return {'ok': int((flags == RHO_OK).sum()),
+            'no_signal': int(((flags & RHO_NO_SIGNAL) != 0).sum()),
+            'low_snr': int(((flags & RHO_LOW_SNR) != 0).sum()),
+            'mismatch': int(((flags & RHO_MISMATCH) != 0).sum()),
+            'out_of_band': int(((flags & RHO_OUT_OF_BAND) != 0).sum())}
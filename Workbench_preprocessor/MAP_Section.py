@@ -0,0 +1,252 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Quick-look apparent-resistivity pseudo-sections, one per profile.
+
+Every record holds ten dipole-dipole measurements: the current dipole C1-C2 and the potential dipoles Pn-Pn+1, with
+the electrode positions (m along the towed streamer, behind the GPS antenna) in C1, C2 and P1..P11. Each measurement
+is plotted at the midpoint of its four electrodes and at its pseudo-depth, the median depth of investigation of the
+array on a homogeneous half-space (Edwards, 1977): the depth above which half of the measured signal comes from.
+Lines that were reversed for the survey order run against their Cum_dist, so the streamer trails ahead of the GPS
+position there; which way a profile was travelled is taken from its GPS times.
+
+The section is built in two vectorized steps on log10 resistivity. Each channel is averaged into cells of
+SECTION_DX metres along the track with np.bincount, and gaps of up to SECTION_MAX_GAP metres are interpolated across;
+the columns are then interpolated linearly in depth between the ten channel pseudo-depths onto levels every
+SECTION_DZ metres, with no extrapolation above the first or below the last channel.
+
+Each profile is written to <river>_Section_<profile>.npz (numpy) or .nc (NetCDF 3, written with scipy) holding:
+
+    x               along-track distance (Cum_dist, m) of the cell centres
+    z               pseudo-depth (m) of the levels
+    rho             apparent resistivity (ohm-m), z by x
+    channel_depth   pseudo-depth of each of the ten channels
+    channel_rho     apparent resistivity of each channel along the track, channel by x
+    samples         measurements averaged into each channel cell
+    lat, lon        GPS position at each x, from the nearest records where there are none in the cell
+"""
+#%%
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from MAP_Decimate import bin_positions
+from MAP_Missing import coerce_floats, float_columns
+from MAP_Rho import ELECTRODE_COLUMNS, RHO_CHANNELS, electrode_layouts
+
+#%%
+SECTION_FORMATS = ('npz', 'netcdf')
+SECTION_FORMAT = 'npz'
+SECTION_FOLDER = 'Sections'
+SECTION_EXTENSIONS = {'npz': '.npz', 'netcdf': '.nc'}
+SECTION_DX = 2.0            # m along the track between cell centres
+SECTION_DZ = 0.25           # m between pseudo-depth levels
+SECTION_MAX_GAP = 10.0      # m along the track a channel is interpolated across
+SECTION_CHANNELS = RHO_CHANNELS
+SECTION_RHO = 'Rho {}_rollavg'
+DEPTH_ITERATIONS = 60       # bisection steps for the median depth
+
+#%%
+def median_depth(c1, c2, p1, p2):
+    """
+    Median depth of investigation (m) of four-electrode arrays with the electrodes at the given positions on a line
+
+    A pair of electrodes r apart on a homogeneous half-space draws the fraction r / sqrt(r**2 + 4 z**2) of its signal
+    from below depth z; the array's fraction is the sum over its four pairs weighted by their terms of the geometric
+    factor. The depth where it falls to one half is found by bisection for all arrays at once; NaN where two
+    electrodes coincide.
+    """
+    r = np.abs(np.array([np.asarray(c1) - p1, np.asarray(c1) - p2, np.asarray(c2) - p1, np.asarray(c2) - p2],
+                        dtype=float))
+    sign = np.array([1.0, -1.0, -1.0, 1.0]).reshape((4,) + (1,) * (r.ndim - 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = sign / r
+        weight = weight / weight.sum(axis=0)
+    low = np.zeros(r.shape[1:])
+    high = np.full(r.shape[1:], 10 * np.nanmax(r) if r.size else 1.0)
+    for i in range(DEPTH_ITERATIONS):
+        z = (low + high) / 2
+        deeper = (weight * r / np.sqrt(r ** 2 + 4 * z ** 2)).sum(axis=0) > 0.5
+        low = np.where(deeper, z, low)
+        high = np.where(deeper, high, z)
+    return np.where(np.isfinite(weight).all(axis=0), (low + high) / 2, np.nan)
+
+def channel_geometry(electrodes):
+    """
+    Midpoint (m along the streamer) and pseudo-depth of the ten channels for each row of C1, C2, P1..P11 positions
+
+    The depths are worked out once for each distinct set of positions (see MAP_Rho.electrode_layouts()).
+    """
+    layouts, which = electrode_layouts(electrodes)
+    midpoint = np.full((len(which), SECTION_CHANNELS), np.nan)
+    depth = np.full((len(which), SECTION_CHANNELS), np.nan)
+    if not len(layouts):
+        return midpoint, depth
+    c1 = layouts[:, [0]]
+    c2 = layouts[:, [1]]
+    p1 = layouts[:, 2:2 + SECTION_CHANNELS]
+    p2 = layouts[:, 3:3 + SECTION_CHANNELS]
+    known = which >= 0
+    midpoint[known] = ((c1 + c2 + p1 + p2) / 4)[which[known]]
+    depth[known] = median_depth(c1, c2, p1, p2)[which[known]]
+    return midpoint, depth
+
+#%%
+def _fill_gaps(values, max_cells):
+    # Linear interpolation along the last axis across runs of at most max_cells missing cells between known ones
+    filled = values.copy()
+    cells = np.arange(values.shape[-1])
+    for row, line in enumerate(values):
+        known = np.flatnonzero(~np.isnan(line))
+        if len(known) < 2:
+            continue
+        gap = np.searchsorted(known, cells)
+        inside = (gap > 0) & (gap < len(known))
+        span = np.zeros(len(cells), dtype=np.int64)
+        span[inside] = known[gap[inside]] - known[gap[inside] - 1] - 1
+        fill = inside & np.isnan(line) & (span <= max_cells)
+        filled[row, fill] = np.interp(cells[fill], known, line[known])
+    return filled
+
+def grid_section(position, midpoint, depth, rho, lat=None, lon=None, dx=SECTION_DX, dz=SECTION_DZ,
+                 max_gap=SECTION_MAX_GAP):
+    """
+    Pseudo-section of one profile from the along-track position of each record (m), the signed along-track offset
+    of each channel's midpoint from it, the channel pseudo-depths and apparent resistivities (records by channels)
+
+    Returns a dict of the arrays described above, or None when the profile has no usable measurement.
+    """
+    x = np.asarray(position, dtype=float)[:, None] + midpoint
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logRho = np.log10(np.where(rho > 0, rho, np.nan))
+    valid = ~np.isnan(x) & ~np.isnan(logRho)
+    if not valid.any():
+        return None
+    x0 = np.floor(x[valid].min() / dx) * dx
+    nx = int(np.floor((x[valid].max() - x0) / dx)) + 1
+
+    # Channel means in the cells along the track
+    channel = np.nonzero(valid)[1]
+    cell = channel * nx + np.floor((x[valid] - x0) / dx).astype(np.int64)
+    samples = np.bincount(cell, minlength=SECTION_CHANNELS * nx).reshape(SECTION_CHANNELS, nx)
+    total = np.bincount(cell, logRho[valid], minlength=SECTION_CHANNELS * nx).reshape(SECTION_CHANNELS, nx)
+    with np.errstate(invalid='ignore'):
+        channelLog = _fill_gaps(total / samples, int(max_gap // dx))
+
+    # Levels between the shallowest and deepest channel, interpolated between the channels either side
+    channelDepth = np.nanmedian(np.where(valid, depth, np.nan), axis=0)
+    order = np.flatnonzero(~np.isnan(channelDepth))
+    order = order[np.argsort(channelDepth[order])]
+    levels = channelDepth[order]
+    z = dz * np.arange(np.ceil(levels[0] / dz), np.floor(levels[-1] / dz) + 1)
+    upper = np.clip(np.searchsorted(levels, z, side='right') - 1, 0, len(levels) - 1)
+    lower = np.minimum(upper + 1, len(levels) - 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.where(lower > upper, (z - levels[upper]) / (levels[lower] - levels[upper]), 0.0)
+    above = channelLog[order[upper]]
+    below = channelLog[order[lower]]
+    grid = np.where(fraction[:, None] > 0, above + fraction[:, None] * (below - above), above)
+
+    section = {'x': x0 + dx * (np.arange(nx) + 0.5),
+               'z': z,
+               'rho': (10 ** grid).astype(np.float32),
+               'channel_depth': channelDepth,
+               'channel_rho': (10 ** channelLog).astype(np.float32),
+               'samples': samples.astype(np.int32)}
+    if lat is not None and lon is not None:
+        section['lat'], section['lon'] = _track(position, lat, lon, section['x'])
+    return section
+
+def _track(position, lat, lon, x):
+    # GPS position of the records at each cell centre, by position along the track
+    known = ~np.isnan(position) & ~np.isnan(lat) & ~np.isnan(lon)
+    order = np.argsort(position[known])
+    where = position[known][order]
+    return np.interp(x, where, lat[known][order]), np.interp(x, where, lon[known][order])
+
+#%%
+def profile_sections(importfile, rho=SECTION_RHO, dx=SECTION_DX, dz=SECTION_DZ, max_gap=SECTION_MAX_GAP):
+    """
+    Pseudo-sections of the processed resistivity data, one (profile, section) pair for each File in order
+    """
+    profile = importfile['File'].astype(str).values
+    position = coerce_floats(importfile['Cum_dist'])
+    seconds = bin_positions(importfile, 'time')
+    offset, depth = channel_geometry(float_columns(importfile, ELECTRODE_COLUMNS))
+    values = float_columns(importfile, [rho.format(n) for n in range(1, SECTION_CHANNELS + 1)])
+    lat = coerce_floats(importfile['Lat'])
+    lon = coerce_floats(importfile['Lon'])
+
+    sections = []
+    codes, names = pd.factorize(profile)
+    order = np.argsort(codes, kind='mergesort')
+    bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+    for code, name in enumerate(names):
+        rows = order[bounds[code]:bounds[code + 1]]
+        # The streamer trails behind the GPS: back along Cum_dist, unless the line was recorded against it
+        timed = rows[~np.isnan(seconds[rows])]
+        direction = -1.0
+        if len(timed) > 1 and seconds[timed[-1]] < seconds[timed[0]]:
+            direction = 1.0
+        section = grid_section(position[rows], direction * offset[rows], depth[rows], values[rows], lat[rows],
+                               lon[rows], dx, dz, max_gap)
+        if section is None:
+            logging.warning("Profile " + name + " has no resistivity values to grid\n")
+            continue
+        sections.append((name, section))
+    return sections
+
+#%%
+def write_section(section, path, fmt=SECTION_FORMAT):
+    """
+    Write one pseudo-section as a compressed numpy archive or a NetCDF 3 file
+    """
+    if fmt == 'npz':
+        np.savez_compressed(path, **section)
+        return
+    from scipy.io import netcdf_file
+    f = netcdf_file(path, 'w')
+    try:
+        f.title = 'Apparent resistivity pseudo-section'
+        f.createDimension('x', len(section['x']))
+        f.createDimension('z', len(section['z']))
+        f.createDimension('channel', SECTION_CHANNELS)
+        for name, dims, units in [('x', ('x',), 'm'), ('z', ('z',), 'm'), ('rho', ('z', 'x'), 'ohm-m'),
+                                  ('channel_depth', ('channel',), 'm'), ('channel_rho', ('channel', 'x'), 'ohm-m'),
+                                  ('samples', ('channel', 'x'), '1'), ('lat', ('x',), 'degrees_north'),
+                                  ('lon', ('x',), 'degrees_east')]:
+            if name not in section:
+                continue
+            data = section[name]
+            variable = f.createVariable(name, data.dtype.char, dims)
+            variable[:] = data
+            variable.units = units
+    finally:
+        f.close()
+
+def section_path(folder, userRiverName, profile, fmt=SECTION_FORMAT):
+    """
+    Path of the pseudo-section of one profile
+    """
+    return os.path.join(folder, '{}_Section_{}{}'.format(userRiverName, profile, SECTION_EXTENSIONS[fmt]))
+
+def write_sections(importfile, folder, userRiverName, fmt=SECTION_FORMAT, rho=SECTION_RHO, dx=SECTION_DX,
+                   dz=SECTION_DZ):
+    """
+    Grid every profile of the processed resistivity data and write the sections into folder; returns their paths
+    """
+    if fmt not in SECTION_FORMATS:
+        raise ValueError("Unknown section format " + str(fmt) + ", expected one of " + ", ".join(SECTION_FORMATS))
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    paths = []
+    for name, section in profile_sections(importfile, rho, dx, dz):
+        paths.append(section_path(folder, userRiverName, name, fmt))
+        write_section(section, paths[-1], fmt)
+    logging.info(str(len(paths)) + " pseudo-section(s) written to " + folder + "\n")
+    return paths
@@ -0,0 +1,161 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Time-based sequencing of the resistivity and water-quality surveys of a reach.
+
+Both instruments time their records: the resistivity files through the survey date in the header of the .bin file
+and the UTC time of day of the GPS sentence, the sonde files through their Date and Time columns. The .bin date is
+the local date, so the UTC date of the first record is found with the time zone estimated from the longitude (15
+degrees an hour); a survey running past local midnight, where the estimate can be an hour out, is rare. order_by_time()
+puts the surveys in order of their first record, which is a single sort instead of the repeated nearest-end search
+of the geometric ordering, and works across folders that hold several survey days.
+
+A survey is flagged for reversal when it was travelled against the direction of the first survey, or against a given
+direction (the water-quality files are compared with the first resistivity line). The geometric ordering in
+MAP_Pipeline.order_surveys() stays the fallback when a survey has no usable times.
+"""
+#%%
+import datetime
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+#%%
+SEQUENCE_MODES = ('time', 'geometry')
+SEQUENCE_MODE = 'time'
+
+DAY_SECONDS = 86400
+# A clock that goes back by more than this many seconds has passed midnight
+ROLLOVER_SECONDS = DAY_SECONDS / 2
+
+#%%
+def utc_seconds(utc):
+    """
+    Seconds since midnight of NMEA hhmmss.ss times, NaN where the time is missing
+    """
+    utc = np.asarray(utc, dtype=float)
+    return np.floor(utc / 10000) * 3600 + (np.floor(utc / 100) % 100) * 60 + utc % 100
+
+def record_times(date, utc, longitude=None, previous=None):
+    """
+    Timestamps of the records of a resistivity file from its survey date and the GPS UTC times, NaT where missing
+
+    With longitude the date is taken as the local date there, otherwise as the UTC date of the first record. Each
+    time the clock goes back by more than half a day the survey is taken to have passed midnight. previous is the
+    timestamp of the record before the first when a file is read in pieces; the days are then counted from it.
+    """
+    seconds = utc_seconds(utc)
+    valid = ~np.isnan(seconds)
+    times = np.full(len(seconds), np.datetime64('NaT'), dtype='datetime64[ns]')
+    if not valid.any():
+        return times
+    s = seconds[valid]
+    if previous is not None and not pd.isnull(previous):
+        base = pd.Timestamp(previous).normalize()
+        last = (pd.Timestamp(previous) - base).total_seconds()
+    else:
+        base = pd.Timestamp(date).normalize()
+        last = s[0]
+        if longitude is not None and not np.isnan(longitude):
+            local = s[0] + round(longitude / 15.0) * 3600
+            base -= pd.Timedelta(days=int(np.floor(local / DAY_SECONDS)))
+    days = np.cumsum(np.diff(np.concatenate([[last], s])) < -ROLLOVER_SECONDS)
+    offset = np.round((days * DAY_SECONDS + s) * 1e9).astype(np.int64).astype('timedelta64[ns]')
+    times[valid] = base.to_datetime64() + offset
+    return times
+
+def time_span(times):
+    """
+    First and last valid timestamp, NaT when there is none
+    """
+    times = pd.Series(times).dropna()
+    if len(times) == 0:
+        return pd.NaT, pd.NaT
+    return times.iloc[0], times.iloc[-1]
+
+#%%
+def wq_timestamp(date, time):
+    """
+    Timestamp of a sonde Date and Time, written MM/DD/YY or MMDDYY and HH:MM:SS or HHMMSS; None when unreadable
+    """
+    date = re.sub(r'\D', '', str(date))
+    time = re.sub(r'\D', '', str(time))
+    if len(date) not in (6, 8) or not time or len(time) > 6:
+        return None
+    try:
+        return pd.Timestamp(datetime.datetime.strptime(date + time.zfill(6),
+                                                       ('%m%d%Y' if len(date) == 8 else '%m%d%y') + '%H%M%S'))
+    except ValueError:
+        return None
+
+def wq_timestamps(date, time):
+    """
+    wq_timestamp() of every record from its Date and Time columns at once, NaT where unreadable
+    """
+    date = pd.Series(date).astype(str).str.replace(r'\D', '')
+    time = pd.Series(time).astype(str).str.replace(r'\D', '')
+    times = np.full(len(date), np.datetime64('NaT'), dtype='datetime64[ns]')
+    for digits, fmt in [(6, '%m%d%y'), (8, '%m%d%Y')]:
+        rows = np.flatnonzero(((date.str.len() == digits) & (time.str.len().between(1, 6))).values)
+        if len(rows):
+            text = date.iloc[rows] + time.iloc[rows].str.zfill(6)
+            times[rows] = pd.to_datetime(text, format=fmt + '%H%M%S', errors='coerce').values
+    return times
+
+def wq_time_span(temp):
+    """
+    Timestamps of the first and last records of a water-quality file that carry a date and time
+    """
+    dated = temp[temp["Date"].notnull() & temp["Time"].notnull()]
+    if len(dated) == 0:
+        return pd.NaT, pd.NaT
+    first = wq_timestamp(dated["Date"].iloc[0], dated["Time"].iloc[0])
+    last = wq_timestamp(dated["Date"].iloc[-1], dated["Time"].iloc[-1])
+    if first is None or last is None:
+        return pd.NaT, pd.NaT
+    return first, last
+
+#%%
+def travel(subset):
+    """
+    East and north components (degrees, longitude scaled to the latitude) from the start to the end of each survey
+    """
+    scale = np.cos(np.radians((subset["StartLat"].values + subset["EndLat"].values).astype(float) / 2))
+    east = (subset["EndLong"].values - subset["StartLong"].values).astype(float) * scale
+    north = (subset["EndLat"].values - subset["StartLat"].values).astype(float)
+    return east, north
+
+def line_direction(df):
+    """
+    Direction of travel of the first line of combined data, from its first to its last Lat/Lon
+    """
+    line = df[df["Filename"] == df["Filename"].iloc[0]]
+    points = pd.DataFrame({'lat': pd.to_numeric(line["Lat"], errors='coerce'),
+                           'lon': pd.to_numeric(line["Lon"], errors='coerce')}).dropna()
+    lat = points['lat'].values
+    lon = points['lon'].values
+    return (lon[-1] - lon[0]) * np.cos(np.radians((lat[0] + lat[-1]) / 2)), lat[-1] - lat[0]
+
+#%%
+def order_by_time(subset, direction=None):
+    """
+    Surveys in order of their StartTime, flagged for reversal when travelled against direction
+
+    Without direction the first survey sets it, so the first survey is never reversed. Returns the Filename and
+    Reverse columns in survey order.
+    """
+    ordered = subset.sort_values(["StartTime", "Filename"]).reset_index(drop=True)
+    east, north = travel(ordered)
+    if direction is None:
+        direction = (east[0], north[0])
+    ordered["Reverse"] = east * direction[0] + north * direction[1] < 0
+
+    overlaps = int((ordered["StartTime"].values[1:] < ordered["EndTime"].values[:-1]).sum())
+    if overlaps:
+        logging.warning(str(overlaps) + " survey(s) start before the previous survey ends; check the instrument clock\n")
+    return ordered[["Filename", "Reverse"]].copy()
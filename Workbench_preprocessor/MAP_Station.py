@@ -0,0 +1,155 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+River stationing of survey points along a centerline.
+
+Cor_Dist and Cum_dist add up the straight steps between consecutive points, so they grow with every jump between
+files, GPS wander and zig-zag and differ between surveys of the same reach. Projecting every point onto a river
+centerline instead gives each one a station, the distance along the centerline from its first vertex, and a lateral
+offset, the distance from the centerline (positive to the left looking toward increasing station). Both stay the
+same from one survey of the reach to the next.
+
+The centerline is sampled every few metres and the samples are held in a k-d tree. Each point is projected onto the
+segments of its nearest samples, and the search is widened for the few points where those might not include the
+closest segment, so the result is the exact nearest point on the line. All points are projected together in numpy,
+in chunks of STATION_CHUNK.
+"""
+#%%
+import logging
+
+import numpy as np
+
+#%%
+STATION_COLUMNS = ['Station', 'Offset']
+STATION_SPACING = 10.0      # m between the centerline samples in the search tree
+STATION_NEIGHBOURS = 8      # samples whose segments are tried first for each point
+STATION_CHUNK = 500000      # points projected at a time
+UTM_CRS = {'init': 'epsg:32615'}
+
+#%%
+def read_centerline(path):
+    """
+    Vertices (x, y in UTM 15N) of a river centerline read from a shapefile or another format geopandas reads
+
+    The parts of a multi-part line are merged end to end; they must join into a single line. A file without a
+    coordinate system is taken to be in UTM 15N already.
+    """
+    import geopandas as gp
+    from shapely.ops import linemerge
+
+    lines = gp.read_file(path)
+    if lines.crs:
+        lines = lines.to_crs(UTM_CRS)
+    else:
+        logging.info("Centerline " + path + " has no coordinate system, taken as UTM 15N\n")
+    parts = []
+    for geometry in lines.geometry:
+        if geometry is None:
+            continue
+        if geometry.geom_type == 'MultiLineString':
+            parts.extend(geometry.geoms)
+        elif geometry.geom_type == 'LineString':
+            parts.append(geometry)
+    if not parts:
+        raise ValueError("no line features in " + path)
+    line = linemerge(parts) if len(parts) > 1 else parts[0]
+    if line.geom_type != 'LineString':
+        raise ValueError("the centerline in " + path + " is in {} separate pieces".format(len(line.geoms)))
+    xy = np.asarray(line.coords)[:, :2]
+    return xy[:, 0], xy[:, 1]
+
+#%%
+class Centerline(object):
+    """
+    A river centerline indexed for projecting points onto it
+
+    Stations run from the first vertex to the last; reverse the vertices to station from the other end.
+    """
+    def __init__(self, x, y, spacing=STATION_SPACING):
+        from scipy.spatial import cKDTree
+
+        xy = np.column_stack((np.asarray(x, dtype=float), np.asarray(y, dtype=float)))
+        # Repeated vertices would give zero-length segments
+        keep = np.concatenate(([True], np.any(np.diff(xy, axis=0) != 0, axis=1)))
+        xy = xy[keep]
+        if len(xy) < 2:
+            raise ValueError("a centerline needs at least two distinct vertices")
+        self.start = xy[:-1]
+        self.vector = np.diff(xy, axis=0)
+        self.length = np.hypot(self.vector[:, 0], self.vector[:, 1])
+        self.station = np.concatenate(([0.0], np.cumsum(self.length)[:-1]))
+        self.total = float(self.length.sum())
+
+        # Samples every spacing metres or less along each segment, plus the last vertex
+        counts = np.maximum(np.ceil(self.length / spacing).astype(np.int64), 1)
+        segment = np.repeat(np.arange(len(self.length)), counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        fraction = (np.arange(len(segment)) - first) / np.repeat(counts, counts).astype(float)
+        samples = self.start[segment] + fraction[:, None] * self.vector[segment]
+        self.segment = np.concatenate((segment, [len(self.length) - 1]))
+        self.tree = cKDTree(np.vstack((samples, xy[-1:])))
+        # Farthest any point of the line is from the sample before it
+        self.spacing = float((self.length / counts).max())
+
+    def project(self, x, y, chunk_size=STATION_CHUNK):
+        """
+        Station and lateral offset (m) of each point; NaN where a coordinate is missing
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        station = np.full(len(x), np.nan)
+        offset = np.full(len(x), np.nan)
+        valid = np.flatnonzero(~np.isnan(x) & ~np.isnan(y))
+        for begin in range(0, len(valid), chunk_size):
+            rows = valid[begin:begin + chunk_size]
+            station[rows], offset[rows] = self._project(np.column_stack((x[rows], y[rows])))
+        return station, offset
+
+    def _project(self, points):
+        station = np.empty(len(points))
+        offset = np.empty(len(points))
+        todo = np.arange(len(points))
+        k = min(STATION_NEIGHBOURS, self.tree.n)
+        while len(todo):
+            distance, sample = self.tree.query(points[todo], k=k)
+            distance = distance.reshape(len(todo), -1)
+            sample = sample.reshape(len(todo), -1)
+            s, o, d = self._nearest(points[todo], self.segment[sample])
+            station[todo], offset[todo] = s, o
+            # The nearest point of the line is a vertex, which is a sample, or lies within spacing of a sample of the
+            # same segment along it, so a closest segment has a sample within hypot(d, spacing). Where the farthest
+            # sample searched is no farther than that, a closer segment might have been missed.
+            if k == self.tree.n:
+                break
+            todo = todo[distance[:, -1] <= np.hypot(d, self.spacing)]
+            k = min(k * 4, self.tree.n)
+        return station, offset
+
+    def _nearest(self, points, segments):
+        # Nearest point of each candidate segment (rows of segments) and the closest of them for each point
+        start = self.start[segments]
+        vector = self.vector[segments]
+        relative = points[:, None, :] - start
+        t = np.clip((relative * vector).sum(axis=2) / self.length[segments] ** 2, 0, 1)
+        gap = relative - t[:, :, None] * vector
+        distance = np.hypot(gap[:, :, 0], gap[:, :, 1])
+        best = distance.argmin(axis=1)
+        rows = np.arange(len(points))
+        segment = segments[rows, best]
+        t = t[rows, best]
+        d = distance[rows, best]
+        side = np.sign(vector[rows, best, 0] * relative[rows, best, 1] - vector[rows, best, 1] * relative[rows, best, 0])
+        return self.station[segment] + t * self.length[segment], np.where(side < 0, -d, d), d
+
+#%%
+def add_stations(df, centerline):
+    """
+    Add the Station and Offset of each row's X_UTM/Y_UTM point to df, rounded to the millimetre
+    """
+    station, offset = centerline.project(df['X_UTM'].values, df['Y_UTM'].values)
+    df['Station'] = np.round(station, 3)
+    df['Offset'] = np.round(offset, 3)
+    return df
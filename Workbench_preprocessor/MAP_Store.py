@@ -0,0 +1,197 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Typed database copy of the processed resistivity, water-quality and merged tables.
+
+The csv exports have to be parsed again by everything that reads them. write_store() loads the same three frames
+into the tables res, wq and merged of one SQLite database, by default OASIS_STORE.sqlite in the folder above the reach
+outputs so the reaches of a batch or a season share it. Every column gets a type from its values: INTEGER or REAL for
+numbers (the '*' written for missing values becomes NULL), TEXT otherwise, and columns a later run adds (stations,
+despiked values) are added to the table. Each row also carries
+
+    reach       the river name of the run
+    directory   the output folder of the run
+    timestamp   'YYYY-MM-DD HH:MM:SS.fff' of the record: the GPS UTC time on the date of the survey for resistivity
+                records (see MAP_Sequence.record_times()), the sonde Date and Time for water-quality records
+
+and each table is indexed on reach, profile (File) and timestamp. A run replaces the rows an earlier run into the same
+output folder loaded. The rows are inserted STORE_CHUNK at a time in one transaction, so a reach is either loaded
+whole or not at all, and converted to Python values a chunk at a time to bound the memory used.
+"""
+#%%
+import logging
+import os
+import sqlite3
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from MAP_Missing import MISSING, exact_floats, numeric_or_none
+from MAP_Sequence import record_times, wq_timestamps
+
+#%%
+STORE_FILE = 'OASIS_STORE.sqlite'
+STORE_TABLES = ('res', 'wq', 'merged')
+STORE_CHUNK = 50000         # rows inserted at a time
+STORE_TIMEOUT = 600.0       # seconds to wait for another run's load to finish
+STORE_KEYS = [('reach', 'TEXT'), ('directory', 'TEXT'), ('timestamp', 'TEXT')]
+
+#%%
+def store_path(directory):
+    """
+    Default store of the reach written to directory: OASIS_STORE.sqlite in the folder above it
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(directory)), STORE_FILE)
+
+def connect(path):
+    """
+    Open the store at path for loading; readers can keep querying while a load runs
+    """
+    conn = sqlite3.connect(path, timeout=STORE_TIMEOUT)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+#%%
+def typed_column(values):
+    """
+    SQL type of a column and its values as a numpy array: int64 or float (NaN for missing) for numbers, objects
+    (None for missing) for text
+    """
+    kind = values.dtype.kind
+    if kind in 'biu':
+        return 'INTEGER', values.values.astype(np.int64)
+    if kind == 'f':
+        return 'REAL', exact_floats(values.values)
+    if kind == 'M':
+        return 'TEXT', timestamp_text(values.values)
+    numbers = numeric_or_none(values)
+    if numbers is not None:
+        return 'REAL', numbers
+    text = values.where(values.notnull() & (values != MISSING))
+    return 'TEXT', text.astype(object).where(text.notnull(), None).values
+
+def timestamp_text(times):
+    """
+    'YYYY-MM-DD HH:MM:SS.fff' of each timestamp, None for NaT
+    """
+    times = np.asarray(times, dtype='datetime64[ns]')
+    text = np.char.replace(np.datetime_as_string(times, unit='ms'), 'T', ' ').astype(object)
+    text[np.isnat(times)] = None
+    return text
+
+def res_timestamps(frame, renamed, spans):
+    """
+    Timestamp of every resistivity record, from the StartTime of its file in the discovery table spans and its UTC
+
+    renamed is the renamed file directory (Filename, Reverse, NewFilename); frame's Filename holds the renamed files.
+    """
+    times = np.full(len(frame), np.datetime64('NaT'), dtype='datetime64[ns]')
+    if not len(frame) or 'UTC' not in frame or 'StartTime' not in spans:
+        return times
+    files = renamed.merge(spans[['Filename', 'StartTime']], on='Filename').drop_duplicates('NewFilename')
+    files = files.set_index('NewFilename')
+    utc = pd.to_numeric(frame['UTC'], errors='coerce').values.astype(float)
+    for name, rows in pd.Series(np.arange(len(frame))).groupby(frame['Filename'].values):
+        if name not in files.index or pd.isnull(files.loc[name, 'StartTime']):
+            continue
+        # The midnight rollover is counted in recording order, so a reversed line is timed back to front
+        reverse = files.loc[name].get('Reverse', False)
+        rows = rows.values[::-1] if pd.notnull(reverse) and bool(reverse) else rows.values
+        times[rows] = record_times(pd.Timestamp(files.loc[name, 'StartTime']), utc[rows])
+    return times
+
+#%%
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute("PRAGMA table_info(" + _quote(table) + ")")]
+
+def ensure_table(conn, table, types):
+    """
+    Create the table with the key columns and the (name, type) columns given, or add those it does not have yet
+    """
+    existing = _table_columns(conn, table)
+    if not existing:
+        columns = STORE_KEYS + [(c, t) for c, t in types if c not in dict(STORE_KEYS)]
+        conn.execute("CREATE TABLE " + _quote(table) + " (" +
+                     ", ".join(_quote(c) + " " + t for c, t in columns) + ")")
+    else:
+        for c, t in types:
+            if c not in existing:
+                conn.execute("ALTER TABLE " + _quote(table) + " ADD COLUMN " + _quote(c) + " " + t)
+    key = ['reach', 'File', 'timestamp'] if 'File' in _table_columns(conn, table) else ['reach', 'timestamp']
+    conn.execute("CREATE INDEX IF NOT EXISTS " + _quote(table + '_key') + " ON " + _quote(table) + " (" +
+                 ", ".join(_quote(c) for c in key) + ")")
+    conn.execute("CREATE INDEX IF NOT EXISTS " + _quote(table + '_directory') + " ON " + _quote(table) +
+                 " (directory)")
+
+def load_table(conn, table, frame, userRiverName, directory, timestamps, chunk=STORE_CHUNK):
+    """
+    Replace the rows of directory in table with those of frame; returns the rows loaded
+    """
+    columns = [c for c in frame.columns if c not in dict(STORE_KEYS)]
+    typed = [typed_column(frame[c]) for c in columns]
+    ensure_table(conn, table, [(c, t) for c, (t, v) in zip(columns, typed)])
+    conn.execute("DELETE FROM " + _quote(table) + " WHERE directory = ?", (directory,))
+    names = [c for c, t in STORE_KEYS] + columns
+    insert = ("INSERT INTO " + _quote(table) + " (" + ", ".join(_quote(c) for c in names) + ") VALUES (" +
+              ", ".join(['?'] * len(names)) + ")")
+    stamps = timestamp_text(timestamps)
+    for first in range(0, len(frame), chunk):
+        last = first + chunk
+        conn.executemany(insert, zip(repeat(userRiverName), repeat(directory), stamps[first:last].tolist(),
+                                     *[v[first:last].tolist() for t, v in typed]))
+    return len(frame)
+
+def write_store(path, userRiverName, directory, importfile, qwdata, resOhm, renamed, spans, chunk=STORE_CHUNK):
+    """
+    Load the processed resistivity (res), water-quality (wq) and merged QW/resistivity (merged) frames of a run into
+    the store at path, in place of what an earlier run into directory loaded
+
+    renamed and spans are the renamed resistivity file directory and its discovery table, which time the
+    resistivity records.
+    """
+    directory = os.path.abspath(directory)
+    resTimes = res_timestamps(importfile, renamed, spans)
+    # The merged rows are resistivity records joined to their water-quality match
+    mergedTimes = res_timestamps(resOhm, renamed, spans)
+    wqTimes = (wq_timestamps(qwdata['Date'], qwdata['Time']) if 'Date' in qwdata and 'Time' in qwdata
+               else np.full(len(qwdata), np.datetime64('NaT'), dtype='datetime64[ns]'))
+    conn = connect(path)
+    try:
+        with conn:
+            rows = [load_table(conn, 'res', importfile, userRiverName, directory, resTimes, chunk),
+                    load_table(conn, 'wq', qwdata, userRiverName, directory, wqTimes, chunk),
+                    load_table(conn, 'merged', resOhm, userRiverName, directory, mergedTimes, chunk)]
+    finally:
+        conn.close()
+    logging.info("Store " + path + " loaded with " + ", ".join(str(n) + " " + t + " rows" for n, t in
+                                                               zip(rows, STORE_TABLES)) + "\n")
+    return path
+
+#%%
+def read_store(path, table, reach=None, profile=None, start=None, end=None, columns=None):
+    """
+    Rows of one table of the store, optionally of one reach, one profile (File) and between two timestamps
+    """
+    if table not in STORE_TABLES:
+        raise ValueError("Unknown store table " + str(table) + ", expected one of " + ", ".join(STORE_TABLES))
+    query = "SELECT " + (", ".join(_quote(c) for c in columns) if columns else "*") + " FROM " + _quote(table) + \
+            " WHERE 1"
+    args = []
+    for column, op, value in [('reach', '=', reach), ('File', '=', profile), ('timestamp', '>=', start),
+                              ('timestamp', '<=', end)]:
+        if value is not None:
+            query += " AND " + _quote(column) + " " + op + " ?"
+            args.append(value if column != 'timestamp' else timestamp_text([pd.Timestamp(value)])[0])
+    conn = sqlite3.connect(path, timeout=STORE_TIMEOUT)
+    try:
+        return pd.read_sql_query(query, conn, params=args)
+    finally:
+        conn.close()
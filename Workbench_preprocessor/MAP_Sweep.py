@@ -0,0 +1,463 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Parameter sweep for the Oasis preprocessing filters.
+
+The reach is discovered, ordered, read, projected and cleared of overlaps once (the same stages run_oasis() uses)
+and reduced to read-only numpy arrays. Every combination of bandpass limits, rejected Rho flags, despiking, rolling
+window, depth factor, minimum survey length and join buffer is then evaluated against those shared arrays in a thread
+pool. The bandpassed Rho and the despiked depth and altitude come from screen_rho(), the kernel of
+filter_resistivity(), once per bandpass/reject/despike setting; moving averages come from cumulative-sum prefix
+tables built once per setting, so each window width costs O(n). When the grid holds the variant with run_oasis()'s
+default settings, its filtered columns are checked against filter_resistivity() on the same survey.
+
+Each variant's filtered output is written to the SWEEP folder as <river>_SWEEP_<variant>.csv and one row of summary
+statistics per variant to <river>_SWEEP_SUMMARY.csv, so the settings can be compared side by side.
+
+    python MAP_Sweep.py River res_folder wq_folder survey.ini output --band 0:250 10:200 --window 10 20 40
+
+Differences from run_oasis(): the water-quality join takes the nearest point within the buffer instead of one row
+per intersecting buffer, and files dropped by a larger minimum survey length keep the order found with the smallest.
+"""
+#%%
+import argparse
+import itertools
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import warnings
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from MAP_Despike import DESPIKE_COLUMNS
+from MAP_Metrics import StageMetrics, file_size
+from MAP_Overlap import OVERLAP_MODE, OVERLAP_MODES, OVERLAP_TOLERANCE, remove_overlaps
+from MAP_Pipeline import (BANDPASS_MIN, BANDPASS_MAX, FILTER_WINDOW, DEPTH_FACTOR, MIN_SURVEY_POINTS, JOIN_BUFFER,
+                          PreprocessingError, check_inputs, discover_resistivity, discover_wq, sequence_surveys,
+                          name_surveys, reversed_lines, read_resistivity, decode_coordinates, project_utm, to_float,
+                          number_files, read_ini, screen_rho, filter_resistivity, corrected_distance, read_wq, clean_wq)
+from MAP_Rho import RHO_OUT_OF_BAND, RHO_QUALITY
+from MAP_Sequence import SEQUENCE_MODE, SEQUENCE_MODES, line_direction
+
+#%%
+RHO_COLUMNS = ['Final_Rho_{}'.format(x) for x in range(1, 11)]
+VARIANT_COLUMNS = ['File', 'Filename', 'Lat', 'Lon', 'X_UTM', 'Y_UTM', 'Cum_dist', 'Cor_Depth', 'Depth_rollavg',
+                   'Final_Altitude', 'Ohm_m'] + RHO_COLUMNS
+PARAMETER_COLUMNS = ['variant', 'band_min', 'band_max', 'reject_flagged', 'despike', 'window', 'depth_factor',
+                     'min_points', 'join_buffer']
+# Filtered columns of a variant and the filter_resistivity() / corrected_distance() columns they must equal
+CHECK_COLUMNS = [(c, 'Rho {}_rollavg'.format(x)) for x, c in enumerate(RHO_COLUMNS, 1)] + \
+                [('Cor_Depth', 'Depth_filt'), ('Depth_rollavg', 'Depth_rollavg'),
+                 ('Final_Altitude', 'Altitude_rollmed'), ('Cum_dist', 'Cum_dist')]
+CHECK_RTOL = 1e-9           # the prefix-table averages differ from pandas' rolling means by rounding only
+
+#%%
+def sweep_grid(bands=((BANDPASS_MIN, BANDPASS_MAX),), windows=(FILTER_WINDOW,), depth_factors=(DEPTH_FACTOR,),
+               min_points=(MIN_SURVEY_POINTS,), buffers=(JOIN_BUFFER,), rejects=(False,), despikes=(False,)):
+    """
+    Every combination of the given parameter values, one dict per variant
+
+    rejects and despikes are run_oasis()'s reject_flagged and despike settings.
+    """
+    grid = []
+    for band, reject, despike, window, factor, points, buffer in itertools.product(bands, rejects, despikes, windows,
+                                                                                 depth_factors, min_points, buffers):
+        variant = {'band_min': band[0],
+                   'band_max': band[1],
+                   'reject_flagged': bool(reject),
+                   'despike': bool(despike),
+                   'window': int(window),
+                   'depth_factor': factor,
+                   'min_points': int(points),
+                   'join_buffer': buffer}
+        variant['variant'] = 'bp{:g}-{:g}_rf{:d}_ds{:d}_w{}_df{:g}_mp{}_jb{:g}'.format(
+            band[0], band[1], bool(reject), bool(despike), int(window), factor, int(points), buffer)
+        grid.append(variant)
+    return grid
+
+def is_default(variant):
+    """
+    True when variant has run_oasis()'s default filter settings
+    """
+    return dict((k, v) for k, v in variant.items() if k != 'variant') == \
+        dict((k, v) for k, v in sweep_grid()[0].items() if k != 'variant')
+
+#%%
+def _read_only(a):
+    a = np.ascontiguousarray(a)
+    a.flags.writeable = False
+    return a
+
+#%%
+def prepare_survey(userRiverName, res_folder, wq_folder, ini_file, directory, min_points=MIN_SURVEY_POINTS, warn=None,
+                   sequence=SEQUENCE_MODE, overlap=OVERLAP_MODE, overlap_tolerance=OVERLAP_TOLERANCE):
+    """
+    Parse and project a reach once and reduce it to the read-only arrays the variants share
+
+    Files shorter than min_points are excluded here; use the smallest minimum of the grid. sequence, overlap and
+    overlap_tolerance are those of run_oasis().
+    """
+    check_inputs(res_folder, wq_folder, ini_file)
+
+    print("Reading and projecting survey")
+    logging.info("Reading and projecting survey for parameter sweep\n")
+    outfilename = os.path.join(res_folder, "all.txt")
+    subset, excludeSurveys = discover_resistivity(res_folder, outfilename, min_points)
+    if len(subset) == 0:
+        raise PreprocessingError("FILE ERROR", "No resistivity files with at least {} points".format(min_points))
+    reorderedSubset = sequence_surveys(subset, sequence)
+    reorderedSubset = name_surveys(reorderedSubset, directory, userRiverName, ".txt")
+    importfile = read_resistivity(reorderedSubset)
+
+    # Raw record count of each file, the length the minimum survey length is tested against
+    fileRows = importfile['Filename'].value_counts()
+
+    importfile = decode_coordinates(importfile)
+    importfile = project_utm(importfile)
+    importfile = remove_overlaps(importfile, 'Filename', tolerance=overlap_tolerance, mode=overlap,
+                                 reversed_lines=reversed_lines(reorderedSubset))
+    importfile = number_files(to_float(importfile))
+    depthoffset = read_ini(ini_file, warn)
+
+    wqFrames = {}
+    wqsubset, wqexcludeSurveys = discover_wq(wq_folder, wqFrames)
+    wqreorderedSubset = sequence_surveys(wqsubset, sequence, start=(importfile.loc[0, "Lat"], importfile.loc[0, "Lon"]),
+                                         direction=line_direction(importfile))
+    wqreorderedSubset = name_surveys(wqreorderedSubset, directory, userRiverName, "_WQ.csv")
+    qwdata = clean_wq(read_wq(wqreorderedSubset, wqFrames))
+    qwdata = project_utm(qwdata)
+    qwdata = remove_overlaps(qwdata, 'Filename', tolerance=overlap_tolerance, mode=overlap,
+                             reversed_lines=reversed_lines(wqreorderedSubset))
+
+    survey = {'depth': importfile['Depth'].values.astype(float),
+              'altitude': importfile['Altitude'].values.astype(float),
+              'lat': importfile['Lat'].values.astype(float),
+              'lon': importfile['Lon'].values.astype(float),
+              'x': importfile['X_UTM'].values.astype(float),
+              'y': importfile['Y_UTM'].values.astype(float),
+              'filename': importfile['Filename'].values,
+              'fileRows': importfile['Filename'].map(fileRows).values.astype(int),
+              'wq_x': qwdata['X_UTM'].values.astype(float),
+              'wq_y': qwdata['Y_UTM'].values.astype(float),
+              'wq_ohm': qwdata['Ohm_m'].values.astype(float)}
+    for key in survey:
+        survey[key] = _read_only(survey[key])
+    # The frame screen_rho() and the default variant's check run on; never changed
+    survey['frame'] = importfile
+    survey['depthoffset'] = depthoffset
+    survey['min_points'] = min_points
+    survey['rows'] = len(importfile)
+    return survey
+
+#%%
+def prefix_table(values):
+    """
+    Cumulative sums of the finite values and of their count along the first axis, with a leading row of zeros
+    """
+    valid = np.isfinite(values)
+    shape = (len(values) + 1,) + values.shape[1:]
+    sums = np.zeros(shape)
+    counts = np.zeros(shape, dtype=np.int64)
+    np.cumsum(np.where(valid, values, 0.0), axis=0, out=sums[1:])
+    np.cumsum(valid, axis=0, out=counts[1:])
+    return sums, counts
+
+#%%
+def moving_average(table, width):
+    """
+    Trailing moving average of width records from a prefix table
+
+    Matches Series.rolling(width, min_periods=1).mean(): NaNs are skipped and a window without any value is NaN.
+    """
+    sums, counts = table
+    stop = np.arange(1, len(sums))
+    start = np.maximum(stop - width, 0)
+    total = sums[stop] - sums[start]
+    count = counts[stop] - counts[start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+    mean[count == 0] = np.nan
+    return mean
+
+#%%
+def depth_filter_values(depth, depthoffset, factor):
+    """
+    Depths shallower than the INI depth offset plus the factor set to NaN
+    """
+    with np.errstate(invalid='ignore'):
+        return np.where(depth < depthoffset + factor, np.nan, depth)
+
+#%%
+def screen_key(variant):
+    return (variant['band_min'], variant['band_max']), variant['reject_flagged'], variant['despike']
+
+def build_screen(survey, key):
+    """
+    Bandpassed Rho and the depth and altitude the filters run on, for a (band, reject_flagged, despike) key
+    """
+    band, reject, despike = key
+    bandpass, checks, cleaned, despikeFlags = screen_rho(survey['frame'], band,
+                                                         RHO_OUT_OF_BAND | (RHO_QUALITY if reject else 0), despike)
+    screen = {'rho': bandpass, 'depth': survey['depth'], 'altitude': survey['altitude']}
+    if despike:
+        screen['depth'] = cleaned[:, DESPIKE_COLUMNS.index('Depth')]
+        screen['altitude'] = cleaned[:, DESPIKE_COLUMNS.index('Altitude')]
+    for name in screen:
+        screen[name] = _read_only(screen[name])
+    return screen
+
+def build_table(survey, screens, key):
+    """
+    Prefix table for a ('rho', screen key, min_points), ('depth', factor, despike, min_points) or ('wq',) key
+    """
+    if key[0] == 'wq':
+        return prefix_table(survey['wq_ohm'])
+    keep = survey['fileRows'] >= key[-1]
+    if key[0] == 'rho':
+        return prefix_table(screens[key[1]]['rho'][keep])
+    # The depth source is the same for every band and reject setting
+    depth = next(s['depth'] for k, s in screens.items() if k[2] == key[2])
+    return prefix_table(depth_filter_values(depth[keep], survey['depthoffset'], key[1]))
+
+#%%
+def table_keys(grid):
+    keys = set([('wq',)])
+    for v in grid:
+        keys.add(('rho', screen_key(v), v['min_points']))
+        keys.add(('depth', v['depth_factor'], v['despike'], v['min_points']))
+    return sorted(keys)
+
+#%%
+def nearest_wq(survey, tree, buffer):
+    """
+    Index of the nearest water-quality point within buffer meters of each resistivity point (-1 when none)
+    """
+    dist, idx = tree.query(np.column_stack((survey['x'], survey['y'])), distance_upper_bound=buffer)
+    idx[~np.isfinite(dist)] = -1
+    return idx
+
+#%%
+def evaluate_variant(survey, variant, screens, tables, matches):
+    """
+    Filtered output frame and summary statistics of one variant
+    """
+    began = time.time()
+    window = variant['window']
+    keep = survey['fileRows'] >= variant['min_points']
+
+    frame = pd.DataFrame({'Filename': survey['filename'][keep],
+                          'Lat': survey['lat'][keep],
+                          'Lon': survey['lon'][keep],
+                          'X_UTM': survey['x'][keep],
+                          'Y_UTM': survey['y'][keep]})
+    frame['File'] = pd.factorize(frame['Filename'], sort=False)[0] + 1
+    step = np.hypot(np.diff(frame['X_UTM'].values), np.diff(frame['Y_UTM'].values))
+    frame['Cum_dist'] = np.concatenate(([0.0], np.cumsum(step)))
+
+    # Bandpass and rolling average of the resistivity channels
+    screen = screens[screen_key(variant)]
+    rho = moving_average(tables[('rho', screen_key(variant), variant['min_points'])], window)
+    for x, column in enumerate(RHO_COLUMNS):
+        frame[column] = rho[:, x]
+
+    # Depth filter and rolling average, rolling median of altitude
+    frame['Cor_Depth'] = depth_filter_values(screen['depth'][keep], survey['depthoffset'], variant['depth_factor'])
+    frame['Depth_rollavg'] = moving_average(tables[('depth', variant['depth_factor'], variant['despike'],
+                                                    variant['min_points'])], window)
+    frame['Final_Altitude'] = pd.Series(screen['altitude'][keep]).rolling(window, min_periods=1).median().round(1)
+
+    # Rolling average of the water resistivity joined from the nearest point within the buffer
+    wqOhm = moving_average(tables[('wq',)], window)
+    idx = matches[variant['join_buffer']][keep]
+    matched = idx >= 0
+    ohm = np.where(matched, wqOhm[np.where(matched, idx, 0)], np.nan)
+    frame['Ohm_m'] = pd.Series(ohm).interpolate().fillna(method='bfill')
+
+    stats = dict((k, variant[k]) for k in PARAMETER_COLUMNS)
+    stats['rows'] = len(frame)
+    stats['files'] = int(frame['File'].max()) if len(frame) else 0
+    stats['length_km'] = round(frame['Cum_dist'].iloc[-1] / 1000, 3) if len(frame) else 0.0
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        for x, column in enumerate(RHO_COLUMNS):
+            stats['Rho{}_valid'.format(x + 1)] = round(float(np.isfinite(rho[:, x]).mean()), 4) if len(frame) else 0.0
+            stats['Rho{}_mean'.format(x + 1)] = np.nanmean(rho[:, x])
+            stats['Rho{}_median'.format(x + 1)] = np.nanmedian(rho[:, x])
+        stats['Depth_valid'] = round(float(np.isfinite(frame['Cor_Depth'].values).mean()), 4) if len(frame) else 0.0
+        stats['Depth_mean'] = np.nanmean(frame['Depth_rollavg'].values)
+        stats['Altitude_mean'] = np.nanmean(frame['Final_Altitude'].values)
+        stats['Ohm_m_matched'] = round(float(matched.mean()), 4) if len(frame) else 0.0
+        stats['Ohm_m_mean'] = np.nanmean(frame['Ohm_m'].values)
+        stats['Ohm_m_median'] = np.nanmedian(frame['Ohm_m'].values)
+    stats['wall_s'] = round(time.time() - began, 6)
+    return frame[VARIANT_COLUMNS], stats
+
+#%%
+def check_variant(survey, variant, frame):
+    """
+    Columns of a variant's filtered frame that differ from what filter_resistivity() and corrected_distance() give the
+    prepared survey with the same settings, as (column, differing records) pairs
+
+    Only a variant with the survey's minimum survey length can be checked; the others drop records the pipeline
+    would have dropped before overlap removal.
+    """
+    if variant['min_points'] != survey['min_points']:
+        raise ValueError("Only variants with the prepared minimum survey length can be checked")
+    expected = filter_resistivity(survey['frame'].copy(), survey['depthoffset'],
+                                  (variant['band_min'], variant['band_max']), variant['window'],
+                                  variant['depth_factor'],
+                                  RHO_OUT_OF_BAND | (RHO_QUALITY if variant['reject_flagged'] else 0),
+                                  variant['despike'])
+    expected = corrected_distance(expected)
+    differences = []
+    for column, source in CHECK_COLUMNS:
+        a = frame[column].values.astype(float)
+        b = pd.to_numeric(expected[source], errors='coerce').values.astype(float)
+        same = np.isclose(a, b, rtol=CHECK_RTOL, atol=0.0, equal_nan=True)
+        if not same.all():
+            differences.append((column, int((~same).sum())))
+    return differences
+
+#%%
+def run_sweep(userRiverName, res_folder, wq_folder, ini_file, directory, grid=None, processes=None,
+              write_variants=True, warn=None, metrics=None, sequence=SEQUENCE_MODE, overlap=OVERLAP_MODE,
+              overlap_tolerance=OVERLAP_TOLERANCE):
+    """
+    Evaluate a grid of filter settings (sweep_grid()) on one reach and write the variants and their summary
+
+    Returns the summary table, one row per variant.
+    """
+    if grid is None:
+        grid = sweep_grid()
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if metrics is None:
+        metrics = StageMetrics(userRiverName + '_SWEEP')
+    sweepFolder = os.path.join(directory, 'SWEEP')
+    if not os.path.isdir(sweepFolder):
+        os.makedirs(sweepFolder)
+
+    metrics.start('sweep_prepare')
+    survey = prepare_survey(userRiverName, res_folder, wq_folder, ini_file, directory,
+                            min(v['min_points'] for v in grid), warn, sequence, overlap, overlap_tolerance)
+    metrics.stop('sweep_prepare', rows_out=survey['rows'])
+
+    pool = ThreadPool(processes)
+    try:
+        # Prefix tables and join matches shared by the variants, built once each
+        keys = table_keys(grid)
+        buffers = sorted(set(v['join_buffer'] for v in grid))
+        metrics.start('sweep_tables', rows_in=survey['rows'])
+        screenKeys = sorted(set(screen_key(v) for v in grid))
+        screens = dict(zip(screenKeys, pool.map(lambda key: build_screen(survey, key), screenKeys)))
+        tables = dict(zip(keys, pool.map(lambda key: build_table(survey, screens, key), keys)))
+        tree = cKDTree(np.column_stack((survey['wq_x'], survey['wq_y'])))
+        matches = dict(zip(buffers, pool.map(lambda b: nearest_wq(survey, tree, b), buffers)))
+        metrics.stop('sweep_tables', rows_out=len(tables) + len(matches))
+
+        def run_variant(variant):
+            frame, stats = evaluate_variant(survey, variant, screens, tables, matches)
+            if is_default(variant) and variant['min_points'] == survey['min_points']:
+                differences = check_variant(survey, variant, frame)
+                if differences:
+                    logging.error("Default sweep variant differs from filter_resistivity() in " +
+                                  ", ".join(c + " (" + str(n) + " records)" for c, n in differences) + "\n")
+                    raise PreprocessingError("SWEEP ERROR", "The default sweep variant does not match the pipeline's "
+                                                            "filtered output; see the log file")
+                logging.info("Default sweep variant matches filter_resistivity()\n")
+            stats['output'] = None
+            if write_variants:
+                stats['output'] = os.path.join(sweepFolder, '{}_SWEEP_{}.csv'.format(userRiverName, variant['variant']))
+                frame.to_csv(stats['output'], index=False)
+            logging.info("Sweep variant " + variant['variant'] + " evaluated\n")
+            return stats
+
+        print('Evaluating {} parameter combinations'.format(len(grid)))
+        metrics.start('sweep_variants', rows_in=survey['rows'] * len(grid))
+        records = pool.map(run_variant, grid)
+        metrics.stop('sweep_variants', rows_out=sum(r['rows'] for r in records),
+                     bytes_written=file_size([r['output'] for r in records]))
+    finally:
+        pool.close()
+        pool.join()
+
+    columns = PARAMETER_COLUMNS + ['rows', 'files', 'length_km']
+    columns += ['Rho{}_{}'.format(x, s) for x in range(1, 11) for s in ('valid', 'mean', 'median')]
+    columns += ['Depth_valid', 'Depth_mean', 'Altitude_mean', 'Ohm_m_matched', 'Ohm_m_mean', 'Ohm_m_median',
+                'wall_s', 'output']
+    summary = pd.DataFrame(records, columns=columns)
+    summaryPath = os.path.join(sweepFolder, '{}_SWEEP_SUMMARY.csv'.format(userRiverName))
+    summary.to_csv(summaryPath, index=False)
+    logging.info("Sweep summary written to " + summaryPath + "\n")
+    metrics.write(os.path.join(sweepFolder, '{}_SWEEP_METRICS.json'.format(userRiverName)))
+    return summary
+
+#%%
+def parse_band(text):
+    try:
+        low, high = text.split(':')
+        return float(low), float(high)
+    except ValueError:
+        raise argparse.ArgumentTypeError("bandpass limits must be given as MIN:MAX, not " + text)
+
+#%%
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare Oasis filter settings on one reach")
+    parser.add_argument('river', help="river name used in the output file names")
+    parser.add_argument('res_folder', help="folder with the resistivity .txt and .bin files")
+    parser.add_argument('wq_folder', help="folder with the water-quality .csv files")
+    parser.add_argument('ini_file', help="INI file used to collect the resistivity data")
+    parser.add_argument('output', help="folder the SWEEP folder is created in")
+    parser.add_argument('--band', type=parse_band, nargs='+', default=[(BANDPASS_MIN, BANDPASS_MAX)],
+                        help="bandpass limits in ohm-m as MIN:MAX")
+    parser.add_argument('--reject-flagged', type=int, nargs='+', choices=(0, 1), default=[0],
+                        help="1 to also drop the Rho channels failing the current/voltage checks")
+    parser.add_argument('--despike', type=int, nargs='+', choices=(0, 1), default=[0],
+                        help="1 to remove spikes and bridge jumps before filtering")
+    parser.add_argument('--window', type=int, nargs='+', default=[FILTER_WINDOW],
+                        help="rolling average and median window in records")
+    parser.add_argument('--depth-factor', type=float, nargs='+', default=[DEPTH_FACTOR],
+                        help="m above the INI depth offset below which depths are dropped")
+    parser.add_argument('--min-points', type=int, nargs='+', default=[MIN_SURVEY_POINTS],
+                        help="minimum resistivity records for a file to be kept")
+    parser.add_argument('--buffer', type=float, nargs='+', default=[JOIN_BUFFER],
+                        help="water-quality join buffer in m")
+    parser.add_argument('--processes', type=int, default=None, help="worker threads (default: CPU count)")
+    parser.add_argument('--summary-only', action='store_true', help="write only the summary table")
+    parser.add_argument('--sequence', choices=SEQUENCE_MODES, default=SEQUENCE_MODE,
+                        help="order the surveys by acquisition time or by location (default: %(default)s)")
+    parser.add_argument('--overlap', choices=OVERLAP_MODES, default=OVERLAP_MODE,
+                        help="remove coverage near any earlier line, inside the box where consecutive lines meet as "
+                             "the original did, or none (default: %(default)s)")
+    parser.add_argument('--overlap-tolerance', type=float, default=OVERLAP_TOLERANCE,
+                        help="metres from an earlier line's track within which coverage counts as re-surveyed "
+                             "(default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    logging.basicConfig(filename=os.path.join(args.output, 'SWEEP_LOGFILE.txt'),
+                        format='%(asctime)s %(levelname)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p',
+                        filemode='w', level=logging.INFO)
+    grid = sweep_grid(args.band, args.window, args.depth_factor, args.min_points, args.buffer, args.reject_flagged,
+                      args.despike)
+    try:
+        summary = run_sweep(args.river, args.res_folder, args.wq_folder, args.ini_file, args.output, grid,
+                            args.processes, not args.summary_only, sequence=args.sequence, overlap=args.overlap,
+                            overlap_tolerance=args.overlap_tolerance)
+    except PreprocessingError as e:
+        print(e.title + ': ' + str(e))
+        return 1
+    print(summary[PARAMETER_COLUMNS + ['rows', 'Rho1_valid', 'Rho1_mean', 'Ohm_m_matched']].to_string(index=False))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
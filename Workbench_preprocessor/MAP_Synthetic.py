@@ -0,0 +1,311 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Writes synthetic survey reaches for benchmarking and checking the preprocessors without field data.
+
+A reach follows a meandering river centerline in UTM zone 15N. It is split into survey lines, some recorded in the
+upstream direction, each starting a few samples back over the end of the previous line. The files get shuffled
+names so the ordering stage has work to do. Every line gets:
+
+  - a semicolon resistivity .txt file in the colNames layout with an embedded NMEA GGA string,
+  - a matching .bin file with the 26 byte header and 14 byte date field,
+  - a utf-16 water-quality csv with the 12 line sonde preamble.
+
+The reach also gets one INI file with [SwitchPro] DepthOffset, the river centerline as a shapefile for stationing
+and, optionally, short lines that discovery should exclude.
+"""
+#%%
+import datetime
+import io
+import os
+import random
+
+import numpy as np
+import pandas as pd
+
+from MAP_Pipeline import RES_COLUMNS, WQ_COLUMNS
+
+#%%
+# Reach layout
+ORIGIN_LAT = 38.57
+ORIGIN_LON = -91.85
+METERS_PER_DEG_LAT = 111320.0
+SAMPLE_SPACING = 1.5          # m between resistivity records
+SAMPLE_INTERVAL = 1           # s between resistivity records
+WQ_INTERVAL = 5               # resistivity records per water-quality record
+LINE_LEAD_IN = 10             # records each line re-surveys over the end of the previous one
+MEANDER_WAVELENGTH = 2000.0   # m
+MEANDER_AMPLITUDE = 150.0     # m
+DEPTH_OFFSET = -0.3
+
+# Electrode positions along the streamer (m): dipole-dipole, a = 3 m, n = 1..10
+ELECTRODES = [0.0, 3.0] + [6.0 + 3.0 * k for k in range(11)]
+
+BIN_HEADER = b'SuperSting Marine Logfile\n'
+
+#%%
+def _text(s):
+    """
+    Column names as unicode, for writing the utf-16 water-quality files
+    """
+    return s if isinstance(s, type(u'')) else s.decode('utf-8')
+
+#%%
+def geometric_factors(electrodes=ELECTRODES):
+    """
+    Half-space geometric factors for the ten C1-C2 / Pn-Pn+1 dipoles
+    """
+    a, b = electrodes[0], electrodes[1]
+    k = []
+    for n in range(10):
+        m, p = electrodes[2 + n], electrodes[3 + n]
+        g = 1.0 / abs(m - a) - 1.0 / abs(m - b) - 1.0 / abs(p - a) + 1.0 / abs(p - b)
+        k.append(abs(2 * np.pi / g))
+    return np.array(k)
+
+#%%
+def centerline(s):
+    """
+    Latitude and longitude of the river centerline at along-river distance s (m), plus the local lateral unit vector
+    """
+    x = s
+    y = MEANDER_AMPLITUDE * np.sin(2 * np.pi * s / MEANDER_WAVELENGTH)
+    dy = MEANDER_AMPLITUDE * 2 * np.pi / MEANDER_WAVELENGTH * np.cos(2 * np.pi * s / MEANDER_WAVELENGTH)
+    norm = np.sqrt(1 + dy ** 2)
+    return x, y, -dy / norm, 1 / norm
+
+def to_latlon(x, y):
+    lat = ORIGIN_LAT + y / METERS_PER_DEG_LAT
+    lon = ORIGIN_LON + x / (METERS_PER_DEG_LAT * np.cos(np.radians(ORIGIN_LAT)))
+    return lat, lon
+
+#%%
+def ddm(value, degree_digits):
+    """
+    Degrees decimal minutes strings (DDMM.MMMM) as logged in the resistivity Latitude/Longitude columns
+    """
+    sign = np.where(value < 0, '-', '')
+    value = np.abs(value)
+    deg = np.floor(value).astype(int)
+    minutes = (value - deg) * 60
+    fmt = '{:0' + str(degree_digits) + 'd}{:07.4f}'
+    return [s + fmt.format(d, m) for s, d, m in zip(sign, deg, minutes)]
+
+def nmea_checksum(bodies):
+    """
+    NMEA checksums (XOR of the characters between $ and *) for an array of sentence bodies, in one pass
+    """
+    raw = np.array([b.encode('ascii') if not isinstance(b, bytes) else b for b in bodies])
+    codes = raw.view(np.uint8).reshape(len(raw), -1)
+    return np.bitwise_xor.reduce(codes, axis=1)
+
+def gga_sentences(seconds, lat, lon, altitude, hdop, satellites):
+    """
+    $GPGGA sentences, padded with the empty trailing fields the instrument appends
+    """
+    hh = (seconds // 3600) % 24
+    mm = (seconds // 60) % 60
+    ss = seconds % 60
+    latField = ddm(np.abs(lat), 2)
+    lonField = ddm(np.abs(lon), 3)
+    bodies = ['GPGGA,{:02d}{:02d}{:05.2f},{},N,{},W,1,{:02d},{:.1f},{:.1f},M,-31.2,M,,0000'.format(
+              int(h), int(m), float(s), la, lo, int(sat), hd, alt)
+              for h, m, s, la, lo, sat, hd, alt in zip(hh, mm, ss, latField, lonField, satellites, hdop, altitude)]
+    checks = nmea_checksum(bodies)
+    return ['$' + b + '*{:02X}'.format(int(c)) + ',,,,,,' for b, c in zip(bodies, checks)]
+
+#%%
+def resistivity_header():
+    """
+    Header row: 51 semicolon fields, the GPS field itself split into the 21 names of the comma parse
+    """
+    gps = ["GPSString", "UTC", "Latitude2", "D1", "Longitude2", "D2", "Fix Quality", "Satellites", "HDOP",
+           "Altitude", "D3", "Height of Geoid"] + ["E{}".format(k) for k in range(1, 10)]
+    return ';'.join(RES_COLUMNS[1:49]) + ';' + ','.join(gps) + ';HDOP;EXTRANEOUS\n'
+
+#%%
+def survey_line(rng, start, count, reverse, t0):
+    """
+    Records of one resistivity line starting at along-river distance start
+    """
+    s = start + SAMPLE_SPACING * np.arange(count)
+    if reverse:
+        s = s[::-1]
+    lateral = np.cumsum(rng.normal(0, 0.3, count))
+    lateral = np.clip(lateral - lateral.mean(), -15, 15)
+    x, y, nx, ny = centerline(s)
+    lat, lon = to_latlon(x + lateral * nx, y + lateral * ny)
+    seconds = t0 + SAMPLE_INTERVAL * np.arange(count)
+
+    # Two-layer earth: apparent resistivity moves from the water value toward the bed value with dipole number
+    water = 25 + 5 * np.sin(2 * np.pi * s / 5000.0)
+    bed = 80 + 40 * np.sin(2 * np.pi * s / 3000.0 + 1)
+    weight = 1 - np.exp(-np.arange(1, 11) / 3.0)
+    rho = water[:, None] * (1 - weight) + bed[:, None] * weight
+    rho *= rng.normal(1, 0.02, rho.shape)
+    spikes = rng.rand(*rho.shape) < 0.005
+    rho[spikes] *= 10
+    rho[rng.rand(*rho.shape) < 0.002] *= -1
+
+    current = rng.normal(1500, 20, count)
+    volts = rho * current[:, None] / geometric_factors()[None, :]
+
+    depth = 3 + 2 * np.sin(2 * np.pi * s / 1200.0) + rng.normal(0, 0.05, count)
+    depth[rng.rand(count) < 0.01] = DEPTH_OFFSET
+    altitude = 160 - s / 10000.0 + rng.normal(0, 0.1, count)
+    for b in np.flatnonzero(rng.rand(count) < 0.002):
+        altitude[b:b + 5] += 12  # bridge
+    hdop = np.round(rng.uniform(0.7, 1.4, count), 1)
+    satellites = rng.randint(6, 13, count)
+
+    data = pd.DataFrame({'Distance': np.round(SAMPLE_SPACING * np.arange(count), 2), 'Depth': np.round(depth, 2)})
+    for n in range(10):
+        data['Rho {}'.format(n + 1)] = np.round(rho[:, n], 3)
+    for name, position in zip(RES_COLUMNS[12:25], ELECTRODES):
+        data[name] = position
+    data['Latitude'] = ddm(lat, 2)
+    data['Longitude'] = ddm(lon, 2)
+    data['In_p'] = np.round(current, 2)
+    data['In_n'] = -np.round(current, 2)
+    for n in range(10):
+        data['V{}_p'.format(n + 1)] = np.round(volts[:, n], 4)
+        data['V{}_n'.format(n + 1)] = -np.round(volts[:, n], 4)
+    data['GPSString'] = gga_sentences(seconds, lat, lon, altitude, hdop, satellites)
+    data['HDOP'] = hdop
+    data['EXTRANEOUS'] = ''
+    return data, lat, lon, seconds
+
+#%%
+def wq_records(rng, lat, lon, seconds, day):
+    """
+    Sonde records every WQ_INTERVAL resistivity records along the same track
+    """
+    take = slice(0, len(lat), WQ_INTERVAL)
+    lat, lon, seconds = lat[take], lon[take], seconds[take]
+    n = len(lat)
+    spc = rng.normal(400, 10, n)
+    res = np.round(1e6 / spc, 0).astype(int).astype(str)
+    res[rng.rand(n) < 0.002] = '    +++++'
+    glitch = rng.rand(n) < 0.002
+    lat = np.where(glitch, 0.0, lat)
+    lon = np.where(glitch, 0.0, lon)
+    return pd.DataFrame({
+        0: day.strftime('%m/%d/%y'),
+        1: ['{:02d}:{:02d}:{:02d}'.format(int(t // 3600) % 24, int(t // 60) % 60, int(t) % 60) for t in seconds],
+        2: np.round(rng.normal(18.5, 0.2, n), 2),
+        3: np.round(rng.normal(745, 1, n), 1),
+        4: np.round(rng.normal(95, 2, n), 1),
+        5: np.round(spc, 1),
+        6: np.round(spc * 0.95, 1),
+        7: res,
+        8: np.round(rng.normal(7.9, 0.05, n), 2),
+        9: np.round(rng.normal(0.1, 0.01, n), 3),
+        10: np.round(rng.normal(1.2, 0.05, n), 2),
+        11: np.round(rng.normal(15, 0.5, n), 1),
+        12: np.round(rng.normal(20, 2, n), 1),
+        13: np.round(rng.normal(30, 3, n), 1),
+        14: np.round(rng.normal(0.5, 0.02, n), 2),
+        15: np.round(rng.normal(160, 0.2, n), 1),
+        16: np.round(lat, 6),
+        17: np.round(lon, 6)}, columns=list(range(18)))
+
+def wq_preamble(name, day, seconds):
+    start = '{:02d}{:02d}{:02d}'.format(int(seconds[0] // 3600) % 24, int(seconds[0] // 60) % 60, int(seconds[0]) % 60)
+    stop = '{:02d}{:02d}{:02d}'.format(int(seconds[-1] // 3600) % 24, int(seconds[-1] // 60) % 60, int(seconds[-1]) % 60)
+    lines = ["Log File Name : " + name,
+             "Setup Date (MMDDYY) : " + day.strftime('%m%d%y'),
+             "Setup Time (HHMMSS) : " + start,
+             "Starting Date (MMDDYY) : " + day.strftime('%m%d%y'),
+             "Starting Time (HHMMSS) : " + start,
+             "Stopping Date (MMDDYY) : " + day.strftime('%m%d%y'),
+             "Stopping Time (HHMMSS) : " + stop,
+             "Interval (HHMMSS) : {:06d}".format(WQ_INTERVAL * SAMPLE_INTERVAL),
+             "Sensor warmup (HHMMSS) : 000030",
+             "Circltn: Off",
+             u','.join(_text(c) for c in WQ_COLUMNS),
+             "MMDDYY,HHMMSS" + ",," * 8]
+    return u'\n'.join(_text(l) for l in lines) + u'\n'
+
+#%%
+def write_reach(folder, rows=10000, files=10, seed=0, start=datetime.datetime(2018, 4, 18, 9, 0), lines_per_day=None,
+                short_files=1, reverse_fraction=0.25):
+    """
+    Write a synthetic reach with about rows resistivity records split over files survey lines
+
+    Resistivity files go to folder/Resistivity (with the INI), water-quality files to folder/WQ and the centerline to
+    folder/Centerline. lines_per_day
+    spreads the lines over several survey days. Returns the paths a run of the preprocessor needs.
+    """
+    rng = np.random.RandomState(seed)
+    names = random.Random(seed)
+    resFolder = os.path.join(folder, 'Resistivity')
+    wqFolder = os.path.join(folder, 'WQ')
+    for f in (resFolder, wqFolder):
+        if not os.path.isdir(f):
+            os.makedirs(f)
+
+    perLine = max(100, rows // files)
+    order = list(range(files + short_files))
+    names.shuffle(order)
+    header = resistivity_header()
+    position = 0.0
+    day = start
+    t0 = start.hour * 3600 + start.minute * 60
+    for k in range(files + short_files):
+        short = k >= files
+        count = rng.randint(20, 90) if short else perLine
+        reverse = k > 0 and not short and rng.rand() < reverse_fraction
+        lineStart = position if short else max(0.0, position - LINE_LEAD_IN * SAMPLE_SPACING)
+        data, lat, lon, seconds = survey_line(rng, lineStart, count, reverse, t0)
+        if not short:
+            position = lineStart + SAMPLE_SPACING * count
+
+        base = os.path.join(resFolder, 'Survey_{:04d}'.format(order[k]))
+        with open(base + '.txt', 'w') as fout:
+            fout.write(header)
+            data.to_csv(fout, sep=';', header=False, index=False)
+        with open(base + '.bin', 'wb') as fout:
+            fout.write(BIN_HEADER[:26].ljust(26, b' '))
+            fout.write(day.strftime('%m/%d/%Y').encode('ascii').ljust(14, b' '))
+            fout.write(np.asarray(data[['Rho {}'.format(n) for n in range(1, 11)]].values, dtype='<f4').tobytes())
+
+        if not short:
+            wqName = 'Sonde_{:04d}'.format(order[k])
+            wq = wq_records(rng, lat, lon, seconds, day)
+            with io.open(os.path.join(wqFolder, wqName + '.csv'), 'w', encoding='utf-16') as fout:
+                fout.write(wq_preamble(wqName, day, seconds))
+                fout.write(_text(wq.to_csv(header=False, index=False)))
+
+        t0 = seconds[-1] + 120
+        if lines_per_day and (k + 1) % lines_per_day == 0:
+            day = day + datetime.timedelta(days=1)
+            t0 = start.hour * 3600 + start.minute * 60
+
+    iniFile = os.path.join(resFolder, 'SYNTH.ini')
+    with open(iniFile, 'w') as fout:
+        fout.write('[SwitchPro]\nDepthOffset={}\nSampleInterval={}\nCable=Marine13\n'.format(DEPTH_OFFSET, SAMPLE_INTERVAL))
+
+    # Centerline from a little before the first line to a little past the last
+    centerFile = write_centerline(os.path.join(folder, 'Centerline'), -100.0, position + 100.0)
+
+    return {'res_folder': resFolder, 'wq_folder': wqFolder, 'ini_file': iniFile, 'centerline': centerFile,
+            'rows': perLine * files, 'files': files}
+
+def write_centerline(folder, start, end, spacing=5.0):
+    """
+    Write the river centerline from along-river distance start to end (m), a vertex every spacing, as a shapefile
+    """
+    import geopandas as gp
+    from shapely.geometry import LineString
+
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    x, y, nx, ny = centerline(np.arange(start, end, spacing))
+    lat, lon = to_latlon(x, y)
+    centerFile = os.path.join(folder, 'SYNTH_centerline.shp')
+    gp.GeoDataFrame({'Name': ['centerline']}, geometry=[LineString(list(zip(lon, lat)))],
+                    crs={'init': 'epsg:4326'}).to_file(centerFile)
+    return centerFile
@@ -0,0 +1,203 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Multi-resolution tile pyramid of the merged QW/resistivity data for web maps.
+
+A reach can hold millions of points, too many to draw at once. The points are put on the Web Mercator tiles of a
+slippy map (the z/x/y scheme of OpenStreetMap, Leaflet and OpenLayers) and, at every zoom from TILE_MIN_ZOOM to
+TILE_MAX_ZOOM, merged into cells of 1/TILE_GRID of a tile, about one screen pixel each. Every cell becomes one point
+at the mean position of the records in it, carrying the mean of each of TILE_COLUMNS and the number of records
+(Count), so a tile never holds more than TILE_GRID squared points however long the survey.
+
+The pyramid is built bottom up. The records are summed into the cells of the deepest zoom with one sort and an
+np.add.reduceat over all channels at once, and each zoom above is the one below with its cell numbers halved and
+summed again, so the sums and counts of a level are carried up exactly and only the cells, not the records, are
+sorted for every zoom.
+
+Each tile is written as <folder>/<z>/<x>/<y>.geojson, a GeoJSON FeatureCollection of points in WGS84, by a pool of
+threads, and tiles.json (TileJSON) next to them gives the zoom range, bounds, centre and fields of the pyramid.
+"""
+#%%
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from MAP_Missing import coerce_floats, float_columns
+
+#%%
+TILE_FOLDER = 'Tiles'
+TILE_JSON = 'tiles.json'
+TILE_EXTENSION = '.geojson'
+TILE_COLUMNS = ['Ohm_m'] + ['Final_Rho_{}'.format(n) for n in range(1, 11)] + ['Final_Altitude']
+TILE_MIN_ZOOM = 8           # a whole reach on a screen
+TILE_MAX_ZOOM = 16          # cells of about 2.4 m at the equator, near the record spacing
+TILE_GRID = 256             # cells across a tile edge, a power of two
+TILE_DECIMALS = 3           # of the channel means
+COORD_DECIMALS = 7          # of longitude and latitude, about 1 cm
+MAX_LATITUDE = 85.0511287798
+
+#%%
+def mercator(lon, lat):
+    """
+    Position of each point on the Web Mercator square, from 0 to 1 east from 180°W and south from MAX_LATITUDE
+    """
+    lat = np.radians(np.clip(np.asarray(lat, dtype=float), -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0
+    y = 0.5 - np.log(np.tan(np.pi / 4 + lat / 2)) / (2 * np.pi)
+    return x, y
+
+def merge_cells(px, py, totals):
+    """
+    The distinct cells of px, py (ordered by px and then py) and the rows of totals in each added together
+    """
+    key = (px.astype(np.int64) << 32) | py
+    order = np.argsort(key, kind='mergesort')
+    key = key[order]
+    if not len(key):
+        return px, py, totals
+    starts = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+    rows = order[starts]
+    return px[rows], py[rows], np.add.reduceat(totals[order], starts, axis=0)
+
+def tile_pyramid(lon, lat, values, min_zoom=TILE_MIN_ZOOM, max_zoom=TILE_MAX_ZOOM, grid=TILE_GRID):
+    """
+    Cells of every zoom from max_zoom up to min_zoom, each a tuple of the cell numbers px, py (grid cells a tile)
+    and their totals: records, longitude and latitude sums and the sums and counts of each column of values
+
+    Points without a position are left out; missing values are left out of their channel's sum and count.
+    """
+    if grid < 1 or grid & (grid - 1):
+        raise ValueError("The tile grid must be a power of two, not " + str(grid))
+    if not 0 <= min_zoom <= max_zoom or max_zoom + int(np.log2(grid)) > 31:
+        raise ValueError("Zoom levels must run from 0 up to at most " + str(31 - int(np.log2(grid))))
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    values = np.asarray(values, dtype=float).reshape(len(lon), -1)
+    known = np.isfinite(lon) & np.isfinite(lat)
+    lon, lat, values = lon[known], lat[known], values[known]
+
+    x, y = mercator(lon, lat)
+    size = (1 << max_zoom) * grid
+    px = np.clip((x * size).astype(np.int64), 0, size - 1)
+    py = np.clip((y * size).astype(np.int64), 0, size - 1)
+    present = ~np.isnan(values)
+    totals = np.column_stack((np.ones(len(lon)), lon, lat, np.where(present, values, 0), present))
+    px, py, totals = merge_cells(px, py, totals)
+
+    levels = {max_zoom: (px, py, totals)}
+    for zoom in range(max_zoom - 1, min_zoom - 1, -1):
+        px, py, totals = merge_cells(px >> 1, py >> 1, totals)
+        levels[zoom] = (px, py, totals)
+    return levels
+
+#%%
+def _feature_collection(totals, columns):
+    # GeoJSON of the cells of one tile, from plain Python numbers so the C encoder does all the work
+    k = len(columns)
+    count = totals[:, 0]
+    lon = np.round(totals[:, 1] / count, COORD_DECIMALS).tolist()
+    lat = np.round(totals[:, 2] / count, COORD_DECIMALS).tolist()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.round(totals[:, 3:3 + k] / totals[:, 3 + k:3 + 2 * k], TILE_DECIMALS)
+    missing = np.isnan(means)
+    means = means.astype(object)
+    means[missing] = None
+    names = list(columns) + ['Count']
+    properties = [dict(zip(names, row)) for row in np.column_stack((means, count.astype(np.int64))).tolist()]
+    return {'type': 'FeatureCollection',
+            'features': [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [x, y]}, 'properties': p}
+                         for x, y, p in zip(lon, lat, properties)]}
+
+def _write_tile(task):
+    path, totals, columns = task
+    folder = os.path.dirname(path)
+    try:
+        os.makedirs(folder)
+    except OSError:
+        if not os.path.isdir(folder):
+            raise
+    # json.dumps rather than json.dump, which encodes in pure Python
+    text = json.dumps(_feature_collection(totals, columns), separators=(',', ':'), allow_nan=False)
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+def level_tiles(folder, zoom, level, columns, grid=TILE_GRID):
+    """
+    (path, totals, columns) of each tile of one zoom level of tile_pyramid()
+    """
+    px, py, totals = level
+    shift = int(np.log2(grid))
+    tx = px >> shift
+    ty = py >> shift
+    order = np.lexsort((ty, tx))
+    tx, ty = tx[order], ty[order]
+    starts = np.flatnonzero(np.concatenate(([True], (tx[1:] != tx[:-1]) | (ty[1:] != ty[:-1])))) if len(tx) else []
+    bounds = list(starts) + [len(tx)]
+    return [(os.path.join(folder, str(zoom), str(tx[a]), str(ty[a]) + TILE_EXTENSION), totals[order[a:b]], columns)
+            for a, b in zip(bounds[:-1], bounds[1:])]
+
+def write_tiles(df, folder, userRiverName, columns=TILE_COLUMNS, min_zoom=TILE_MIN_ZOOM, max_zoom=TILE_MAX_ZOOM,
+                grid=TILE_GRID, processes=None):
+    """
+    Build the tile pyramid of the Lat/Lon points of df and write it into folder on processes threads (one a CPU by
+    default); returns the path of tiles.json
+
+    A folder holding the tiles of an earlier run is emptied first, so no stale tiles are left behind. df needs one row
+    per record, or the Count and means of a cell weight each record by its rows (MAP_Pipeline.merged_records() reduces
+    a merged QW/resistivity table to that).
+    """
+    columns = [c for c in columns if c in df]
+    lon = coerce_floats(df['Lon'])
+    lat = coerce_floats(df['Lat'])
+    values = float_columns(df, columns)
+    levels = tile_pyramid(lon, lat, values, min_zoom, max_zoom, grid)
+
+    if os.path.isfile(os.path.join(folder, TILE_JSON)):
+        shutil.rmtree(folder)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    tasks = []
+    for zoom in sorted(levels):
+        tasks.extend(level_tiles(folder, zoom, levels[zoom], columns, grid))
+    processes = processes or multiprocessing.cpu_count()
+    pool = ThreadPool(processes)
+    try:
+        written = pool.map(_write_tile, tasks, chunksize=max(1, len(tasks) // (8 * processes)))
+    finally:
+        pool.close()
+        pool.join()
+
+    totals = levels[min_zoom][2]
+    known = np.isfinite(lon) & np.isfinite(lat)
+    bounds = ([float(lon[known].min()), float(lat[known].min()), float(lon[known].max()), float(lat[known].max())]
+              if known.any() else [-180.0, -MAX_LATITUDE, 180.0, MAX_LATITUDE])
+    center = ([round(totals[:, 1].sum() / totals[:, 0].sum(), COORD_DECIMALS),
+               round(totals[:, 2].sum() / totals[:, 0].sum(), COORD_DECIMALS), min_zoom] if len(totals)
+              else [0.0, 0.0, min_zoom])
+    metadata = {'tilejson': '2.2.0',
+                'name': userRiverName,
+                'description': 'Merged QW/resistivity data, cell means of ' + ', '.join(columns),
+                'format': TILE_EXTENSION[1:],
+                'scheme': 'xyz',
+                'tiles': ['{z}/{x}/{y}' + TILE_EXTENSION],
+                'minzoom': min_zoom,
+                'maxzoom': max_zoom,
+                'bounds': bounds,
+                'center': center,
+                'grid': grid,
+                'fields': dict([(c, 'mean') for c in columns] + [('Count', 'records')])}
+    path = os.path.join(folder, TILE_JSON)
+    with open(path, 'w') as f:
+        json.dump(metadata, f, indent=2, sort_keys=True)
+    logging.info(str(len(written)) + " tile(s) of zoom " + str(min_zoom) + " to " + str(max_zoom) + " written to " +
+                 folder + "\n")
+    return path
@@ -0,0 +1,627 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Live Oasis preprocessing while a reach is being surveyed.
+
+The resistivity and water-quality folders are polled every few seconds. Rows appended to a resistivity .txt file
+are read from where the last poll stopped and are decoded and projected once; sonde files are small and are read
+again whenever they change. After any change the surveys are reordered and the resistivity, water-quality and
+merged csv and shapefile outputs of run_oasis() rewritten, so they stay current within seconds of acquisition.
+
+When the new records only extend the survey (the files already processed keep their order, names and direction and
+only the last of them grows), only they are processed: their overlaps are tested against every earlier point, they
+are filtered with the last FILTER_WINDOW records before them for the rolling windows, and they are joined to the
+water quality, which is interpolated again from the last merged row that had a match. Anything else (a survey
+reordered or reversed, changed water-quality files, despiking, whose jump detection looks at every record, or the
+'box' overlap test, whose box is set by the start of a line) processes everything parsed again. The csv outputs are
+rewritten whole either way. The rolling means of the new records are summed over a shorter run than in a full
+rebuild, so they can differ from it in the last few digits. A line that cannot be read is skipped and kept in
+QUARANTINE_FILE instead of holding back the lines after it.
+
+    python MAP_Watch.py River res_folder wq_folder survey.ini output --interval 2
+
+The raw files are not copied to Raw_Data_Renamed and no data release is written; run the Oasis preprocessor on the
+finished folders for those.
+"""
+#%%
+import argparse
+import datetime
+import glob
+import logging
+import os
+import sys
+import time
+import traceback
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from MAP_Decimate import BIN_MODE, BIN_MODES, decimate
+from MAP_Overlap import OVERLAP_MODE, OVERLAP_MODES, OVERLAP_TOLERANCE, find_overlaps, log_overlaps, remove_overlaps
+from MAP_Rho import RHO_OUT_OF_BAND, RHO_QUALITY
+from MAP_Pipeline import (FILTER_WINDOW, MIN_SURVEY_POINTS, RES_COLUMNS, RES_RECORD_COLUMNS, WQ_COLUMNS,
+                          PreprocessingError, check_inputs, read_ini, res_endpoints, wq_endpoints, read_wq_file,
+                          sequence_surveys, name_surveys, reversed_lines, read_bin_date, read_res_file,
+                          decode_coordinates, project_utm, to_float, fill_missing, number_files, filter_resistivity,
+                          corrected_distance, clean_wq, rolling_avg, join_rows, finish_join, merged_records, export,
+                          write_summary, default_save_as, load_centerline)
+from MAP_Sequence import SEQUENCE_MODE, SEQUENCE_MODES, line_direction, record_times, time_span, wq_time_span
+from MAP_Station import add_stations
+
+#%%
+# Seconds between polls of the input folders
+WATCH_INTERVAL = 2.0
+
+# Minimum seconds between rewrites of the shapefiles, which take far longer to write than the csv files
+SPATIAL_INTERVAL = 30.0
+
+# Distance (m) between consecutive points of one line above which a coverage gap is reported
+GAP_DISTANCE = 50.0
+
+# Lines of the resistivity files that could not be read, with the file each came from, in the output directory
+QUARANTINE_FILE = 'QUARANTINED_RES_LINES.txt'
+
+SUBSET_COLUMNS = ["StartLat", "EndLat", "StartLong", "EndLong", "Filename", "StartTime", "EndTime"]
+
+#%%
+def parse_records(data, name=None):
+    """
+    Resistivity records from complete lines of a raw .txt file, without the header line
+    """
+    return read_res_file(BytesIO(data), skiprows=0, name=name)
+
+def split_records(data, name=None):
+    """
+    Resistivity records from complete lines of a raw .txt file, as parse_records(), and the lines that could not be read
+
+    A line with more fields than a record is left out, as its values would land in the wrong columns. When the rest do
+    not parse together each is tried on its own and the ones that do not parse are left out too, so a corrupt line
+    does not hold back the lines after it. The records are None when no line could be read.
+    """
+    good = []
+    bad = []
+    for line in data.splitlines(True):
+        (bad if line.count(b';') >= len(RES_COLUMNS) else good).append(line)
+    try:
+        return (parse_records(b''.join(good), name) if good else None), bad
+    except ValueError:
+        pass
+    lines = good
+    good = []
+    for line in lines:
+        try:
+            parse_records(line, name)
+            good.append(line)
+        except ValueError:
+            bad.append(line)
+    return (parse_records(b''.join(good), name) if good else None), bad
+
+def survey_order(reorderedSubset):
+    """
+    (Filename, NewFilename, Reverse) of each survey in order
+    """
+    return list(zip(reorderedSubset['Filename'], reorderedSubset['NewFilename'],
+                    reorderedSubset['Reverse'].astype(bool)))
+
+#%%
+class LiveReach(object):
+    """
+    Parsed state of a reach whose input folders are still being written to
+
+    poll() reads whatever was added since the last call and returns True when something changed; rebuild() brings
+    the processed frames up to date with everything parsed so far and rewrites the outputs.
+    """
+    def __init__(self, userRiverName, res_folder, wq_folder, ini_file, directory, min_points=MIN_SURVEY_POINTS,
+                 spatial_interval=SPATIAL_INTERVAL, sequence=SEQUENCE_MODE, overlap=OVERLAP_MODE,
+                 overlap_tolerance=OVERLAP_TOLERANCE, centerline=None, bin_size=None, bin_by=BIN_MODE,
+                 reject_flagged=False, despike=False):
+        check_inputs(res_folder, wq_folder, ini_file)
+        self.userRiverName = userRiverName
+        self.res_folder = res_folder
+        self.wq_folder = wq_folder
+        self.directory = directory
+        self.min_points = min_points
+        self.sequence = sequence
+        self.overlap = overlap
+        self.overlap_tolerance = overlap_tolerance
+        self.centerline = load_centerline(centerline) if centerline else None
+        self.bin_size = bin_size
+        self.bin_by = bin_by
+        self.reject = RHO_OUT_OF_BAND | (RHO_QUALITY if reject_flagged else 0)
+        self.despike = despike
+        self.depthoffset = read_ini(ini_file)
+        self.resFiles = {}
+        self.wqFiles = {}
+        self.outputs = {}
+        self.rebuilds = 0
+        self.spatial_interval = spatial_interval
+        self.lastSpatial = None
+        self.spatialCurrent = True
+        # Processed resistivity and merged frames kept between rebuilds (see process_appended(), join_appended())
+        self.processed = None
+        self.joined = None
+
+    #%%
+    def poll(self):
+        resChanged = self.poll_resistivity()
+        wqChanged = self.poll_wq()
+        return resChanged or wqChanged
+
+    def poll_resistivity(self):
+        """
+        Parse the complete lines appended to each resistivity file since the last poll
+        """
+        changed = False
+        outfilename = os.path.join(self.res_folder, "all.txt")
+        for filename in sorted(glob.glob('{}/*.txt'.format(self.res_folder))):
+            if filename == outfilename:
+                continue
+            size = os.path.getsize(filename)
+            state = self.resFiles.get(filename)
+            if state is None or size < state['offset']:
+                # New file, or a file that was rewritten from the start
+                state = {'offset': 0, 'rows': 0, 'date': None, 'first': None, 'last': None, 'frame': None,
+                         'binDate': None, 'start': None, 'end': None}
+            if size == state['offset']:
+                continue
+
+            # The survey date comes from the .bin file, which may not be written yet
+            if state['date'] is None:
+                try:
+                    state['binDate'] = pd.to_datetime(read_bin_date(filename))
+                    state['date'] = state['binDate'].dayofyear
+                except (IOError, IndexError, ValueError):
+                    continue
+
+            with open(filename, 'rb') as fin:
+                fin.seek(state['offset'])
+                data = fin.read(size - state['offset'])
+            end = data.rfind(b'\n')
+            if end < 0:
+                continue
+            offset = state['offset'] + end + 1
+            data = data[:end + 1]
+            if state['offset'] == 0:
+                data = data[data.find(b'\n') + 1:]
+            if not data.strip():
+                state['offset'] = offset
+                self.resFiles[filename] = state
+                continue
+            temp, bad = split_records(data, filename)
+            if bad:
+                self.quarantine(filename, bad)
+            if temp is None:
+                state['offset'] = offset
+                self.resFiles[filename] = state
+                continue
+
+            if state['first'] is None:
+                state['first'] = temp.iloc[[0]][["Latitude", "Longitude"]]
+            state['last'] = temp.iloc[[-1]][["Latitude", "Longitude"]]
+            state['rows'] += len(temp)
+            temp["Filename"] = filename
+            temp['Date'] = state['date']
+            # Appended to an empty frame as read_resistivity() does, so the columns come out in the same order
+            temp = pd.DataFrame(columns=RES_RECORD_COLUMNS).append(temp)
+
+            # Decode and project only the new records
+            temp = decode_coordinates(temp)
+            if len(temp) > 0:
+                # Record times continue from the last record of the previous poll
+                times = record_times(state['binDate'], temp["UTC"].values, temp["Lon"].iloc[0], state['end'])
+                first, last = time_span(times)
+                if pd.isnull(state['start']):
+                    state['start'] = first
+                if not pd.isnull(last):
+                    state['end'] = last
+                temp = project_utm(temp)
+                frames = [state['frame'], temp] if state['frame'] is not None else [temp]
+                state['frame'] = pd.concat(frames, ignore_index=True)
+            state['offset'] = offset
+            self.resFiles[filename] = state
+            changed = True
+        return changed
+
+    def quarantine(self, filename, lines):
+        """
+        Append the lines of filename that could not be read to QUARANTINE_FILE, each after the name of its file
+        """
+        path = os.path.join(self.directory, QUARANTINE_FILE)
+        logging.warning(str(len(lines)) + " unreadable line(s) of " + filename + " skipped and kept in " + path + "\n")
+        with open(path, 'ab') as fout:
+            for line in lines:
+                fout.write(filename.encode('utf-8') + b'\t' + line.rstrip(b'\r\n') + b'\n')
+
+    def poll_wq(self):
+        """
+        Read again each water-quality file whose size or modification time changed
+        """
+        changed = False
+        for filename in sorted(glob.glob('{}/*.csv'.format(self.wq_folder))):
+            stamp = (os.path.getsize(filename), os.path.getmtime(filename))
+            state = self.wqFiles.get(filename)
+            if state is not None and state['stamp'] == stamp:
+                continue
+            try:
+                data = read_wq_file(filename)
+            except (IOError, UnicodeError, ValueError, PreprocessingError):
+                continue
+            self.wqFiles[filename] = {'stamp': stamp, 'frame': data}
+            changed = True
+        return changed
+
+    #%%
+    def order_resistivity(self):
+        subset = []
+        for filename in sorted(self.resFiles):
+            state = self.resFiles[filename]
+            if state['rows'] < self.min_points or state['frame'] is None:
+                continue
+            ends = pd.concat([state['first'], state['last']]).reset_index(drop=True)
+            subset.append(list(res_endpoints(ends, filename)) + [filename, state['start'], state['end']])
+        if not subset:
+            return None
+        reorderedSubset = sequence_surveys(pd.DataFrame(subset, columns=SUBSET_COLUMNS), self.sequence)
+        return name_surveys(reorderedSubset, self.directory, self.userRiverName, ".txt")
+
+    def order_wq(self, start, direction):
+        subset = []
+        for filename in sorted(self.wqFiles):
+            temp = self.wqFiles[filename]['frame']
+            if len(temp) < 2:
+                continue
+            subset.append(list(wq_endpoints(temp, filename)) + [filename] + list(wq_time_span(temp)))
+        if not subset:
+            return None
+        wqreorderedSubset = sequence_surveys(pd.DataFrame(subset, columns=SUBSET_COLUMNS), self.sequence, start=start,
+                                             direction=direction)
+        return name_surveys(wqreorderedSubset, self.directory, self.userRiverName, "_WQ.csv")
+
+    def assemble(self, reorderedSubset, files, columns=None):
+        """
+        Parsed frames in survey order, reversing files flagged for reversal
+
+        With columns the frames are appended to an empty frame with those columns, as read_wq() does.
+        """
+        frames = []
+        for i, filename in enumerate(reorderedSubset["Filename"]):
+            temp = files[filename]['frame']
+            if reorderedSubset.loc[i, "Reverse"]:
+                temp = temp.iloc[::-1]
+            temp = temp.copy()
+            temp["Filename"] = reorderedSubset.loc[i, "NewFilename"]
+            frames.append(temp)
+        if columns is None:
+            return pd.concat(frames, ignore_index=True)
+        combined = pd.DataFrame(columns=columns)
+        for temp in frames:
+            combined = combined.append(temp)
+        return combined.reset_index(drop=True)
+
+    #%%
+    def process_all(self, reorderedSubset):
+        """
+        Overlap removal, filtering and distance of every parsed resistivity record
+        """
+        importfile = self.assemble(reorderedSubset, self.resFiles)
+        line = pd.factorize(importfile['Filename'], sort=False)[0]
+        track = (importfile['X_UTM'].values.astype(float), importfile['Y_UTM'].values.astype(float), line)
+        importfile = remove_overlaps(importfile, 'Filename', tolerance=self.overlap_tolerance, mode=self.overlap,
+                                     reversed_lines=reversed_lines(reorderedSubset))
+        importfile = to_float(importfile)
+        importfile = number_files(importfile)
+        importfile = filter_resistivity(importfile, self.depthoffset, reject=self.reject, despike=self.despike)
+        importfile = corrected_distance(importfile)
+        if self.centerline is not None:
+            importfile = add_stations(importfile, self.centerline)
+        self.processed = {'order': survey_order(reorderedSubset), 'frame': importfile, 'track': track,
+                          'rows': dict((f, len(self.resFiles[f]['frame'])) for f in reorderedSubset['Filename'])}
+        return importfile
+
+    def appended_records(self, reorderedSubset):
+        """
+        Records parsed since the last rebuild in survey order, with the line number of each, when they only extend
+        the processed survey; None when it has to be processed again from the start
+        """
+        if self.processed is None or self.despike or self.overlap == 'box' or not len(self.processed['frame']):
+            return None
+        order = survey_order(reorderedSubset)
+        done = self.processed['order']
+        if order[:len(done)] != done:
+            return None
+        frames = []
+        lines = []
+        for k, (filename, newFilename, reverse) in enumerate(order):
+            frame = self.resFiles[filename]['frame']
+            rows = self.processed['rows'].get(filename, 0)
+            if len(frame) == rows:
+                continue
+            # Only the last file processed may grow, and only at the end of the survey
+            if rows and (k != len(done) - 1 or reverse):
+                return None
+            temp = (frame.iloc[::-1] if reverse else frame.iloc[rows:]).copy()
+            temp["Filename"] = newFilename
+            frames.append(temp)
+            lines.append(np.full(len(temp), k, dtype=np.int64))
+        if not frames:
+            return self.processed['frame'].iloc[:0], np.array([], dtype=np.int64)
+        return pd.concat(frames, ignore_index=True), np.concatenate(lines)
+
+    def process_appended(self, reorderedSubset, records, lines):
+        """
+        Add the overlap-free appended records to the processed resistivity frame, filtering them with the records
+        before them the rolling windows reach back to
+
+        Returns the frame and the position of its first new record.
+        """
+        importfile = self.processed['frame']
+        first = len(importfile)
+        x, y, line = self.processed['track']
+        x = np.concatenate((x, records['X_UTM'].values.astype(float)))
+        y = np.concatenate((y, records['Y_UTM'].values.astype(float)))
+        line = np.concatenate((line, lines))
+        if self.overlap == 'none':
+            overlap = np.zeros(len(records), dtype=bool)
+        else:
+            overlap = find_overlaps(x, y, line, self.overlap_tolerance,
+                                    query=np.arange(len(x) - len(records), len(x)))[len(x) - len(records):]
+        log_overlaps(overlap, records['Filename'].values)
+        records = to_float(records[~overlap].reset_index(drop=True))
+
+        if len(records):
+            # The record before the first new one gives it its Cor_Dist
+            start = max(first - max(FILTER_WINDOW - 1, 1), 0)
+            window = pd.concat([importfile.iloc[start:], records], ignore_index=True, sort=False)
+            window = number_files(window, int(importfile['File'].iloc[start]))
+            window = filter_resistivity(window, self.depthoffset, reject=self.reject, despike=self.despike)
+            window = corrected_distance(window)
+            # Cum_dist goes on from the last record processed, summed in the same order as a full rebuild
+            window.loc[first - start:, 'Cum_dist'] = np.cumsum(np.concatenate((
+                [importfile['Cum_dist'].iloc[first - 1]], window['Cor_Dist'].values[first - start:])))[1:]
+            if self.centerline is not None:
+                window = add_stations(window, self.centerline)
+            importfile = pd.concat([importfile, window.iloc[first - start:]], ignore_index=True, sort=False)
+
+        self.processed.update({'order': survey_order(reorderedSubset), 'frame': importfile, 'track': (x, y, line),
+                               'rows': dict((f, len(self.resFiles[f]['frame']))
+                                            for f in reorderedSubset['Filename'])})
+        return importfile, first
+
+    #%%
+    def process_wq(self, wqreorderedSubset):
+        qwdata = clean_wq(self.assemble(wqreorderedSubset, self.wqFiles, WQ_COLUMNS))
+        qwdata = project_utm(qwdata)
+        qwdata = remove_overlaps(qwdata, 'Filename', tolerance=self.overlap_tolerance, mode=self.overlap,
+                                 reversed_lines=reversed_lines(wqreorderedSubset))
+        if self.centerline is not None:
+            qwdata = add_stations(qwdata, self.centerline)
+        rolling_avg(qwdata, 'Ohm_m', 'Ohm_m', FILTER_WINDOW)
+        qwdata = to_float(qwdata)
+        qwdata.reset_index(inplace=True)
+        return number_files(qwdata)
+
+    def join_all(self, importfile, qwdata, key):
+        resOhm, point = join_rows(importfile, qwdata)
+        self.joined = {'key': key, 'qwdata': qwdata, 'point': point, 'ohm': resOhm['Ohm_m_rollavg'].values.copy(),
+                       'temp': resOhm['Temp_C'].values.copy()}
+        self.joined['frame'] = finish_join(resOhm)
+        return self.joined['frame']
+
+    def join_appended(self, importfile, first):
+        """
+        Join the resistivity records from position first on to the water quality and add them to the merged frame
+
+        The interpolated Ohm_m_rollavg and Temp_C of the rows after the last match of each are recomputed with the
+        new rows; the rows before it keep theirs. Returns None when no earlier row had a match.
+        """
+        joined = self.joined
+        resOhm = joined['frame']
+        end = np.searchsorted(joined['point'], first)
+        last = {}
+        for column, raw in (('Ohm_m_rollavg', joined['ohm']), ('Temp_C', joined['temp'])):
+            valid = np.flatnonzero(pd.notnull(raw[:end]))
+            if not len(valid):
+                return None
+            last[column] = (valid[-1], raw)
+        start = min(k for k, raw in last.values())
+
+        added, point = join_rows(importfile.iloc[first:], joined['qwdata'])
+        tail = resOhm.iloc[start:end].copy()
+        for column, (k, raw) in last.items():
+            tail.iloc[k - start:, tail.columns.get_loc(column)] = raw[k:end]
+        tail = finish_join(pd.concat([tail, added], sort=False))
+        joined.update({'point': np.concatenate((joined['point'][:end], point + first)),
+                       'ohm': np.concatenate((joined['ohm'][:end], added['Ohm_m_rollavg'].values)),
+                       'temp': np.concatenate((joined['temp'][:end], added['Temp_C'].values)),
+                       'frame': pd.concat([resOhm.iloc[:start], tail], sort=False)})
+        return joined['frame']
+
+    #%%
+    def rebuild(self, spatial=None):
+        """
+        Process what was parsed since the last rebuild (or everything, see the module notes) and rewrite the
+        outputs; returns False until a survey is long enough
+
+        The shapefiles are rewritten when spatial is True, or by default when spatial_interval seconds have passed
+        since they were last written.
+        """
+        began = time.time()
+        if spatial is None:
+            spatial = self.lastSpatial is None or began - self.lastSpatial >= self.spatial_interval
+        save_as = default_save_as(self.directory)
+        reorderedSubset = self.order_resistivity()
+        if reorderedSubset is None:
+            return False
+
+        appended = self.appended_records(reorderedSubset)
+        if appended is None:
+            importfile, first = self.process_all(reorderedSubset), 0
+        else:
+            importfile, first = self.process_appended(reorderedSubset, *appended)
+
+        self.outputs['res_csv'] = save_as('{}_Res.csv'.format(self.userRiverName), None)
+        export(fill_missing(importfile.copy()), self.outputs['res_csv'], "resistivity data")
+
+        wqreorderedSubset = self.order_wq((importfile.loc[0, "Lat"], importfile.loc[0, "Lon"]),
+                                          line_direction(importfile))
+        matched = 0
+        if wqreorderedSubset is not None:
+            wqKey = (survey_order(wqreorderedSubset),
+                     [self.wqFiles[f]['stamp'] for f in wqreorderedSubset['Filename']])
+            resOhm = None
+            if self.joined is not None and self.joined['key'] == wqKey:
+                qwdata = self.joined['qwdata']
+                if first > 0:
+                    resOhm = self.join_appended(importfile, first)
+            else:
+                qwdata = self.process_wq(wqreorderedSubset)
+                self.outputs['wq_csv'] = save_as('{}_WQ.csv'.format(self.userRiverName), None)
+                export(qwdata, self.outputs['wq_csv'], "water-quality data")
+            if resOhm is None:
+                resOhm = self.join_all(importfile, qwdata, wqKey)
+            matched = int(resOhm['index_right'].notnull().sum())
+
+            if spatial:
+                self.outputs['wq_shp'] = save_as('{}_WQ.shp'.format(self.userRiverName), None)
+                export(qwdata, self.outputs['wq_shp'], "processed water-quality data", shapefile=True)
+                self.outputs['merged_shp'] = save_as('{}_Merged_QWRes.shp'.format(self.userRiverName), None)
+                export(resOhm, self.outputs['merged_shp'], "preliminary merged QW/resistivity data", shapefile=True,
+                       xy=('X_UTM_left', 'Y_UTM_left'))
+                self.lastSpatial = began
+            self.outputs['merged_csv'] = save_as('{}_Merged_WQRes.csv'.format(self.userRiverName), None)
+            export(resOhm, self.outputs['merged_csv'], "preliminary merged QW/resisitivty data")
+            if self.bin_size:
+                binned = decimate(merged_records(resOhm), self.bin_size, self.bin_by)
+                fill_missing(binned)
+                self.outputs['binned_csv'] = save_as('{}_Merged_WQRes_Binned.csv'.format(self.userRiverName), None)
+                export(binned, self.outputs['binned_csv'], "binned merged QW/resisitivty data")
+
+            self.outputs['summary'] = os.path.join(self.directory, "OASIS_PREPROCESSING_SUMMARY.txt")
+            write_summary(self.outputs['summary'], importfile, reorderedSubset, wqreorderedSubset)
+
+        # Coverage gaps within a line
+        step = pd.to_numeric(importfile['Cor_Dist'], errors='coerce')
+        sameFile = importfile['File'].astype(str) == importfile['File'].shift().astype(str)
+        gaps = int(((step > GAP_DISTANCE) & sameFile).sum())
+
+        self.rebuilds += 1
+        self.spatialCurrent = spatial or wqreorderedSubset is None
+        status = '{:%H:%M:%S} {} line(s), {} points ({} new), {:.2f} km, {} joined to water quality, {} gap(s) over {:g} m ({:.1f} s)'.format(
+            datetime.datetime.now(), len(reorderedSubset), len(importfile), len(importfile) - first,
+            importfile['Cum_dist'].iloc[-1] / 1000, matched, gaps, GAP_DISTANCE, time.time() - began)
+        print(status)
+        logging.info(status + "\n")
+        return True
+
+    #%%
+    def watch(self, interval=WATCH_INTERVAL, idle_timeout=None):
+        """
+        Poll and rebuild until interrupted, or until nothing has changed for idle_timeout seconds
+        """
+        lastChange = time.time()
+        try:
+            while True:
+                if self._poll():
+                    lastChange = time.time()
+                    self._rebuild()
+                elif not self.spatialCurrent and (self.lastSpatial is None or
+                                                  time.time() - self.lastSpatial >= self.spatial_interval):
+                    # Shapefiles skipped by the last rebuild, or a failed rebuild, are now due
+                    self._rebuild()
+                elif idle_timeout is not None and time.time() - lastChange > idle_timeout:
+                    break
+                time.sleep(interval)
+        finally:
+            # Bring the shapefiles up to date with the last data before stopping
+            if not self.spatialCurrent:
+                self._rebuild(spatial=True)
+
+    def _poll(self):
+        """
+        poll(), logging the problem instead of raising; False when it failed
+        """
+        try:
+            return self.poll()
+        except Exception:
+            logging.error("Polling failed, retrying:\n" + traceback.format_exc() + "\n")
+            print('Polling failed, retrying; see the log file')
+            return False
+
+    def _rebuild(self, spatial=None):
+        """
+        rebuild(), logging the problem instead of raising
+        """
+        try:
+            self.rebuild(spatial)
+        except PreprocessingError as e:
+            # Usually a file caught part way through being written; the next change rebuilds again
+            logging.error(e.title + ": " + str(e) + "\n")
+            print(e.title + ': ' + str(e))
+            self.processed = self.joined = None
+            self.spatialCurrent = False
+        except Exception:
+            # Anything else an odd or half-written file can raise; keep watching and rebuild from the start next time
+            logging.error("Rebuild failed, retrying on the next change:\n" + traceback.format_exc() + "\n")
+            print('Rebuild failed, retrying on the next change; see the log file')
+            self.processed = self.joined = None
+            self.spatialCurrent = False
+
+#%%
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep the Oasis outputs current while a reach is surveyed")
+    parser.add_argument('river', help="river name used in the output file names")
+    parser.add_argument('res_folder', help="folder the resistivity .txt and .bin files are written to")
+    parser.add_argument('wq_folder', help="folder the water-quality .csv files are written to")
+    parser.add_argument('ini_file', help="INI file used to collect the resistivity data")
+    parser.add_argument('output', help="folder for the processed outputs")
+    parser.add_argument('--interval', type=float, default=WATCH_INTERVAL, help="seconds between polls")
+    parser.add_argument('--spatial-interval', type=float, default=SPATIAL_INTERVAL,
+                        help="minimum seconds between shapefile rewrites")
+    parser.add_argument('--idle-timeout', type=float, default=None,
+                        help="stop after this many seconds without new data (default: run until interrupted)")
+    parser.add_argument('--sequence', choices=SEQUENCE_MODES, default=SEQUENCE_MODE,
+                        help="order the surveys by acquisition time or by location (default: %(default)s)")
+    parser.add_argument('--overlap', choices=OVERLAP_MODES, default=OVERLAP_MODE,
+                        help="remove coverage near any earlier line, inside the box where consecutive lines meet as "
+                             "the original did, or none (default: %(default)s)")
+    parser.add_argument('--overlap-tolerance', type=float, default=OVERLAP_TOLERANCE,
+                        help="metres from an earlier line's track within which coverage counts as re-surveyed "
+                             "(default: %(default)s)")
+    parser.add_argument('--centerline', default=None,
+                        help="river centerline shapefile; adds the river station and lateral offset to the outputs")
+    parser.add_argument('--bin-size', type=float, default=None,
+                        help="also write the merged data binned every this many metres (or seconds, see --bin-by)")
+    parser.add_argument('--bin-by', choices=BIN_MODES, default=BIN_MODE,
+                        help="bin along Cum_dist or along GPS time (default: %(default)s)")
+    parser.add_argument('--reject-flagged', action='store_true',
+                        help="also drop resistivity channels that disagree with the raw current and voltages or have a weak signal")
+    parser.add_argument('--despike', action='store_true',
+                        help="remove spikes and bridge jumps from Rho, depth and altitude before filtering")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    logging.basicConfig(filename=os.path.join(args.output, 'WATCH_LOGFILE.txt'),
+                        format='%(asctime)s %(levelname)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p',
+                        filemode='a', level=logging.INFO)
+    try:
+        reach = LiveReach(args.river, args.res_folder, args.wq_folder, args.ini_file, args.output,
+                          spatial_interval=args.spatial_interval, sequence=args.sequence, overlap=args.overlap,
+                          overlap_tolerance=args.overlap_tolerance,
+                          centerline=args.centerline, bin_size=args.bin_size, bin_by=args.bin_by,
+                          reject_flagged=args.reject_flagged, despike=args.despike)
+        print('Watching {} and {}; press Ctrl+C to stop'.format(args.res_folder, args.wq_folder))
+        reach.watch(args.interval, args.idle_timeout)
+    except PreprocessingError as e:
+        print(e.title + ': ' + str(e))
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
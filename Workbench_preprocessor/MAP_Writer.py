@@ -0,0 +1,112 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Background writer for the preprocessing outputs.
+
+The csv files, shapefiles and summary of a run do not depend on each other, so instead of writing them one after
+another on the main thread they are handed to an OutputWriter. Its threads write them while the processing carries
+on, and close() waits for the last one. The queue in front of the threads is bounded, so a run that produces outputs
+faster than they can be written waits instead of holding every frame in memory at once.
+
+A write that fails does not stop the run. The failures are collected and returned by close() once every other
+output has been written, so they can be reported together. A run that fails itself closes its writer with discard,
+which drops the outputs still queued and only waits for those being written.
+"""
+#%%
+import logging
+import threading
+import traceback
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+from MAP_Metrics import file_size
+
+#%%
+WRITER_THREADS = 4     # outputs written at the same time
+WRITER_QUEUE = 4       # outputs waiting for a free thread before submit() blocks
+
+#%%
+class OutputWriter(object):
+    """
+    Writes outputs on background threads and reports every failed write at the end
+
+    Each write is recorded in metrics as its own stage, timed from when a thread picks it up.
+    """
+    def __init__(self, metrics=None, threads=WRITER_THREADS, queue_size=WRITER_QUEUE):
+        self.metrics = metrics
+        self.errors = []
+        self.queue = Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.discard = False
+        self.threads = []
+        for k in range(threads):
+            thread = threading.Thread(target=self._work, name='OutputWriter-{}'.format(k + 1))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, stage, func, args, rows=None, paths=None):
+        """
+        Queue func(*args) as the named stage; paths are measured for the bytes written once it finishes
+
+        The arguments must not be changed by the caller until close() returns.
+        """
+        self.queue.put((stage, func, args, rows, paths))
+
+    def _work(self):
+        while True:
+            task = self.queue.get()
+            try:
+                if task is None:
+                    return
+                if not self.discard:
+                    self._write(*task)
+            finally:
+                self.queue.task_done()
+
+    def _write(self, stage, func, args, rows, paths):
+        if self.metrics is not None:
+            self.metrics.start(stage, rows_in=rows)
+        try:
+            func(*args)
+        except Exception as e:
+            message = str(e) or e.__class__.__name__
+            # A PreprocessingError (it has a title) already names the output; anything else gets its traceback
+            if hasattr(e, 'title'):
+                logging.error("Output " + stage + " failed: " + message + "\n")
+            else:
+                logging.error("Output " + stage + " failed: " + message + "\n" + traceback.format_exc())
+            with self.lock:
+                self.errors.append(message)
+            if self.metrics is not None:
+                self.metrics.stop(stage, rows_out=0)
+            return
+        if self.metrics is not None:
+            self.metrics.stop(stage, rows_out=rows, bytes_written=file_size(paths) if paths else None)
+
+    def close(self, discard=False):
+        """
+        Wait for every queued write to finish, or with discard only for those already started; returns the error
+        messages of the writes that failed
+
+        Closing a writer again does nothing.
+        """
+        if not self.threads:
+            return self.errors
+        self.discard = discard
+        if self.metrics is not None:
+            self.metrics.start('export_wait')
+        for thread in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        if self.metrics is not None:
+            self.metrics.stop('export_wait')
+        return self.errors
@@ -0,0 +1,50 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Tests of MAP_Despike: isolated spikes are spikes, and only a step onto a plateau and back is a jump.
+"""
+#%%
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MAP_Despike import DESPIKE_JUMP, DESPIKE_SPIKE, despike
+
+#%%
+class DespikeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.RandomState(0)
+
+    def test_isolated_spikes_are_not_a_jump(self):
+        values = 50 + self.rng.normal(0, 1, (300, 1))
+        noise = values.copy()
+        values[[40, 90], 0] *= 10
+        cleaned, flags = despike(values, np.zeros(300, dtype=int))
+        self.assertFalse((flags & DESPIKE_JUMP).any())
+        self.assertTrue((flags[[40, 90], 0] & DESPIKE_SPIKE).all())
+        # The valid records between the spikes are left as they were
+        self.assertTrue(np.array_equal(cleaned[41:90], noise[41:90]))
+
+    def test_noise_has_no_jumps(self):
+        values = 50 + self.rng.normal(0, 1, (5000, 4))
+        values[self.rng.rand(5000, 4) < 0.01] *= 10
+        cleaned, flags = despike(values, np.repeat(np.arange(5), 1000))
+        self.assertFalse((flags & DESPIKE_JUMP).any())
+
+    def test_bridge_plateau_is_a_jump(self):
+        values = 10 + self.rng.normal(0, 0.05, (400, 1))
+        values[150:190] += 5
+        cleaned, flags = despike(values, np.zeros(400, dtype=int))
+        self.assertTrue(np.array_equal(np.flatnonzero(flags[:, 0] & DESPIKE_JUMP), np.arange(150, 190)))
+        self.assertLess(np.abs(cleaned[150:190] - 10).max(), 0.5)
+
+#%%
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Tests of MAP_Metrics.StageMetrics.
+"""
+#%%
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MAP_Metrics import StageMetrics
+
+#%%
+class SkippedStageTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_skipped_stage_is_recorded_without_timings(self):
+        metrics = StageMetrics('test')
+        metrics.start('workbench_format', rows_in=10)
+        metrics.stop('workbench_format', rows_out=10)
+        metrics.skip('workbench_checks', rows_in=10)
+        self.assertEqual([s['stage'] for s in metrics.stages], ['workbench_format', 'workbench_checks'])
+        self.assertEqual(metrics.stages[-1], {'stage': 'workbench_checks', 'status': 'skipped', 'rows_in': 10})
+        self.assertEqual(metrics.total()['wall_s'], metrics.stages[0]['wall_s'])
+
+#%%
+if __name__ == '__main__':
+    unittest.main()
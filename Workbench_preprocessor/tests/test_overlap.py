@@ -0,0 +1,42 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Tests of MAP_Overlap: coverage near an earlier line's track is found between its points too.
+"""
+#%%
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MAP_Overlap import find_overlaps
+
+#%%
+class TrackOverlapTest(unittest.TestCase):
+
+    def test_resurvey_between_sparse_points(self):
+        # An earlier line sampled every 10 m and a later one 1 m off it, sampled halfway between
+        x = np.concatenate((np.arange(0, 1000, 10.0), np.arange(5, 995, 10.0)))
+        y = np.concatenate((np.zeros(100), np.ones(99)))
+        line = np.repeat([0, 1], [100, 99])
+        overlap = find_overlaps(x, y, line)
+        self.assertFalse(overlap[:100].any())
+        self.assertTrue(overlap[100:].all())
+
+    def test_beyond_tolerance_is_kept(self):
+        x = np.concatenate((np.arange(0, 1000, 10.0), np.arange(5, 995, 10.0)))
+        y = np.concatenate((np.zeros(100), np.full(99, 2.5)))
+        self.assertFalse(find_overlaps(x, y, np.repeat([0, 1], [100, 99])).any())
+
+    def test_line_of_one_point(self):
+        overlap = find_overlaps([0.0, 100.0, 101.0, 0.5], [0.0, 0.0, 0.0, 0.5], [0, 1, 1, 2])
+        self.assertEqual(overlap.tolist(), [False, False, False, True])
+
+#%%
+if __name__ == '__main__':
+    unittest.main()
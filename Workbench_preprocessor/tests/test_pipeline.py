@@ -0,0 +1,82 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Tests of MAP_Pipeline.run_oasis on a small synthetic reach.
+"""
+#%%
+import glob
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MAP_Pipeline import PreprocessingError, run_oasis
+from MAP_Synthetic import write_reach
+
+#%%
+class FailedRunTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.folder = tempfile.mkdtemp()
+        self.reach = write_reach(os.path.join(self.folder, 'reach'), rows=600, files=3, short_files=0)
+        # Water-quality files the sonde never wrote: the run fails after the writer and sampler are started
+        for filename in glob.glob(os.path.join(self.reach['wq_folder'], '*.csv')):
+            with open(filename, 'w') as fout:
+                fout.write('not a sonde file\n')
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.folder)
+
+    def test_failed_runs_leave_no_threads(self):
+        before = threading.active_count()
+        for k in range(3):
+            output = os.path.join(self.folder, 'out{}'.format(k))
+            os.makedirs(output)
+            with self.assertRaises(PreprocessingError):
+                run_oasis('SYNTH', self.reach['res_folder'], self.reach['wq_folder'], self.reach['ini_file'], output,
+                          catalog=False)
+        self.assertEqual(threading.active_count(), before)
+
+class LowMemoryRunTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.folder = tempfile.mkdtemp()
+        self.reach = write_reach(os.path.join(self.folder, 'reach'), rows=600, files=3, short_files=0)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.folder)
+
+    def run_reach(self, name, **kwargs):
+        output = os.path.join(self.folder, name)
+        os.makedirs(output)
+        result = run_oasis('SYNTH', self.reach['res_folder'], self.reach['wq_folder'], self.reach['ini_file'], output,
+                           catalog=False, **kwargs)
+        return output, result
+
+    def test_compact_columns_write_the_same_outputs(self):
+        normal, _ = self.run_reach('normal')
+        low, result = self.run_reach('low', memory_budget=1)
+        self.assertTrue(result['metrics'].memory_plan['low_memory'])
+        self.assertEqual(result['importfile']['Rho 1'].dtype, np.float32)
+        for filename in ['SYNTH_Res.csv', 'SYNTH_WQ.csv', 'SYNTH_Merged_WQRes.csv']:
+            with open(os.path.join(normal, filename)) as f:
+                expected = f.read().replace(normal, '')
+            with open(os.path.join(low, filename)) as f:
+                self.assertEqual(f.read().replace(low, ''), expected)
+
+#%%
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+
+# coding: utf-8
+
+"""
+Last revised 10/19/2026
+
+Tests of MAP_Watch.LiveReach polling a reach that is still being written.
+"""
+#%%
+import glob
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MAP_Synthetic import write_reach
+from MAP_Watch import QUARANTINE_FILE, LiveReach
+
+#%%
+class CorruptLineTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.folder = tempfile.mkdtemp()
+        self.reach = write_reach(os.path.join(self.folder, 'reach'), rows=600, files=3, short_files=0)
+        self.output = os.path.join(self.folder, 'out')
+        os.makedirs(self.output)
+        self.live = LiveReach('SYNTH', self.reach['res_folder'], self.reach['wq_folder'], self.reach['ini_file'],
+                              self.output)
+        self.assertTrue(self.live.poll())
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.folder)
+
+    def test_corrupt_line_is_skipped_and_kept(self):
+        filename = sorted(glob.glob(os.path.join(self.reach['res_folder'], '*.txt')))[0]
+        with open(filename, 'rb') as f:
+            lines = f.read().splitlines(True)
+        rows = self.live.resFiles[filename]['rows']
+        # A record with fields run on from the next, which would shift its columns, and a line that does not parse
+        extra = lines[-1].rstrip(b'\r\n') + b';9;9;9;9;9;9;9;9;9;9\n'
+        quoted = b'1.0;"2;3\n'
+        with open(filename, 'ab') as fout:
+            fout.writelines([lines[-2], extra, quoted, lines[-1]])
+
+        self.assertTrue(self.live.poll())
+        self.assertEqual(self.live.resFiles[filename]['offset'], os.path.getsize(filename))
+        self.assertEqual(self.live.resFiles[filename]['rows'], rows + 2)
+        with open(os.path.join(self.output, QUARANTINE_FILE), 'rb') as f:
+            kept = f.read().splitlines(True)
+        self.assertEqual(sorted(kept), sorted(filename.encode('utf-8') + b'\t' + line for line in [extra, quoted]))
+
+        # The lines after it are read as they come
+        with open(filename, 'ab') as fout:
+            fout.write(lines[-3])
+        self.assertTrue(self.live.poll())
+        self.assertEqual(self.live.resFiles[filename]['rows'], rows + 3)
+
+#%%
+if __name__ == '__main__':
+    unittest.main()